@@ -1 +1 @@
-"""GOVINDA V2 — Vectorless Structure-First RAG for RBI Regulatory Documents."""
+"""GOVINDA V2 — Vectorless Structure-First RAG for RBI Regulatory Documents."""
@@ -1,421 +1,421 @@
-"""
-Synthesizer for GOVINDA V2.
-
-Generates comprehensive answers from retrieved sections using GPT-5.2-pro.
-Produces citations linking every claim to source sections, and identifies
-inferred points with reasoning chains.
-
-Uses the Responses API with deeper reasoning for synthesis quality.
-"""
-
-from __future__ import annotations
-
-import logging
-import time
-from typing import Optional
-
-from config.prompt_loader import load_prompt, format_prompt
-from config.settings import get_active_retrieval_mode, get_settings
-from models.query import (
-    Answer,
-    Citation,
-    InferredPoint,
-    Query,
-    RetrievedSection,
-)
-from utils.llm_client import LLMClient
-
-logger = logging.getLogger(__name__)
-
-
-class Synthesizer:
-    """
-    Generate cited answers from retrieved document sections.
-
-    Uses GPT-5.2-pro for deeper reasoning during synthesis.
-    Every factual claim must be grounded in a source section.
-    """
-
-    def __init__(self, llm: Optional[LLMClient] = None) -> None:
-        self._llm = llm or LLMClient()
-        self._settings = get_settings()
-
-    def _is_prealloc_enabled(self) -> bool:
-        """Check if synthesis pre-allocation is enabled via optimization toggle."""
-        try:
-            from app_backend.main import _runtime_config, get_retrieval_mode
-            if get_retrieval_mode() != "optimized":
-                return False
-            return _runtime_config.get("enable_synthesis_prealloc", self._settings.optimization.enable_synthesis_prealloc)
-        except Exception:
-            if self._settings.optimization.retrieval_mode != "optimized":
-                return False
-            return self._settings.optimization.enable_synthesis_prealloc
-
-    def _is_fast_synthesis_enabled(self) -> bool:
-        """Check if fast synthesis is enabled via optimization toggle."""
-        try:
-            from app_backend.main import _runtime_config, get_retrieval_mode
-            if get_retrieval_mode() != "optimized":
-                return False
-            return _runtime_config.get("enable_fast_synthesis", self._settings.optimization.enable_fast_synthesis)
-        except Exception:
-            if self._settings.optimization.retrieval_mode != "optimized":
-                return False
-            return self._settings.optimization.enable_fast_synthesis
-
-    def _trim_sections_to_budget(
-        self,
-        sections: list[RetrievedSection],
-        budget: int,
-    ) -> list[RetrievedSection]:
-        """
-        Trim sections to fit within a token budget.
-
-        Strategy: keep sections in order (highest relevance first from locator),
-        drop from the tail (lowest relevance) until under budget.
-        Prioritizes 'direct' source sections over expansions/cross-refs.
-        """
-        total = sum(s.token_count for s in sections)
-        if total <= budget:
-            return sections
-
-        # Partition: direct sections first, then others
-        direct = [s for s in sections if s.source in ("direct", "direct_read")]
-        other = [s for s in sections if s.source not in ("direct", "direct_read")]
-
-        # Drop 'other' sections from the end first
-        kept = list(direct) + list(other)
-        while sum(s.token_count for s in kept) > budget and kept:
-            removed = kept.pop()
-            logger.debug("[fast_synthesis] Trimmed section: %s (%d tokens)", removed.title[:50], removed.token_count)
-
-        trimmed_count = len(sections) - len(kept)
-        trimmed_tokens = total - sum(s.token_count for s in kept)
-        if trimmed_count > 0:
-            logger.info(
-                "[BENCHMARK][fast_synthesis] Trimmed %d sections (%d tokens) to fit budget=%d",
-                trimmed_count, trimmed_tokens, budget,
-            )
-        return kept
-
-    def synthesize(
-        self,
-        query: Query,
-        sections: list[RetrievedSection],
-        verify: bool = False,
-    ) -> Answer:
-        """
-        Synthesize an answer from retrieved sections.
-
-        Args:
-            query: The classified query.
-            sections: Retrieved document sections with text.
-
-        Returns:
-            An Answer object with text, citations, and inferred points.
-        """
-        if not sections:
-            return Answer(
-                text="No relevant sections were found to answer this query.",
-                query_type=query.query_type,
-            )
-
-        # Phase 2 optimization: trim sections to token budget
-        _fast = self._is_fast_synthesis_enabled()
-        if _fast:
-            budget = self._settings.optimization.synthesis_token_budget
-            sections = self._trim_sections_to_budget(sections, budget)
-
-        prompt_data = load_prompt("answering", "synthesis")
-        system_prompt = prompt_data["system"]
-        user_template = prompt_data["user_template"]
-
-        # Build the retrieved text block for the prompt
-        retrieved_text = self._format_sections(sections)
-
-        user_msg = format_prompt(
-            user_template,
-            query_text=query.text,
-            query_type=query.query_type.value,
-            retrieved_text=retrieved_text,
-        )
-
-        # If verification is requested, append lightweight verification instructions
-        # so the LLM returns verification_status and verification_notes alongside
-        # the synthesized answer. This removes the need for a separate verifier
-        # LLM call in many cases (FIX #4).
-        if verify:
-            user_msg += (
-                "\n\n[VERIFY] In addition to the answer, produce a JSON field\n"
-                "named 'verification_status' with one of: verified, partially_verified, unverified,\n"
-                "and a 'verification_notes' string listing any issues or supporting evidence.\n"
-                "Keep notes concise (max 300 characters)."
-            )
-
-        start = time.time()
-
-        try:
-            # Optimized mode: use tournament-verified model for this stage
-            opt = self._settings.optimization
-            _optimized = get_active_retrieval_mode() == "optimized"
-
-            # Adaptive reasoning effort based on query complexity
-            if _optimized:
-                _synth_model = opt.stage_model_synthesize
-                effort = opt.stage_effort_synthesize
-                logger.info(
-                    "[SYNTH] optimized mode: model=%s effort=%s sections=%d tokens=%d",
-                    _synth_model, effort, len(sections), sum(s.token_count for s in sections),
-                )
-            elif _fast:
-                _synth_model = self._settings.llm.model_pro
-                # Fast synthesis: use configured effort for all query types
-                effort = self._settings.optimization.synthesis_reasoning_effort
-                logger.info(
-                    "[BENCHMARK][fast_synthesis] effort=%s (overridden from high) sections=%d tokens=%d",
-                    effort, len(sections), sum(s.token_count for s in sections),
-                )
-            else:
-                _synth_model = self._settings.llm.model_pro
-                _effort_map = {
-                    "definitional": "medium",
-                    "single_hop": "medium",
-                    "multi_hop": "high",
-                    "global": "high",
-                }
-                effort = _effort_map.get(query.query_type.value, "medium")
-
-            # Phase 0C: Synthesis token pre-allocation
-            max_tokens_for_call = self._settings.llm.max_tokens_long
-            if self._is_prealloc_enabled():
-                input_token_estimate = len(system_prompt + user_msg) // 4  # rough char-to-token
-                estimated_output = max(4096, int(input_token_estimate * 0.25))
-                # Reasoning tokens count toward max_output_tokens.  Scale
-                # budget by effort level — higher effort = more reasoning
-                # token overhead.  Keep floor proportional to input size.
-                _reasoning_multiplier = {"low": 1.5, "medium": 2.5, "high": 3.0}
-                if effort in _reasoning_multiplier:
-                    estimated_output = max(
-                        int(estimated_output * _reasoning_multiplier[effort]),
-                        8192,
-                    )
-                max_tokens_for_call = min(estimated_output, self._settings.llm.max_tokens_long)
-                logger.info(
-                    "[BENCHMARK][synthesis_prealloc] input_est=%d estimated_output=%d actual_max=%d effort=%s",
-                    input_token_estimate, estimated_output, max_tokens_for_call, effort,
-                )
-
-            # Use chat_json_with_status to detect API-level truncation
-            result, was_truncated = self._llm.chat_json_with_status(
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_msg},
-                ],
-                model=_synth_model,
-                max_tokens=max_tokens_for_call,
-                reasoning_effort=effort,
-            )
-
-            elapsed = time.time() - start
-
-            # Parse the answer
-            answer_text = result.get("answer_text", "")
-            if not answer_text:
-                # Fallback: maybe the LLM returned text under a different key
-                answer_text = result.get("answer", result.get("text", str(result)))
-
-            # --- Truncation handling (improved: API-level + heuristic + iterative) ---
-            # Determine if we need continuation
-            needs_continuation = was_truncated or self._is_truncated(answer_text)
-
-            if needs_continuation:
-                answer_text, continuation_results = self._handle_truncation_iterative(
-                    answer_text, system_prompt, user_msg, max_rounds=3
-                )
-                # Merge citations/inferred_points from all continuation rounds
-                for cont_result in continuation_results:
-                    for key in ("citations", "inferred_points"):
-                        extras = cont_result.get(key, [])
-                        if extras:
-                            existing = result.get(key, [])
-                            existing.extend(extras)
-                            result[key] = existing
-
-            # Parse citations
-            citations = []
-            for c in result.get("citations", []):
-                # Look up page_range from the sections we passed
-                node_id = c.get("node_id", "")
-                page_range = ""
-                for s in sections:
-                    if s.node_id == node_id:
-                        page_range = s.page_range
-                        break
-
-                citations.append(
-                    Citation(
-                        citation_id=c.get("citation_id", f"[{node_id}]"),
-                        node_id=node_id,
-                        title=c.get("title", ""),
-                        page_range=page_range,
-                        excerpt=c.get("excerpt", ""),
-                    )
-                )
-
-            # Parse inferred points
-            inferred_points = []
-            for ip in result.get("inferred_points", []):
-                if not ip.get("point"):
-                    continue
-                confidence = str(ip.get("confidence", "medium"))
-                if confidence not in ("high", "medium", "low"):
-                    confidence = "medium"
-                # supporting_definitions: verbatim text from sources
-                raw_defs = ip.get("supporting_definitions", [])
-                if isinstance(raw_defs, str):
-                    raw_defs = [raw_defs]
-                supporting_defs = [str(d) for d in raw_defs if d]
-                # supporting_sections: node_ids
-                raw_secs = ip.get("supporting_sections", [])
-                if isinstance(raw_secs, str):
-                    raw_secs = [raw_secs]
-                supporting_secs = [str(s) for s in raw_secs if s]
-                inferred_points.append(
-                    InferredPoint(
-                        point=str(ip["point"]),
-                        supporting_definitions=supporting_defs,
-                        supporting_sections=supporting_secs,
-                        reasoning=str(ip.get("reasoning", "")),
-                        confidence=confidence,
-                    )
-                )
-
-            answer = Answer(
-                text=answer_text,
-                citations=citations,
-                inferred_points=inferred_points,
-                query_type=query.query_type,
-                retrieved_sections=sections,
-            )
-
-            # Parse verification fields if present in the result
-            ver_status = result.get("verification_status")
-            ver_notes = result.get("verification_notes")
-            if ver_status:
-                answer.verified = ver_status == "verified"
-                answer.verification_status = ver_status
-            if ver_notes:
-                answer.verification_notes = ver_notes
-
-            logger.info(
-                "Synthesis complete: %d citations, %d inferred points, %.1fs",
-                len(citations),
-                len(inferred_points),
-                elapsed,
-            )
-
-            return answer
-
-        except Exception as e:
-            logger.error("Synthesis failed: %s", str(e))
-            return Answer(
-                text=f"Error generating answer: {str(e)}",
-                query_type=query.query_type,
-                retrieved_sections=sections,
-            )
-
-    def _format_sections(self, sections: list[RetrievedSection]) -> str:
-        """Format retrieved sections into a text block for the LLM prompt."""
-        parts = []
-        for s in sections:
-            header = f"=== {s.title} ({s.page_range}) [id:{s.node_id}] ==="
-            parts.append(f"{header}\n{s.text}")
-        return "\n\n".join(parts)
-
-    def _is_truncated(self, text: str) -> bool:
-        """Check if text appears to end mid-sentence (truncated)."""
-        stripped = text.rstrip()
-        if not stripped:
-            return False
-        # Valid ending characters for a complete answer
-        valid_endings = {".", ")", ":", '"', "]", "!", "?", "*", "-"}
-        return stripped[-1] not in valid_endings
-
-    def _handle_truncation_iterative(
-        self,
-        answer_text: str,
-        system_prompt: str,
-        user_msg: str,
-        max_rounds: int = 3,
-    ) -> tuple[str, list[dict]]:
-        """
-        Iteratively continue a truncated answer (up to max_rounds).
-
-        Uses API-level truncation detection on each continuation call.
-
-        Returns:
-            Tuple of (extended answer_text, list of continuation result dicts).
-        """
-        continuation_results = []
-
-        for round_num in range(1, max_rounds + 1):
-            logger.warning(
-                "Answer truncated, continuation round %d/%d...",
-                round_num,
-                max_rounds,
-            )
-
-            # Take last ~500 chars as context for the continuation
-            tail_context = answer_text[-500:]
-
-            continuation_prompt = (
-                "The previous answer was cut off. Here is the tail end:\n\n"
-                f"...{tail_context}\n\n"
-                "Continue the answer from EXACTLY where it was cut off. "
-                "Do NOT repeat any content already written. "
-                "Maintain the same citation format [Section Title, p.XX]. "
-                "Return JSON with keys: answer_continuation (string), "
-                "citations (list, same format), inferred_points (list, same format)."
-            )
-
-            try:
-                cont_result, cont_truncated = self._llm.chat_json_with_status(
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": user_msg},
-                        {"role": "assistant", "content": answer_text},
-                        {"role": "user", "content": continuation_prompt},
-                    ],
-                    model=self._settings.llm.model_pro,
-                    max_tokens=self._settings.llm.max_tokens_long,
-                    reasoning_effort="medium",
-                )
-
-                continuation_text = cont_result.get(
-                    "answer_continuation",
-                    cont_result.get("answer_text", ""),
-                )
-
-                if continuation_text:
-                    answer_text = (
-                        answer_text.rstrip() + " " + continuation_text.lstrip()
-                    )
-                    logger.info(
-                        "Continuation round %d added %d chars",
-                        round_num,
-                        len(continuation_text),
-                    )
-
-                continuation_results.append(cont_result)
-
-                # If this round wasn't truncated and text looks complete, stop
-                if not cont_truncated and not self._is_truncated(answer_text):
-                    logger.info("Continuation complete after %d rounds", round_num)
-                    break
-
-            except Exception as e:
-                logger.error("Continuation round %d failed: %s", round_num, str(e))
-                break
-
-        return answer_text, continuation_results
+"""
+Synthesizer for GOVINDA V2.
+
+Generates comprehensive answers from retrieved sections using GPT-5.2-pro.
+Produces citations linking every claim to source sections, and identifies
+inferred points with reasoning chains.
+
+Uses the Responses API with deeper reasoning for synthesis quality.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from typing import Optional
+
+from config.prompt_loader import load_prompt, format_prompt
+from config.settings import get_active_retrieval_mode, get_settings
+from models.query import (
+    Answer,
+    Citation,
+    InferredPoint,
+    Query,
+    RetrievedSection,
+)
+from utils.llm_client import LLMClient
+
+logger = logging.getLogger(__name__)
+
+
+class Synthesizer:
+    """
+    Generate cited answers from retrieved document sections.
+
+    Uses GPT-5.2-pro for deeper reasoning during synthesis.
+    Every factual claim must be grounded in a source section.
+    """
+
+    def __init__(self, llm: Optional[LLMClient] = None) -> None:
+        self._llm = llm or LLMClient()
+        self._settings = get_settings()
+
+    def _is_prealloc_enabled(self) -> bool:
+        """Check if synthesis pre-allocation is enabled via optimization toggle."""
+        try:
+            from app_backend.main import _runtime_config, get_retrieval_mode
+            if get_retrieval_mode() != "optimized":
+                return False
+            return _runtime_config.get("enable_synthesis_prealloc", self._settings.optimization.enable_synthesis_prealloc)
+        except Exception:
+            if self._settings.optimization.retrieval_mode != "optimized":
+                return False
+            return self._settings.optimization.enable_synthesis_prealloc
+
+    def _is_fast_synthesis_enabled(self) -> bool:
+        """Check if fast synthesis is enabled via optimization toggle."""
+        try:
+            from app_backend.main import _runtime_config, get_retrieval_mode
+            if get_retrieval_mode() != "optimized":
+                return False
+            return _runtime_config.get("enable_fast_synthesis", self._settings.optimization.enable_fast_synthesis)
+        except Exception:
+            if self._settings.optimization.retrieval_mode != "optimized":
+                return False
+            return self._settings.optimization.enable_fast_synthesis
+
+    def _trim_sections_to_budget(
+        self,
+        sections: list[RetrievedSection],
+        budget: int,
+    ) -> list[RetrievedSection]:
+        """
+        Trim sections to fit within a token budget.
+
+        Strategy: keep sections in order (highest relevance first from locator),
+        drop from the tail (lowest relevance) until under budget.
+        Prioritizes 'direct' source sections over expansions/cross-refs.
+        """
+        total = sum(s.token_count for s in sections)
+        if total <= budget:
+            return sections
+
+        # Partition: direct sections first, then others
+        direct = [s for s in sections if s.source in ("direct", "direct_read")]
+        other = [s for s in sections if s.source not in ("direct", "direct_read")]
+
+        # Drop 'other' sections from the end first
+        kept = list(direct) + list(other)
+        while sum(s.token_count for s in kept) > budget and kept:
+            removed = kept.pop()
+            logger.debug("[fast_synthesis] Trimmed section: %s (%d tokens)", removed.title[:50], removed.token_count)
+
+        trimmed_count = len(sections) - len(kept)
+        trimmed_tokens = total - sum(s.token_count for s in kept)
+        if trimmed_count > 0:
+            logger.info(
+                "[BENCHMARK][fast_synthesis] Trimmed %d sections (%d tokens) to fit budget=%d",
+                trimmed_count, trimmed_tokens, budget,
+            )
+        return kept
+
+    def synthesize(
+        self,
+        query: Query,
+        sections: list[RetrievedSection],
+        verify: bool = False,
+    ) -> Answer:
+        """
+        Synthesize an answer from retrieved sections.
+
+        Args:
+            query: The classified query.
+            sections: Retrieved document sections with text.
+
+        Returns:
+            An Answer object with text, citations, and inferred points.
+        """
+        if not sections:
+            return Answer(
+                text="No relevant sections were found to answer this query.",
+                query_type=query.query_type,
+            )
+
+        # Phase 2 optimization: trim sections to token budget
+        _fast = self._is_fast_synthesis_enabled()
+        if _fast:
+            budget = self._settings.optimization.synthesis_token_budget
+            sections = self._trim_sections_to_budget(sections, budget)
+
+        prompt_data = load_prompt("answering", "synthesis")
+        system_prompt = prompt_data["system"]
+        user_template = prompt_data["user_template"]
+
+        # Build the retrieved text block for the prompt
+        retrieved_text = self._format_sections(sections)
+
+        user_msg = format_prompt(
+            user_template,
+            query_text=query.text,
+            query_type=query.query_type.value,
+            retrieved_text=retrieved_text,
+        )
+
+        # If verification is requested, append lightweight verification instructions
+        # so the LLM returns verification_status and verification_notes alongside
+        # the synthesized answer. This removes the need for a separate verifier
+        # LLM call in many cases (FIX #4).
+        if verify:
+            user_msg += (
+                "\n\n[VERIFY] In addition to the answer, produce a JSON field\n"
+                "named 'verification_status' with one of: verified, partially_verified, unverified,\n"
+                "and a 'verification_notes' string listing any issues or supporting evidence.\n"
+                "Keep notes concise (max 300 characters)."
+            )
+
+        start = time.time()
+
+        try:
+            # Optimized mode: use tournament-verified model for this stage
+            opt = self._settings.optimization
+            _optimized = get_active_retrieval_mode() == "optimized"
+
+            # Adaptive reasoning effort based on query complexity
+            if _optimized:
+                _synth_model = opt.stage_model_synthesize
+                effort = opt.stage_effort_synthesize
+                logger.info(
+                    "[SYNTH] optimized mode: model=%s effort=%s sections=%d tokens=%d",
+                    _synth_model, effort, len(sections), sum(s.token_count for s in sections),
+                )
+            elif _fast:
+                _synth_model = self._settings.llm.model_pro
+                # Fast synthesis: use configured effort for all query types
+                effort = self._settings.optimization.synthesis_reasoning_effort
+                logger.info(
+                    "[BENCHMARK][fast_synthesis] effort=%s (overridden from high) sections=%d tokens=%d",
+                    effort, len(sections), sum(s.token_count for s in sections),
+                )
+            else:
+                _synth_model = self._settings.llm.model_pro
+                _effort_map = {
+                    "definitional": "medium",
+                    "single_hop": "medium",
+                    "multi_hop": "high",
+                    "global": "high",
+                }
+                effort = _effort_map.get(query.query_type.value, "medium")
+
+            # Phase 0C: Synthesis token pre-allocation
+            max_tokens_for_call = self._settings.llm.max_tokens_long
+            if self._is_prealloc_enabled():
+                input_token_estimate = len(system_prompt + user_msg) // 4  # rough char-to-token
+                estimated_output = max(4096, int(input_token_estimate * 0.25))
+                # Reasoning tokens count toward max_output_tokens.  Scale
+                # budget by effort level — higher effort = more reasoning
+                # token overhead.  Keep floor proportional to input size.
+                _reasoning_multiplier = {"low": 1.5, "medium": 2.5, "high": 3.0}
+                if effort in _reasoning_multiplier:
+                    estimated_output = max(
+                        int(estimated_output * _reasoning_multiplier[effort]),
+                        8192,
+                    )
+                max_tokens_for_call = min(estimated_output, self._settings.llm.max_tokens_long)
+                logger.info(
+                    "[BENCHMARK][synthesis_prealloc] input_est=%d estimated_output=%d actual_max=%d effort=%s",
+                    input_token_estimate, estimated_output, max_tokens_for_call, effort,
+                )
+
+            # Use chat_json_with_status to detect API-level truncation
+            result, was_truncated = self._llm.chat_json_with_status(
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_msg},
+                ],
+                model=_synth_model,
+                max_tokens=max_tokens_for_call,
+                reasoning_effort=effort,
+            )
+
+            elapsed = time.time() - start
+
+            # Parse the answer
+            answer_text = result.get("answer_text", "")
+            if not answer_text:
+                # Fallback: maybe the LLM returned text under a different key
+                answer_text = result.get("answer", result.get("text", str(result)))
+
+            # --- Truncation handling (improved: API-level + heuristic + iterative) ---
+            # Determine if we need continuation
+            needs_continuation = was_truncated or self._is_truncated(answer_text)
+
+            if needs_continuation:
+                answer_text, continuation_results = self._handle_truncation_iterative(
+                    answer_text, system_prompt, user_msg, max_rounds=3
+                )
+                # Merge citations/inferred_points from all continuation rounds
+                for cont_result in continuation_results:
+                    for key in ("citations", "inferred_points"):
+                        extras = cont_result.get(key, [])
+                        if extras:
+                            existing = result.get(key, [])
+                            existing.extend(extras)
+                            result[key] = existing
+
+            # Parse citations
+            citations = []
+            for c in result.get("citations", []):
+                # Look up page_range from the sections we passed
+                node_id = c.get("node_id", "")
+                page_range = ""
+                for s in sections:
+                    if s.node_id == node_id:
+                        page_range = s.page_range
+                        break
+
+                citations.append(
+                    Citation(
+                        citation_id=c.get("citation_id", f"[{node_id}]"),
+                        node_id=node_id,
+                        title=c.get("title", ""),
+                        page_range=page_range,
+                        excerpt=c.get("excerpt", ""),
+                    )
+                )
+
+            # Parse inferred points
+            inferred_points = []
+            for ip in result.get("inferred_points", []):
+                if not ip.get("point"):
+                    continue
+                confidence = str(ip.get("confidence", "medium"))
+                if confidence not in ("high", "medium", "low"):
+                    confidence = "medium"
+                # supporting_definitions: verbatim text from sources
+                raw_defs = ip.get("supporting_definitions", [])
+                if isinstance(raw_defs, str):
+                    raw_defs = [raw_defs]
+                supporting_defs = [str(d) for d in raw_defs if d]
+                # supporting_sections: node_ids
+                raw_secs = ip.get("supporting_sections", [])
+                if isinstance(raw_secs, str):
+                    raw_secs = [raw_secs]
+                supporting_secs = [str(s) for s in raw_secs if s]
+                inferred_points.append(
+                    InferredPoint(
+                        point=str(ip["point"]),
+                        supporting_definitions=supporting_defs,
+                        supporting_sections=supporting_secs,
+                        reasoning=str(ip.get("reasoning", "")),
+                        confidence=confidence,
+                    )
+                )
+
+            answer = Answer(
+                text=answer_text,
+                citations=citations,
+                inferred_points=inferred_points,
+                query_type=query.query_type,
+                retrieved_sections=sections,
+            )
+
+            # Parse verification fields if present in the result
+            ver_status = result.get("verification_status")
+            ver_notes = result.get("verification_notes")
+            if ver_status:
+                answer.verified = ver_status == "verified"
+                answer.verification_status = ver_status
+            if ver_notes:
+                answer.verification_notes = ver_notes
+
+            logger.info(
+                "Synthesis complete: %d citations, %d inferred points, %.1fs",
+                len(citations),
+                len(inferred_points),
+                elapsed,
+            )
+
+            return answer
+
+        except Exception as e:
+            logger.error("Synthesis failed: %s", str(e))
+            return Answer(
+                text=f"Error generating answer: {str(e)}",
+                query_type=query.query_type,
+                retrieved_sections=sections,
+            )
+
+    def _format_sections(self, sections: list[RetrievedSection]) -> str:
+        """Format retrieved sections into a text block for the LLM prompt."""
+        parts = []
+        for s in sections:
+            header = f"=== {s.title} ({s.page_range}) [id:{s.node_id}] ==="
+            parts.append(f"{header}\n{s.text}")
+        return "\n\n".join(parts)
+
+    def _is_truncated(self, text: str) -> bool:
+        """Check if text appears to end mid-sentence (truncated)."""
+        stripped = text.rstrip()
+        if not stripped:
+            return False
+        # Valid ending characters for a complete answer
+        valid_endings = {".", ")", ":", '"', "]", "!", "?", "*", "-"}
+        return stripped[-1] not in valid_endings
+
+    def _handle_truncation_iterative(
+        self,
+        answer_text: str,
+        system_prompt: str,
+        user_msg: str,
+        max_rounds: int = 3,
+    ) -> tuple[str, list[dict]]:
+        """
+        Iteratively continue a truncated answer (up to max_rounds).
+
+        Uses API-level truncation detection on each continuation call.
+
+        Returns:
+            Tuple of (extended answer_text, list of continuation result dicts).
+        """
+        continuation_results = []
+
+        for round_num in range(1, max_rounds + 1):
+            logger.warning(
+                "Answer truncated, continuation round %d/%d...",
+                round_num,
+                max_rounds,
+            )
+
+            # Take last ~500 chars as context for the continuation
+            tail_context = answer_text[-500:]
+
+            continuation_prompt = (
+                "The previous answer was cut off. Here is the tail end:\n\n"
+                f"...{tail_context}\n\n"
+                "Continue the answer from EXACTLY where it was cut off. "
+                "Do NOT repeat any content already written. "
+                "Maintain the same citation format [Section Title, p.XX]. "
+                "Return JSON with keys: answer_continuation (string), "
+                "citations (list, same format), inferred_points (list, same format)."
+            )
+
+            try:
+                cont_result, cont_truncated = self._llm.chat_json_with_status(
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_msg},
+                        {"role": "assistant", "content": answer_text},
+                        {"role": "user", "content": continuation_prompt},
+                    ],
+                    model=self._settings.llm.model_pro,
+                    max_tokens=self._settings.llm.max_tokens_long,
+                    reasoning_effort="medium",
+                )
+
+                continuation_text = cont_result.get(
+                    "answer_continuation",
+                    cont_result.get("answer_text", ""),
+                )
+
+                if continuation_text:
+                    answer_text = (
+                        answer_text.rstrip() + " " + continuation_text.lstrip()
+                    )
+                    logger.info(
+                        "Continuation round %d added %d chars",
+                        round_num,
+                        len(continuation_text),
+                    )
+
+                continuation_results.append(cont_result)
+
+                # If this round wasn't truncated and text looks complete, stop
+                if not cont_truncated and not self._is_truncated(answer_text):
+                    logger.info("Continuation complete after %d rounds", round_num)
+                    break
+
+            except Exception as e:
+                logger.error("Continuation round %d failed: %s", round_num, str(e))
+                break
+
+        return answer_text, continuation_results
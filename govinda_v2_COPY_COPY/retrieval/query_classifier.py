@@ -1,90 +1,260 @@
-"""
-Query Classifier for GOVINDA V2.
-
-Classifies queries into types (BookRAG pattern) to determine
-the optimal retrieval strategy:
-- single_hop: answer in one section
-- multi_hop: answer spans multiple sections
-- global: requires document-wide aggregation
-- definitional: asks about a specific term/definition
-"""
-
-from __future__ import annotations
-
-import logging
-from typing import Optional
-
-from config.prompt_loader import load_prompt, format_prompt
-from config.settings import get_active_retrieval_mode, get_settings
-from models.query import Query, QueryType
-from utils.llm_client import LLMClient
-
-logger = logging.getLogger(__name__)
-
-
-class QueryClassifier:
-    """Classify queries to determine retrieval strategy."""
-
-    def __init__(self, llm: LLMClient) -> None:
-        self._llm = llm
-
-    def classify(self, query_text: str) -> Query:
-        """
-        Classify a query and extract key terms.
-
-        Args:
-            query_text: The user's query string.
-
-        Returns:
-            A Query object with type, key terms, and sub-queries.
-        """
-        prompt_data = load_prompt("retrieval", "query_classification")
-        system_prompt = prompt_data["system"]
-        user_template = prompt_data["user_template"]
-
-        user_msg = format_prompt(user_template, query_text=query_text)
-
-        try:
-            # Optimized mode: use tournament-verified model for this stage
-            settings = get_settings()
-            opt = settings.optimization
-            if get_active_retrieval_mode() == "optimized":
-                _model = opt.stage_model_classify
-                _effort = opt.stage_effort_classify
-            else:
-                _model = None  # default (gpt-5.2)
-                _effort = "low"
-
-            result = self._llm.chat_json(
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_msg},
-                ],
-                model=_model,
-                max_tokens=1024,
-                reasoning_effort=_effort,
-            )
-
-            query_type_str = result.get("query_type", "single_hop")
-            try:
-                query_type = QueryType(query_type_str)
-            except ValueError:
-                query_type = QueryType.SINGLE_HOP
-
-            query = Query(
-                text=query_text,
-                query_type=query_type,
-                key_terms=result.get("key_terms", []),
-                sub_queries=result.get("sub_queries", []),
-            )
-
-            logger.info(
-                "Query classified: type=%s, terms=%s",
-                query_type.value,
-                query.key_terms,
-            )
-            return query
-
-        except Exception as e:
-            logger.error("Query classification failed: %s", str(e))
-            return Query(text=query_text, query_type=QueryType.SINGLE_HOP)
+"""
+Query Classifier for GOVINDA V2.
+
+Classifies queries into types (BookRAG pattern) to determine
+the optimal retrieval strategy:
+- single_hop: answer in one section
+- multi_hop: answer spans multiple sections
+- global: requires document-wide aggregation
+- definitional: asks about a specific term/definition
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import replace
+from typing import Optional
+
+from config.prompt_loader import load_prompt, format_prompt
+from config.settings import get_active_retrieval_mode, get_settings
+from models.query import Query, QueryType
+from utils.llm_client import LLMClient
+
+logger = logging.getLogger(__name__)
+
+
+class QueryClassifier:
+    """Classify queries to determine retrieval strategy."""
+
+    def __init__(self, llm: LLMClient) -> None:
+        self._llm = llm
+        self._settings = get_settings()
+        self._classify_prompt = load_prompt("retrieval", "query_classification")
+        self._fused_prompt = load_prompt("retrieval", "query_classification_expansion")
+        # LRU cache: (retrieval_mode, normalized query text) ->
+        #   (classified Query, expanded queries or None if not yet generated)
+        self._cache: OrderedDict[
+            tuple[str, str], tuple[Query, Optional[list[str]]]
+        ] = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def clear_cache(self) -> None:
+        """Clear the classification cache."""
+        with self._cache_lock:
+            self._cache.clear()
+
+    def classify(self, query_text: str) -> Query:
+        """
+        Classify a query and extract key terms.
+
+        Identical queries (after whitespace/case normalization) are served
+        from an in-process LRU cache, skipping the LLM call entirely.
+
+        Args:
+            query_text: The user's query string.
+
+        Returns:
+            A Query object with type, key terms, and sub-queries.
+        """
+        cached = self._cache_get(query_text)
+        if cached is not None:
+            return cached[0]
+
+        query = self._classify_llm(query_text)
+        if query is not None:
+            self._cache_put(query_text, query, None)
+            return query
+        return Query(text=query_text, query_type=QueryType.SINGLE_HOP)
+
+    def classify_and_expand(self, query_text: str) -> tuple[Query, Optional[list[str]]]:
+        """
+        Classify a query and generate expanded queries in a single LLM call.
+
+        Fuses the classification and expansion prompts so Steps 1+2 of
+        retrieval cost one round-trip instead of two. Single-hop and
+        definitional queries always get an empty expansion list.
+
+        Args:
+            query_text: The user's query string.
+
+        Returns:
+            Tuple of (classified Query, expanded queries). Expanded queries
+            is None when only a classification is available (cached from
+            classify(), or the fused call failed and classification fell
+            back to classify()) — the caller should use QueryExpander.
+        """
+        cached = self._cache_get(query_text)
+        if cached is not None:
+            return cached
+
+        result = self._classify_and_expand_llm(query_text)
+        if result is None:
+            return self.classify(query_text), None
+
+        query, expanded = result
+        self._cache_put(query_text, query, expanded)
+        return query, expanded
+
+    # ------------------------------------------------------------------
+    # Cache helpers
+    # ------------------------------------------------------------------
+
+    def _cache_key(self, query_text: str) -> tuple[str, str]:
+        return (get_active_retrieval_mode(), query_text.strip().lower())
+
+    def _cache_get(self, query_text: str) -> Optional[tuple[Query, Optional[list[str]]]]:
+        """Return a copy of the cached (Query, expanded) for query_text, if any."""
+        if not self._settings.retrieval.enable_classification_cache:
+            return None
+        cache_key = self._cache_key(query_text)
+        with self._cache_lock:
+            cached = self._cache.get(cache_key)
+            if cached is None:
+                return None
+            self._cache.move_to_end(cache_key)
+
+        query, expanded = cached
+        logger.info(
+            "Query classification cache HIT: type=%s, query='%s'",
+            query.query_type.value,
+            query_text[:40],
+        )
+        # Copy so callers mutating list fields never corrupt the cache
+        return (
+            replace(
+                query,
+                text=query_text,
+                key_terms=list(query.key_terms),
+                sub_queries=list(query.sub_queries),
+            ),
+            list(expanded) if expanded is not None else None,
+        )
+
+    def _cache_put(
+        self, query_text: str, query: Query, expanded: Optional[list[str]]
+    ) -> None:
+        if not self._settings.retrieval.enable_classification_cache:
+            return
+        entry = (
+            replace(
+                query,
+                key_terms=list(query.key_terms),
+                sub_queries=list(query.sub_queries),
+            ),
+            list(expanded) if expanded is not None else None,
+        )
+        with self._cache_lock:
+            self._cache[self._cache_key(query_text)] = entry
+            while len(self._cache) > self._settings.retrieval.classification_cache_size:
+                self._cache.popitem(last=False)
+
+    # ------------------------------------------------------------------
+    # LLM calls
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _stage_model_and_effort() -> tuple[Optional[str], str]:
+        """Model/effort for the classify stage (optimized mode overrides)."""
+        # Optimized mode: use tournament-verified model for this stage
+        if get_active_retrieval_mode() == "optimized":
+            opt = get_settings().optimization
+            return opt.stage_model_classify, opt.stage_effort_classify
+        return None, "low"  # default (gpt-5.2)
+
+    @staticmethod
+    def _parse_query(query_text: str, result: dict) -> Query:
+        query_type_str = result.get("query_type", "single_hop")
+        try:
+            query_type = QueryType(query_type_str)
+        except ValueError:
+            query_type = QueryType.SINGLE_HOP
+
+        return Query(
+            text=query_text,
+            query_type=query_type,
+            key_terms=result.get("key_terms", []),
+            sub_queries=result.get("sub_queries", []),
+        )
+
+    def _classify_llm(self, query_text: str) -> Optional[Query]:
+        """Run the classification LLM call. Returns None on failure."""
+        prompt_data = self._classify_prompt
+        system_prompt = prompt_data["system"]
+        user_template = prompt_data["user_template"]
+
+        user_msg = format_prompt(user_template, query_text=query_text)
+
+        try:
+            _model, _effort = self._stage_model_and_effort()
+
+            result = self._llm.chat_json(
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_msg},
+                ],
+                model=_model,
+                max_tokens=1024,
+                reasoning_effort=_effort,
+            )
+
+            query = self._parse_query(query_text, result)
+
+            logger.info(
+                "Query classified: type=%s, terms=%s",
+                query.query_type.value,
+                query.key_terms,
+            )
+            return query
+
+        except Exception as e:
+            logger.error("Query classification failed: %s", str(e))
+            return None
+
+    def _classify_and_expand_llm(
+        self, query_text: str
+    ) -> Optional[tuple[Query, list[str]]]:
+        """Run the fused classification + expansion LLM call. Returns None on failure."""
+        prompt_data = self._fused_prompt
+        system_prompt = prompt_data["system"]
+        user_template = prompt_data["user_template"]
+
+        user_msg = format_prompt(user_template, query_text=query_text)
+
+        try:
+            _model, _effort = self._stage_model_and_effort()
+
+            result = self._llm.chat_json(
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_msg},
+                ],
+                model=_model,
+                max_tokens=1024,
+                reasoning_effort=_effort,
+            )
+
+            query = self._parse_query(query_text, result)
+
+            # Precise query types are never expanded, whatever the LLM emitted
+            expanded: list[str] = []
+            if query.query_type not in (QueryType.SINGLE_HOP, QueryType.DEFINITIONAL):
+                raw = result.get("expanded_queries", [])
+                if isinstance(raw, list):
+                    # Cap at 3 and filter empty strings (same as QueryExpander)
+                    expanded = [
+                        q.strip() for q in raw[:3] if isinstance(q, str) and q.strip()
+                    ]
+
+            logger.info(
+                "Query classified+expanded: type=%s, terms=%s, %d alternatives",
+                query.query_type.value,
+                query.key_terms,
+                len(expanded),
+            )
+            return query, expanded
+
+        except Exception as e:
+            logger.error("Fused query classification/expansion failed: %s", str(e))
+            return None
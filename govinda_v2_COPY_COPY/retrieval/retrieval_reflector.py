@@ -1,405 +1,462 @@
-"""
-Retrieval Reflector for GOVINDA V2.
-
-After initial retrieval, checks whether the evidence is sufficient
-to answer the query. If gaps are identified, generates targeted
-sub-queries and runs additional retrieval rounds.
-
-Inspired by SimpleMem's retrieval reflection loop and DeepRead's
-multi-turn iterative retrieval.
-
-Max 2 reflection rounds to cap token usage.
-"""
-
-from __future__ import annotations
-
-import logging
-from typing import Optional
-
-from config.prompt_loader import load_prompt, format_prompt
-from models.document import DocumentTree
-from models.query import Query, QueryType, RetrievedSection
-from utils.llm_client import LLMClient
-from config.settings import get_active_retrieval_mode, get_settings
-
-logger = logging.getLogger(__name__)
-
-# Max reflection rounds (each round = 1 LLM reflection + 1-2 retrieval calls)
-_MAX_REFLECTION_ROUNDS = 2
-
-# Max gap-filling queries per round
-_MAX_GAP_QUERIES = 2
-
-
-class RetrievalReflector:
-    """
-    Reflect on retrieval sufficiency and fill gaps.
-
-    After the initial retrieval pass, this component:
-    1. Presents section summaries to the LLM
-    2. LLM assesses whether evidence is sufficient
-    3. If gaps found, generates targeted sub-queries
-    4. Runs sub-query retrieval and merges results
-    5. Repeats for up to _MAX_REFLECTION_ROUNDS
-    """
-
-    def __init__(self, llm: LLMClient) -> None:
-        self._llm = llm
-
-    def reflect_and_fill(
-        self,
-        query: Query,
-        sections: list[RetrievedSection],
-        tree: DocumentTree,
-        router: object,  # StructuralRouter — avoided circular import via duck typing
-    ) -> list[RetrievedSection]:
-        """
-        Check evidence sufficiency and fill gaps if needed.
-
-        Skips reflection for definitional queries (they're precise enough).
-
-        Args:
-            query: The classified user query.
-            sections: Already-retrieved sections.
-            tree: The document tree.
-            router: The StructuralRouter (for gap-filling retrieval).
-                    Must have a `retrieve_for_subquery(text, tree)` method.
-
-        Returns:
-            Augmented sections list (original + gap-filled).
-        """
-        import time
-
-        # Track contribution metrics
-        initial_section_count = len(sections)
-        initial_node_ids = {s.node_id for s in sections}
-        initial_token_count = sum(s.token_count for s in sections)
-        round_details: list[dict] = []
-
-        # Skip reflection for definitional queries — they're focused enough
-        if query.query_type == QueryType.DEFINITIONAL:
-            logger.info("Skipping reflection for definitional query")
-            logger.info(
-                "[Reflection Contribution] SKIPPED — definitional query. "
-                "Sections: %d, Tokens: %d",
-                initial_section_count,
-                initial_token_count,
-            )
-            return sections
-
-        # Skip if we have very few sections (nothing to reflect on)
-        if len(sections) < 2:
-            logger.info("Skipping reflection — too few sections (%d)", len(sections))
-            logger.info(
-                "[Reflection Contribution] SKIPPED — too few sections (%d). "
-                "Tokens: %d",
-                len(sections),
-                initial_token_count,
-            )
-            return sections
-
-        # Early-skip heuristic: if we already have many sections or tokens,
-        # reflection is unlikely to add value and is expensive.
-        settings = get_settings()
-
-        # Phase 0D: Use tuned (lower) thresholds when optimized mode + reflection tuning is on
-        section_threshold = settings.retrieval.reflection_skip_section_threshold
-        token_threshold = settings.retrieval.reflection_skip_token_threshold
-        _using_tuned = False
-        try:
-            from app_backend.main import _runtime_config, get_retrieval_mode
-            if get_retrieval_mode() == "optimized":
-                _tuning_on = _runtime_config.get(
-                    "enable_reflection_tuning",
-                    settings.optimization.enable_reflection_tuning,
-                )
-                if _tuning_on:
-                    section_threshold = settings.optimization.tuned_reflection_skip_section_threshold
-                    token_threshold = settings.optimization.tuned_reflection_skip_token_threshold
-                    _using_tuned = True
-        except Exception:
-            if (
-                settings.optimization.retrieval_mode == "optimized"
-                and settings.optimization.enable_reflection_tuning
-            ):
-                section_threshold = settings.optimization.tuned_reflection_skip_section_threshold
-                token_threshold = settings.optimization.tuned_reflection_skip_token_threshold
-                _using_tuned = True
-
-        logger.info(
-            "[BENCHMARK][reflection_tuning] thresholds=(section=%d, token=%d) tuned=%s",
-            section_threshold, token_threshold, _using_tuned,
-        )
-
-        if (
-            initial_section_count >= section_threshold
-            or initial_token_count >= token_threshold
-        ):
-            logger.info(
-                "Skipping reflection — evidence abundant (sections=%d, tokens=%d)",
-                initial_section_count,
-                initial_token_count,
-            )
-            logger.info(
-                "[Reflection Contribution] SKIPPED — abundant evidence; thresholds: sections>=%d tokens>=%d",
-                section_threshold,
-                token_threshold,
-            )
-            return sections
-
-        for round_num in range(1, _MAX_REFLECTION_ROUNDS + 1):
-            round_start = time.time()
-            logger.info(
-                "[Reflection %d/%d] Assessing evidence sufficiency...",
-                round_num,
-                _MAX_REFLECTION_ROUNDS,
-            )
-
-            # Build section summaries for the LLM (titles + page ranges only — cheap)
-            section_summaries = self._build_summaries(sections)
-            total_tokens = sum(s.token_count for s in sections)
-
-            # Ask LLM to assess sufficiency
-            assess_start = time.time()
-            assessment = self._assess(
-                query, section_summaries, len(sections), total_tokens
-            )
-            assess_time = time.time() - assess_start
-
-            if assessment is None:
-                logger.warning("Reflection assessment failed — stopping (%.1fs wasted on LLM call)", assess_time)
-                round_details.append({
-                    "round": round_num,
-                    "assess_time": assess_time,
-                    "fill_time": 0.0,
-                    "outcome": "assessment_failed",
-                    "new_sections": 0,
-                    "new_node_ids": [],
-                })
-                break
-
-            is_sufficient = assessment.get("sufficient", True)
-            confidence = assessment.get("confidence", 1.0)
-            gap_queries = assessment.get("gap_queries", [])
-            missing = assessment.get("missing_aspects", [])
-
-            logger.info(
-                "  -> Sufficient: %s (confidence: %.2f), %d gaps, missing: %s (assess: %.1fs)",
-                is_sufficient,
-                confidence,
-                len(gap_queries),
-                missing[:3],
-                assess_time,
-            )
-
-            # If sufficient or no gap queries, we're done
-            # Also stop if confidence is high enough (>= 0.80) — the reflector
-            # tends to be conservative since it only sees summaries, not full text
-            if is_sufficient or not gap_queries or confidence >= 0.80:
-                logger.info("  -> Evidence sufficient — no further retrieval needed")
-                round_details.append({
-                    "round": round_num,
-                    "assess_time": assess_time,
-                    "fill_time": 0.0,
-                    "outcome": f"sufficient (confidence={confidence:.2f})",
-                    "new_sections": 0,
-                    "new_node_ids": [],
-                })
-                break
-
-            # Fill gaps with targeted sub-queries
-            fill_start = time.time()
-            gap_queries = gap_queries[:_MAX_GAP_QUERIES]
-            already_read = {s.node_id for s in sections}
-            new_sections_added = 0
-            new_node_ids_this_round: list[str] = []
-
-            for gq in gap_queries:
-                if not isinstance(gq, str) or not gq.strip():
-                    continue
-
-                logger.info("  -> Gap query: '%s'", gq[:80])
-
-                try:
-                    gq_start = time.time()
-                    _, gap_sections, _ = router.retrieve_for_subquery(gq.strip(), tree)
-                    gq_time = time.time() - gq_start
-
-                    gq_new = 0
-                    for gs in gap_sections:
-                        if gs.node_id not in already_read:
-                            sections.append(gs)
-                            already_read.add(gs.node_id)
-                            new_sections_added += 1
-                            new_node_ids_this_round.append(gs.node_id)
-                            gq_new += 1
-
-                    logger.info(
-                        "    -> Gap query returned %d sections, %d new (%.1fs)",
-                        len(gap_sections),
-                        gq_new,
-                        gq_time,
-                    )
-                except Exception as e:
-                    logger.warning("Gap retrieval failed for '%s': %s", gq[:40], str(e))
-
-            fill_time = time.time() - fill_start
-            round_time = time.time() - round_start
-
-            round_details.append({
-                "round": round_num,
-                "assess_time": assess_time,
-                "fill_time": fill_time,
-                "total_time": round_time,
-                "outcome": f"gap_filled ({len(gap_queries)} queries)",
-                "new_sections": new_sections_added,
-                "new_node_ids": new_node_ids_this_round,
-                "missing_aspects": missing,
-                "gap_queries_used": gap_queries,
-            })
-
-            logger.info(
-                "  -> Round %d: added %d new sections (total: %d) — assess: %.1fs, fill: %.1fs, round: %.1fs",
-                round_num,
-                new_sections_added,
-                len(sections),
-                assess_time,
-                fill_time,
-                round_time,
-            )
-
-            # If no new sections were added, further rounds won't help
-            if new_sections_added == 0:
-                logger.info("  -> No new sections found — stopping reflection")
-                break
-
-        # ── Contribution Summary ──
-        final_section_count = len(sections)
-        final_token_count = sum(s.token_count for s in sections)
-        added_node_ids = {s.node_id for s in sections} - initial_node_ids
-        added_sections = [s for s in sections if s.node_id in added_node_ids]
-        added_tokens = sum(s.token_count for s in added_sections)
-
-        total_assess_time = sum(r["assess_time"] for r in round_details)
-        total_fill_time = sum(r.get("fill_time", 0) for r in round_details)
-        total_rounds = len(round_details)
-
-        logger.info("=" * 70)
-        logger.info("[Reflection Contribution Summary]")
-        logger.info(
-            "  Rounds: %d | Assess LLM time: %.1fs | Gap-fill time: %.1fs",
-            total_rounds,
-            total_assess_time,
-            total_fill_time,
-        )
-        logger.info(
-            "  Sections: %d -> %d (+%d new)",
-            initial_section_count,
-            final_section_count,
-            len(added_node_ids),
-        )
-        logger.info(
-            "  Tokens: %d -> %d (+%d new, %.1f%% increase)",
-            initial_token_count,
-            final_token_count,
-            added_tokens,
-            (added_tokens / initial_token_count * 100) if initial_token_count > 0 else 0,
-        )
-        if added_node_ids:
-            logger.info("  New node IDs from reflection: %s", sorted(added_node_ids))
-            for s in added_sections:
-                logger.info("    -> %s: %s (%s, %d tokens)", s.node_id, s.title, s.page_range, s.token_count)
-        else:
-            logger.info("  ** Reflection added ZERO new sections — all time was overhead **")
-
-        for rd in round_details:
-            logger.info(
-                "  Round %d: %s | assess=%.1fs, fill=%.1fs | +%d sections %s",
-                rd["round"],
-                rd["outcome"],
-                rd["assess_time"],
-                rd.get("fill_time", 0),
-                rd["new_sections"],
-                rd.get("new_node_ids", []),
-            )
-        logger.info("=" * 70)
-
-        # Store contribution metadata on the sections for later analysis
-        # Tag each reflection-added section so we can check if it was cited
-        for s in sections:
-            if s.node_id in added_node_ids:
-                s.source = f"reflection_gap_fill"
-
-        return sections
-
-    def _assess(
-        self,
-        query: Query,
-        section_summaries: str,
-        section_count: int,
-        total_tokens: int,
-    ) -> dict | None:
-        """
-        Ask the LLM to assess whether evidence is sufficient.
-
-        Returns parsed JSON assessment or None on failure.
-        """
-        prompt_data = load_prompt("retrieval", "retrieval_reflection")
-        system_prompt = prompt_data["system"]
-        user_template = prompt_data["user_template"]
-
-        user_msg = format_prompt(
-            user_template,
-            query_text=query.text,
-            query_type=query.query_type.value,
-            key_terms=", ".join(query.key_terms) if query.key_terms else "none",
-            section_count=str(section_count),
-            total_tokens=str(total_tokens),
-            section_summaries=section_summaries,
-        )
-
-        try:
-            # Optimized mode: use tournament-verified model for this stage
-            settings = get_settings()
-            opt = settings.optimization
-            if get_active_retrieval_mode() == "optimized":
-                _model = opt.stage_model_reflect
-                _effort = opt.stage_effort_reflect
-            else:
-                _model = None  # default (gpt-5.2)
-                _effort = "low"
-
-            result = self._llm.chat_json(
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_msg},
-                ],
-                model=_model,
-                max_tokens=1024,
-                reasoning_effort=_effort,
-            )
-            return result if isinstance(result, dict) else None
-        except Exception as e:
-            logger.warning("Reflection assessment failed: %s", str(e))
-            return None
-
-    @staticmethod
-    def _build_summaries(sections: list[RetrievedSection]) -> str:
-        """
-        Build concise section summaries for the reflection LLM.
-
-        Includes titles, page ranges, and a brief text snippet so the
-        reflector can assess whether specific information is present.
-        """
-        lines = []
-        for i, s in enumerate(sections, 1):
-            source_tag = f" [{s.source}]" if s.source != "direct" else ""
-            # Include first 150 chars of text for context
-            snippet = s.text[:150].replace("\n", " ").strip()
-            if len(s.text) > 150:
-                snippet += "..."
-            lines.append(
-                f"{i}. {s.title} ({s.page_range}, ~{s.token_count} tokens){source_tag}"
-                f"\n   Preview: {snippet}"
-            )
-        return "\n".join(lines)
+"""
+Retrieval Reflector for GOVINDA V2.
+
+After initial retrieval, checks whether the evidence is sufficient
+to answer the query. If gaps are identified, generates targeted
+sub-queries and runs additional retrieval rounds.
+
+Inspired by SimpleMem's retrieval reflection loop and DeepRead's
+multi-turn iterative retrieval.
+
+Max 2 reflection rounds to cap token usage.
+"""
+
+from __future__ import annotations
+
+import logging
+from difflib import SequenceMatcher
+from typing import Optional
+
+from config.prompt_loader import load_prompt, format_prompt
+from models.document import DocumentTree
+from models.query import Query, QueryType, RetrievedSection, SectionBag
+from utils.llm_client import LLMClient
+from utils.text_utils import estimate_tokens
+from utils.timing import Timer
+from config.settings import get_active_retrieval_mode, get_settings
+
+logger = logging.getLogger(__name__)
+
+# Max reflection rounds (each round = 1 LLM reflection + 1-2 retrieval calls)
+_MAX_REFLECTION_ROUNDS = 2
+
+# Max gap-filling queries per round
+_MAX_GAP_QUERIES = 2
+
+# Gap queries this similar to the original query are skipped as redundant
+_GAP_QUERY_SIMILARITY_SKIP = 0.9
+
+# Section-summary bounds for the assessment prompt
+_SUMMARY_CHAR_BUDGET = 4000  # total snippet characters across all sections
+_MAX_SNIPPET_CHARS = 150
+_MIN_SNIPPET_CHARS = 40
+_MAX_SUMMARY_SECTIONS = 30
+
+# Precomputed formatters for _build_summaries (runs every reflection round)
+_NL_TRANS = str.maketrans({"\n": " ", "\r": " "})
+_SUMMARY_FMT = "{idx}. {title} ({pg}, ~{tok} tokens){src}\n   Preview: {snip}"
+
+
+class RetrievalReflector:
+    """
+    Reflect on retrieval sufficiency and fill gaps.
+
+    After the initial retrieval pass, this component:
+    1. Presents section summaries to the LLM
+    2. LLM assesses whether evidence is sufficient
+    3. If gaps found, generates targeted sub-queries
+    4. Runs sub-query retrieval and merges results
+    5. Repeats for up to _MAX_REFLECTION_ROUNDS
+    """
+
+    def __init__(self, llm: LLMClient) -> None:
+        self._llm = llm
+        prompt_data = load_prompt("retrieval", "retrieval_reflection")
+        self._system_prompt = prompt_data["system"]
+        self._user_template = prompt_data["user_template"]
+
+    def reflect_and_fill(
+        self,
+        query: Query,
+        sections: list[RetrievedSection],
+        tree: DocumentTree,
+        router: object,  # StructuralRouter — avoided circular import via duck typing
+    ) -> list[RetrievedSection]:
+        """
+        Check evidence sufficiency and fill gaps if needed.
+
+        Skips reflection for definitional queries (they're precise enough).
+
+        Args:
+            query: The classified user query.
+            sections: Already-retrieved sections.
+            tree: The document tree.
+            router: The StructuralRouter (for gap-filling retrieval).
+                    Must have a `retrieve_for_subquery(text, tree)` method.
+
+        Returns:
+            Augmented sections list (original + gap-filled).
+        """
+        # Track contribution metrics
+        bag = SectionBag(sections)
+        initial_section_count = len(sections)
+        initial_token_count = bag.total_tokens
+        round_details: list[dict] = []
+
+        # Skip reflection for definitional queries — they're focused enough
+        if query.query_type == QueryType.DEFINITIONAL:
+            logger.info("Skipping reflection for definitional query")
+            logger.info(
+                "[Reflection Contribution] SKIPPED — definitional query. "
+                "Sections: %d, Tokens: %d",
+                initial_section_count,
+                initial_token_count,
+            )
+            return sections
+
+        # Skip if we have very few sections (nothing to reflect on)
+        if len(sections) < 2:
+            logger.info("Skipping reflection — too few sections (%d)", len(sections))
+            logger.info(
+                "[Reflection Contribution] SKIPPED — too few sections (%d). "
+                "Tokens: %d",
+                len(sections),
+                initial_token_count,
+            )
+            return sections
+
+        # Early-skip heuristic: if we already have many sections or tokens,
+        # reflection is unlikely to add value and is expensive.
+        settings = get_settings()
+
+        # Phase 0D: Use tuned (lower) thresholds when optimized mode + reflection tuning is on
+        section_threshold = settings.retrieval.reflection_skip_section_threshold
+        token_threshold = settings.retrieval.reflection_skip_token_threshold
+        _using_tuned = False
+        try:
+            from app_backend.main import _runtime_config, get_retrieval_mode
+            if get_retrieval_mode() == "optimized":
+                _tuning_on = _runtime_config.get(
+                    "enable_reflection_tuning",
+                    settings.optimization.enable_reflection_tuning,
+                )
+                if _tuning_on:
+                    section_threshold = settings.optimization.tuned_reflection_skip_section_threshold
+                    token_threshold = settings.optimization.tuned_reflection_skip_token_threshold
+                    _using_tuned = True
+        except Exception:
+            if (
+                settings.optimization.retrieval_mode == "optimized"
+                and settings.optimization.enable_reflection_tuning
+            ):
+                section_threshold = settings.optimization.tuned_reflection_skip_section_threshold
+                token_threshold = settings.optimization.tuned_reflection_skip_token_threshold
+                _using_tuned = True
+
+        logger.info(
+            "[BENCHMARK][reflection_tuning] thresholds=(section=%d, token=%d) tuned=%s",
+            section_threshold, token_threshold, _using_tuned,
+        )
+
+        if (
+            initial_section_count >= section_threshold
+            or initial_token_count >= token_threshold
+        ):
+            logger.info(
+                "Skipping reflection — evidence abundant (sections=%d, tokens=%d)",
+                initial_section_count,
+                initial_token_count,
+            )
+            logger.info(
+                "[Reflection Contribution] SKIPPED — abundant evidence; thresholds: sections>=%d tokens>=%d",
+                section_threshold,
+                token_threshold,
+            )
+            return sections
+
+        # Normalized gap queries already run this call — the reflector often
+        # re-asks the same gap in round 2 with different casing/whitespace.
+        executed_gaps: set[str] = set()
+        query_norm = query.text.strip().lower()
+
+        for round_num in range(1, _MAX_REFLECTION_ROUNDS + 1):
+            timer = Timer()
+            logger.info(
+                "[Reflection %d/%d] Assessing evidence sufficiency...",
+                round_num,
+                _MAX_REFLECTION_ROUNDS,
+            )
+
+            # Build section summaries for the LLM (titles + page ranges only — cheap)
+            section_summaries = self._build_summaries(sections, initial_section_count)
+            total_tokens = bag.total_tokens
+
+            # Ask LLM to assess sufficiency
+            with timer("assess") as stage:
+                assessment = self._assess(
+                    query, section_summaries, len(sections), total_tokens
+                )
+            assess_time = stage.seconds
+
+            if assessment is None:
+                logger.warning("Reflection assessment failed — stopping (%.1fs wasted on LLM call)", assess_time)
+                round_details.append({
+                    "round": round_num,
+                    "assess_time": assess_time,
+                    "fill_time": 0.0,
+                    "outcome": "assessment_failed",
+                    "new_sections": 0,
+                    "new_node_ids": [],
+                })
+                break
+
+            is_sufficient = assessment.get("sufficient", True)
+            confidence = assessment.get("confidence", 1.0)
+            gap_queries = assessment.get("gap_queries", [])
+            missing = assessment.get("missing_aspects", [])
+
+            logger.info(
+                "  -> Sufficient: %s (confidence: %.2f), %d gaps, missing: %s (assess: %.1fs)",
+                is_sufficient,
+                confidence,
+                len(gap_queries),
+                missing[:3],
+                assess_time,
+            )
+
+            # If sufficient or no gap queries, we're done
+            # Also stop if confidence is high enough (>= 0.80) — the reflector
+            # tends to be conservative since it only sees summaries, not full text
+            if is_sufficient or not gap_queries or confidence >= 0.80:
+                logger.info("  -> Evidence sufficient — no further retrieval needed")
+                round_details.append({
+                    "round": round_num,
+                    "assess_time": assess_time,
+                    "fill_time": 0.0,
+                    "outcome": f"sufficient (confidence={confidence:.2f})",
+                    "new_sections": 0,
+                    "new_node_ids": [],
+                })
+                break
+
+            # Fill gaps with targeted sub-queries
+            gap_queries = gap_queries[:_MAX_GAP_QUERIES]
+            new_sections_added = 0
+            new_node_ids_this_round: list[str] = []
+
+            for gq in gap_queries:
+                if not isinstance(gq, str) or not gq.strip():
+                    continue
+
+                gq_norm = gq.strip().lower()
+                if gq_norm in executed_gaps:
+                    logger.info("  -> Skipping gap query (already executed): %s", gq[:80])
+                    continue
+                executed_gaps.add(gq_norm)
+                if SequenceMatcher(a=gq_norm, b=query_norm).ratio() > _GAP_QUERY_SIMILARITY_SKIP:
+                    logger.info("  -> Skipping gap query (restates original query): %s", gq[:80])
+                    continue
+
+                logger.info("  -> Gap query: '%s'", gq[:80])
+
+                try:
+                    with timer("fill") as stage:
+                        _, gap_sections, _ = router.retrieve_for_subquery(gq.strip(), tree)
+
+                    gq_new = 0
+                    for gs in gap_sections:
+                        if bag.add(gs):
+                            new_sections_added += 1
+                            new_node_ids_this_round.append(gs.node_id)
+                            gq_new += 1
+
+                    logger.info(
+                        "    -> Gap query returned %d sections, %d new (%.1fs)",
+                        len(gap_sections),
+                        gq_new,
+                        stage.seconds,
+                    )
+                except Exception as e:
+                    logger.warning("Gap retrieval failed for '%s': %s", gq[:40], str(e))
+
+            fill_time = timer.timings.get("fill", 0.0)
+            round_time = timer.elapsed
+
+            round_details.append({
+                "round": round_num,
+                "assess_time": assess_time,
+                "fill_time": fill_time,
+                "total_time": round_time,
+                "outcome": f"gap_filled ({len(gap_queries)} queries)",
+                "new_sections": new_sections_added,
+                "new_node_ids": new_node_ids_this_round,
+                "missing_aspects": missing,
+                "gap_queries_used": gap_queries,
+            })
+
+            logger.info(
+                "  -> Round %d: added %d new sections (total: %d) — assess: %.1fs, fill: %.1fs, round: %.1fs",
+                round_num,
+                new_sections_added,
+                len(sections),
+                assess_time,
+                fill_time,
+                round_time,
+            )
+
+            # If no new sections were added, further rounds won't help
+            if new_sections_added == 0:
+                logger.info("  -> No new sections found — stopping reflection")
+                break
+
+        # ── Contribution Summary ──
+        final_section_count = len(sections)
+        final_token_count = bag.total_tokens
+        # Gap fills are only ever appended (deduped by the bag), so the added
+        # sections are exactly the tail past the initial list.
+        added_sections = sections[initial_section_count:]
+        added_node_ids = [s.node_id for s in added_sections]
+        added_tokens = final_token_count - initial_token_count
+
+        total_assess_time = sum(r["assess_time"] for r in round_details)
+        total_fill_time = sum(r.get("fill_time", 0) for r in round_details)
+        total_rounds = len(round_details)
+
+        logger.info("=" * 70)
+        logger.info("[Reflection Contribution Summary]")
+        logger.info(
+            "  Rounds: %d | Assess LLM time: %.1fs | Gap-fill time: %.1fs",
+            total_rounds,
+            total_assess_time,
+            total_fill_time,
+        )
+        logger.info(
+            "  Sections: %d -> %d (+%d new)",
+            initial_section_count,
+            final_section_count,
+            len(added_node_ids),
+        )
+        logger.info(
+            "  Tokens: %d -> %d (+%d new, %.1f%% increase)",
+            initial_token_count,
+            final_token_count,
+            added_tokens,
+            (added_tokens / initial_token_count * 100) if initial_token_count > 0 else 0,
+        )
+        if added_node_ids:
+            logger.info("  New node IDs from reflection: %s", sorted(added_node_ids))
+            for s in added_sections:
+                logger.info("    -> %s: %s (%s, %d tokens)", s.node_id, s.title, s.page_range, s.token_count)
+        else:
+            logger.info("  ** Reflection added ZERO new sections — all time was overhead **")
+
+        for rd in round_details:
+            logger.info(
+                "  Round %d: %s | assess=%.1fs, fill=%.1fs | +%d sections %s",
+                rd["round"],
+                rd["outcome"],
+                rd["assess_time"],
+                rd.get("fill_time", 0),
+                rd["new_sections"],
+                rd.get("new_node_ids", []),
+            )
+        logger.info("=" * 70)
+
+        # Store contribution metadata on the sections for later analysis
+        # Tag each reflection-added section so we can check if it was cited
+        for s in added_sections:
+            s.source = "reflection_gap_fill"
+
+        return sections
+
+    def _assess(
+        self,
+        query: Query,
+        section_summaries: str,
+        section_count: int,
+        total_tokens: int,
+    ) -> dict | None:
+        """
+        Ask the LLM to assess whether evidence is sufficient.
+
+        Returns parsed JSON assessment or None on failure.
+        """
+        system_prompt = self._system_prompt
+        user_msg = format_prompt(
+            self._user_template,
+            query_text=query.text,
+            query_type=query.query_type.value,
+            key_terms=", ".join(query.key_terms) if query.key_terms else "none",
+            section_count=str(section_count),
+            total_tokens=str(total_tokens),
+            section_summaries=section_summaries,
+        )
+
+        logger.info(
+            "  -> Reflection prompt: ~%d tokens (%d sections)",
+            estimate_tokens(system_prompt) + estimate_tokens(user_msg),
+            section_count,
+        )
+
+        try:
+            # Optimized mode: use tournament-verified model for this stage
+            settings = get_settings()
+            opt = settings.optimization
+            if get_active_retrieval_mode() == "optimized":
+                _model = opt.stage_model_reflect
+                _effort = opt.stage_effort_reflect
+            else:
+                _model = None  # default (gpt-5.2)
+                _effort = "low"
+
+            result = self._llm.chat_json(
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_msg},
+                ],
+                model=_model,
+                max_tokens=1024,
+                reasoning_effort=_effort,
+            )
+            return result if isinstance(result, dict) else None
+        except Exception as e:
+            logger.warning("Reflection assessment failed: %s", str(e))
+            return None
+
+    @staticmethod
+    def _build_summaries(
+        sections: list[RetrievedSection], initial_count: Optional[int] = None
+    ) -> str:
+        """
+        Build concise section summaries for the reflection LLM.
+
+        Includes titles, page ranges, and a brief text snippet so the
+        reflector can assess whether specific information is present.
+
+        The prompt is bounded regardless of section count: snippets shrink
+        as sections grow (total ~_SUMMARY_CHAR_BUDGET chars), and only the
+        first _MAX_SUMMARY_SECTIONS sections are listed — direct retrieval
+        ahead of earlier gap fills, larger sections first.
+
+        Gap fills are only tagged once reflection finishes, so they are told
+        apart by position: sections past initial_count (all of them are
+        direct when it is None) were added by earlier rounds.
+        """
+        per_section_budget = min(
+            _MAX_SNIPPET_CHARS,
+            max(_MIN_SNIPPET_CHARS, _SUMMARY_CHAR_BUDGET // max(len(sections), 1)),
+        )
+        if initial_count is None:
+            initial_count = len(sections)
+        order = sorted(
+            range(len(sections)),
+            key=lambda i: (i >= initial_count, -sections[i].token_count),
+        )
+        shown = [sections[i] for i in order[:_MAX_SUMMARY_SECTIONS]]
+
+        lines: list[str] = [""] * len(shown)
+        for i, s in enumerate(shown):
+            snippet = s.text[:per_section_budget].translate(_NL_TRANS).strip()
+            if len(s.text) > per_section_budget:
+                snippet += "..."
+            lines[i] = _SUMMARY_FMT.format(
+                idx=i + 1,
+                title=s.title,
+                pg=s.page_range,
+                tok=s.token_count,
+                src=f" [{s.source}]" if s.source != "direct" else "",
+                snip=snippet,
+            )
+        if len(sections) > len(shown):
+            lines.append(f"--- truncated: {len(sections) - len(shown)} more sections ---")
+        return "\n".join(lines)
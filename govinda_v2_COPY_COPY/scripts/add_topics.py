@@ -1,150 +1,314 @@
-"""
-One-time script to add topic/keyword tags to all nodes in an existing document tree.
-
-Usage:
-    python -m govinda_v2_COPY_COPY.scripts.add_topics [doc_id]
-
-If no doc_id is provided, processes all available trees.
-"""
-
-from __future__ import annotations
-
-import json
-import logging
-import sys
-from pathlib import Path
-
-# Add project root to path
-project_root = Path(__file__).resolve().parents[2]
-sys.path.insert(0, str(project_root))
-
-from config.settings import get_settings
-from models.document import DocumentTree
-from tree.tree_store import TreeStore
-from utils.llm_client import LLMClient
-
-logging.basicConfig(level=logging.INFO, format="%(levelname)s | %(message)s")
-logger = logging.getLogger(__name__)
-
-TOPIC_PROMPT_SYSTEM = """\
-You are an expert in Indian banking regulation (RBI).
-
-TASK: For each document section, generate 3-8 keyword topic tags that capture
-the key regulatory concepts, entity types, procedures, and terms in this section.
-
-These tags will be used for fast query matching — an officer searching for
-"V-CIP requirements" should match nodes tagged with "v-cip".
-
-RULES:
-- Tags should be lowercase keyword phrases (1-3 words each)
-- Use precise regulatory terms (e.g., "cdd", "edd", "ovd", "v-cip", "pep", "aadhaar e-kyc")
-- Include entity types the section applies to (e.g., "individuals", "legal entities", "trusts")
-- Include specific procedures or concepts (e.g., "beneficial owner", "risk categorisation")
-- Include important thresholds or limits as tags when relevant (e.g., "small account limits")
-- 3-8 tags per node — be selective, not exhaustive
-
-OUTPUT FORMAT (JSON):
-{
-  "topics": [
-    {"node_id": "0001", "tags": ["applicability", "commercial banks", "overseas branches"]}
-  ]
-}
-"""
-
-TOPIC_PROMPT_USER = """\
-Here are the document sections. For each, generate topic tags based on the
-title and summary:
-
-{sections_text}
-
-Return JSON with the "topics" array.
-"""
-
-
-def generate_topics_for_tree(tree: DocumentTree, llm: LLMClient) -> int:
-    """Generate topic tags for all nodes in the tree. Returns count of enriched nodes."""
-    all_nodes = []
-    for node in tree.structure:
-        _collect_all(node, all_nodes)
-
-    logger.info("Generating topics for %d nodes", len(all_nodes))
-
-    batch_size = 10  # Larger batches since we only send title+summary
-    enriched = 0
-
-    for i in range(0, len(all_nodes), batch_size):
-        batch = all_nodes[i : i + batch_size]
-
-        sections_parts = []
-        for node in batch:
-            summary = node.summary or "(no summary)"
-            sections_parts.append(
-                f"--- NODE {node.node_id}: {node.title} ({node.page_range_str}) ---\n"
-                f"Summary: {summary}"
-            )
-
-        sections_text = "\n\n".join(sections_parts)
-        user_msg = TOPIC_PROMPT_USER.format(sections_text=sections_text)
-
-        try:
-            result = llm.chat_json(
-                messages=[
-                    {"role": "system", "content": TOPIC_PROMPT_SYSTEM},
-                    {"role": "user", "content": user_msg},
-                ],
-                max_tokens=2000,
-            )
-
-            node_map = {n.node_id: n for n in batch}
-            for item in result.get("topics", []):
-                nid = item.get("node_id", "")
-                tags = item.get("tags", [])
-                if nid in node_map:
-                    node_map[nid].topics = tags
-                    enriched += 1
-
-            logger.info("  Batch %d-%d: %d nodes enriched", i, i + len(batch), len(batch))
-
-        except Exception as e:
-            logger.error("  Batch %d-%d failed: %s", i, i + len(batch), e)
-
-    return enriched
-
-
-def _collect_all(node, result):
-    result.append(node)
-    for child in node.children:
-        _collect_all(child, result)
-
-
-def main():
-    settings = get_settings()
-    store = TreeStore()
-    llm = LLMClient()
-
-    doc_ids = sys.argv[1:] if len(sys.argv) > 1 else store.list_trees()
-
-    for doc_id in doc_ids:
-        logger.info("Processing %s", doc_id)
-        tree = store.load(doc_id)
-        if tree is None:
-            logger.error("Tree not found: %s", doc_id)
-            continue
-
-        count = generate_topics_for_tree(tree, llm)
-        logger.info("Enriched %d nodes with topics", count)
-
-        # Save updated tree
-        store.save(tree)
-        logger.info("Saved updated tree: %s", doc_id)
-
-        # Regenerate index
-        index = tree.to_index()
-        index_path = settings.storage.trees_dir / f"{doc_id}_index.json"
-        with open(index_path, "w", encoding="utf-8") as f:
-            json.dump(index, f, indent=2, ensure_ascii=False)
-        logger.info("Saved updated index: %s", index_path.name)
-
-
-if __name__ == "__main__":
-    main()
+"""
+One-time script to add topic/keyword tags to all nodes in an existing document tree.
+
+Usage:
+    python -m govinda_v2_COPY_COPY.scripts.add_topics [doc_id]
+
+If no doc_id is provided, processes all available trees.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Optional
+
+# Add project root to path
+project_root = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(project_root))
+
+from config.settings import get_settings
+from models.document import DocumentTree
+from tree.tree_store import TreeStore
+from utils.llm_client import LLMClient
+from utils.text_utils import estimate_tokens, load_tokenizer
+
+logging.basicConfig(level=logging.INFO, format="%(levelname)s | %(message)s")
+logger = logging.getLogger(__name__)
+
+TOPIC_PROMPT_SYSTEM = """\
+You are an expert in Indian banking regulation (RBI).
+
+TASK: For each document section, generate 3-8 keyword topic tags that capture
+the key regulatory concepts, entity types, procedures, and terms in this section.
+
+These tags will be used for fast query matching — an officer searching for
+"V-CIP requirements" should match nodes tagged with "v-cip".
+
+RULES:
+- Tags should be lowercase keyword phrases (1-3 words each)
+- Use precise regulatory terms (e.g., "cdd", "edd", "ovd", "v-cip", "pep", "aadhaar e-kyc")
+- Include entity types the section applies to (e.g., "individuals", "legal entities", "trusts")
+- Include specific procedures or concepts (e.g., "beneficial owner", "risk categorisation")
+- Include important thresholds or limits as tags when relevant (e.g., "small account limits")
+- 3-8 tags per node — be selective, not exhaustive
+
+OUTPUT FORMAT (JSON):
+{
+  "topics": [
+    {"node_id": "0001", "tags": ["applicability", "commercial banks", "overseas branches"]}
+  ]
+}
+"""
+
+TOPIC_PROMPT_USER = """\
+Here are the document sections. For each, generate topic tags based on the
+title and summary:
+
+{sections_text}
+
+Return JSON with the "topics" array.
+"""
+
+# Batch packing limits — batches are filled greedily by estimated tokens
+# rather than a fixed node count, so short summaries share a call while
+# long ones don't overflow the output budget (truncated JSON drops nodes).
+BATCH_INPUT_TOKEN_LIMIT = 8000
+BATCH_OUTPUT_TOKEN_LIMIT = 1800
+NODE_PROMPT_OVERHEAD_TOKENS = 20  # "--- NODE ...---" framing per node
+OUTPUT_TOKENS_PER_NODE = 80  # ~3-8 tags + node_id per node in the response
+
+# Concurrent batch LLM calls — keep within provider rate limits
+MAX_PARALLEL_BATCHES = 8
+
+
+def generate_topics_for_tree(
+    tree: DocumentTree,
+    llm: LLMClient,
+    cache_path: Optional[Path] = None,
+    on_batch_done: Optional[Callable[[], None]] = None,
+) -> int:
+    """
+    Generate topic tags for all nodes in the tree. Returns count of enriched nodes.
+
+    When cache_path is given, tags from a previous (possibly interrupted) run
+    are hydrated from it and those nodes skip the LLM; every successful batch
+    is appended to the cache before on_batch_done (e.g. a tree save) runs, so
+    re-runs resume where the last one stopped. Each entry records a
+    fingerprint of the node's prompt text (title, pages, summary), so nodes
+    changed by a re-ingest or new summaries are regenerated, not hydrated.
+    """
+    all_nodes = []
+    for node in tree.structure:
+        _collect_all(node, all_nodes)
+
+    cached = _load_topic_cache(cache_path) if cache_path else {}
+    cached_topics: dict[str, dict] = {}
+    pending = []
+    enriched = 0
+    stale = 0
+    for node in all_nodes:
+        entry = cached.get(node.node_id)
+        if entry is not None and entry.get("fingerprint") == _fingerprint(node):
+            node.topics = entry["tags"]
+            cached_topics[node.node_id] = entry
+            enriched += 1
+        else:
+            stale += entry is not None
+            pending.append(node)
+
+    if enriched:
+        logger.info("Hydrated topics for %d nodes from cache", enriched)
+    if stale:
+        logger.warning("Discarded %d cached topic entries for changed nodes", stale)
+    logger.info("Generating topics for %d nodes", len(pending))
+
+    # Build every batch prompt up front; batches own disjoint node_ids so the
+    # LLM calls are independent and can run concurrently.
+    jobs: list[tuple[int, list, str]] = []
+    for i, batch in _pack_batches(pending):
+        sections_text = "\n\n".join(_format_node(node) for node in batch)
+        user_msg = TOPIC_PROMPT_USER.format(sections_text=sections_text)
+        jobs.append((i, batch, user_msg))
+
+    def _run_batch(user_msg: str) -> dict | list:
+        # chat_json retries with backoff on rate limits (429)
+        return llm.chat_json(
+            messages=[
+                {"role": "system", "content": TOPIC_PROMPT_SYSTEM},
+                {"role": "user", "content": user_msg},
+            ],
+            max_tokens=2000,
+        )
+
+    with ThreadPoolExecutor(max_workers=min(MAX_PARALLEL_BATCHES, max(len(jobs), 1))) as executor:
+        futures = {
+            executor.submit(_run_batch, user_msg): (i, batch)
+            for i, batch, user_msg in jobs
+        }
+
+        # Apply results on the main thread as each batch completes
+        for future in as_completed(futures):
+            i, batch = futures[future]
+            try:
+                result = future.result()
+
+                node_map = {n.node_id: n for n in batch}
+                unknown_ids = []
+                for item in result.get("topics", []):
+                    nid = item.get("node_id", "")
+                    tags = item.get("tags", [])
+                    if nid not in node_map:
+                        unknown_ids.append(nid)
+                        continue
+                    if not (isinstance(tags, list) and all(isinstance(t, str) for t in tags)):
+                        logger.warning("  Skipping malformed tags for %s: %r", nid, tags)
+                        continue
+                    node_map[nid].topics = tags
+                    cached_topics[nid] = {
+                        "fingerprint": _fingerprint(node_map[nid]),
+                        "tags": tags,
+                    }
+                    enriched += 1
+
+                if unknown_ids:
+                    logger.debug("  Batch dropped tags for unknown node_ids: %s", unknown_ids)
+                logger.info("  Batch %d-%d: %d nodes enriched", i, i + len(batch), len(batch))
+
+                if cache_path:
+                    _write_topic_cache(cache_path, cached_topics)
+                if on_batch_done:
+                    on_batch_done()
+
+            except Exception as e:
+                logger.error("  Batch %d-%d failed: %s", i, i + len(batch), e)
+
+    return enriched
+
+
+def _fingerprint(node) -> str:
+    """Hash of the text a node's tags were generated from."""
+    return hashlib.sha256(_format_node(node).encode("utf-8")).hexdigest()[:16]
+
+
+def _load_topic_cache(path: Path) -> dict[str, dict]:
+    """
+    Load {node_id: {"fingerprint", "tags"}} from a previous run.
+
+    Missing/corrupt file → empty. Entries in another shape (e.g. bare tag
+    lists written before fingerprints) are dropped so those nodes re-run.
+    """
+    if not path.exists():
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning("Ignoring unreadable topic cache %s: %s", path.name, e)
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    entries = {
+        nid: entry
+        for nid, entry in data.items()
+        if isinstance(entry, dict) and isinstance(entry.get("tags"), list)
+    }
+    if len(entries) < len(data):
+        logger.warning(
+            "Ignoring %d topic cache entries without a fingerprint in %s",
+            len(data) - len(entries),
+            path.name,
+        )
+    return entries
+
+
+def _write_topic_cache(path: Path, topics: dict[str, dict]) -> None:
+    """Atomically write {node_id: {"fingerprint", "tags"}} (tmp file + os.replace)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(topics, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def _format_node(node) -> str:
+    summary = node.summary or "(no summary)"
+    return (
+        f"--- NODE {node.node_id}: {node.title} ({node.page_range_str}) ---\n"
+        f"Summary: {summary}"
+    )
+
+
+def _pack_batches(all_nodes: list) -> list[tuple[int, list]]:
+    """
+    Greedily pack nodes into batches by estimated prompt + response tokens.
+
+    Returns a list of (start_index, batch) tuples.
+    """
+    batches: list[tuple[int, list]] = []
+    batch: list = []
+    batch_start = 0
+    batch_input_tokens = 0
+
+    for idx, node in enumerate(all_nodes):
+        node_tokens = (
+            estimate_tokens(f"{node.title} {node.summary or ''}")
+            + NODE_PROMPT_OVERHEAD_TOKENS
+        )
+        if batch and (
+            batch_input_tokens + node_tokens > BATCH_INPUT_TOKEN_LIMIT
+            or (len(batch) + 1) * OUTPUT_TOKENS_PER_NODE > BATCH_OUTPUT_TOKEN_LIMIT
+        ):
+            batches.append((batch_start, batch))
+            batch = []
+            batch_start = idx
+            batch_input_tokens = 0
+        batch.append(node)
+        batch_input_tokens += node_tokens
+
+    if batch:
+        batches.append((batch_start, batch))
+    return batches
+
+
+def _collect_all(node, result):
+    result.append(node)
+    for child in node.children:
+        _collect_all(child, result)
+
+
+def main():
+    settings = get_settings()
+    # Count tokens in the same units as the API and ingestion
+    if not load_tokenizer():
+        logger.warning("Tokenizer unavailable, using 4-chars-per-token estimates")
+    store = TreeStore()
+    llm = LLMClient()
+
+    doc_ids = sys.argv[1:] if len(sys.argv) > 1 else store.list_trees()
+
+    for doc_id in doc_ids:
+        logger.info("Processing %s", doc_id)
+        tree = store.load(doc_id)
+        if tree is None:
+            logger.error("Tree not found: %s", doc_id)
+            continue
+
+        count = generate_topics_for_tree(
+            tree,
+            llm,
+            cache_path=settings.storage.cache_dir / f"topics_{doc_id}.json",
+            # Persist partial progress so a crash mid-run loses at most one batch
+            on_batch_done=lambda: store.save(tree),
+        )
+        logger.info("Enriched %d nodes with topics", count)
+
+        # Save updated tree
+        store.save(tree)
+        logger.info("Saved updated tree: %s", doc_id)
+
+        # Regenerate index
+        index = tree.to_index()
+        index_path = settings.storage.trees_dir / f"{doc_id}_index.json"
+        with open(index_path, "w", encoding="utf-8") as f:
+            json.dump(index, f, indent=2, ensure_ascii=False)
+        logger.info("Saved updated index: %s", index_path.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""
+One-off migration for the `conversations` collection.
+
+Backfills `last_message_preview` on conversations saved before it existed
+and converts ISO-string `updated_at` values to BSON Dates. Reads handle
+both old shapes, so this is safe to run at any time and is idempotent.
+
+Usage (from the project root):
+    python scripts/migrate_conversations.py
+"""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+# Make project root importable when run directly as a script
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from tree.conversation_store import ConversationStore  # noqa: E402
+
+
+def main() -> int:
+    store = ConversationStore()
+    backfilled = store.backfill_previews()
+    print(f"[migrate] Backfilled last_message_preview on {backfilled} conversation(s).")
+    converted = store.migrate_updated_at()
+    print(f"[migrate] Converted updated_at to Date on {converted} conversation(s).")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
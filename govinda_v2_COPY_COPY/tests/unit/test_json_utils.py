@@ -0,0 +1,49 @@
+"""
+Unit tests for JSON serialization helpers
+"""
+
+import json
+
+import pytest
+from utils import json_utils
+
+
+class TestDumps:
+    """Test dumps/dumps_bytes with and without orjson."""
+
+    @pytest.mark.parametrize("use_orjson", [True, False])
+    def test_round_trip(self, monkeypatch, use_orjson):
+        """Test that output parses back to the same payload."""
+        if not use_orjson:
+            monkeypatch.setattr(json_utils, "orjson", None)
+        payload = {"event": "complete", "result": {"items": [1, 2.5, None], "name": "KYC – ऋण"}}
+
+        assert json.loads(json_utils.dumps(payload)) == payload
+        assert json.loads(json_utils.dumps_bytes(payload).decode("utf-8")) == payload
+
+    def test_non_string_keys_fall_back_to_stdlib(self):
+        """Test that payloads orjson rejects still serialize."""
+        assert json.loads(json_utils.dumps({1: "a"})) == {"1": "a"}
+
+
+class TestLoads:
+    """Test loads with and without orjson."""
+
+    @pytest.mark.parametrize("use_orjson", [True, False])
+    def test_parses_str_and_bytes(self, monkeypatch, use_orjson):
+        """Test that text and UTF-8 bytes both parse."""
+        if not use_orjson:
+            monkeypatch.setattr(json_utils, "orjson", None)
+        text = '{"answer_text": "KYC – ऋण", "citations": [1, 2.5, null]}'
+
+        assert json_utils.loads(text) == json.loads(text)
+        assert json_utils.loads(text.encode("utf-8")) == json.loads(text)
+
+    @pytest.mark.parametrize("use_orjson", [True, False])
+    def test_bad_input_raises_stdlib_error(self, monkeypatch, use_orjson):
+        """Test that callers can keep catching json.JSONDecodeError."""
+        if not use_orjson:
+            monkeypatch.setattr(json_utils, "orjson", None)
+
+        with pytest.raises(json.JSONDecodeError):
+            json_utils.loads('{"a": 1,')
@@ -0,0 +1,484 @@
+"""
+Unit tests for LLM client JSON helpers
+"""
+
+import asyncio
+import json
+
+import pytest
+from openai import APIConnectionError
+from unittest.mock import AsyncMock, Mock
+from utils.llm_client import LLMClient, _JsonObjectScanner, _retry_delay
+
+
+def _response(text, status="completed"):
+    return Mock(output_text=text, status=status, usage=Mock(input_tokens=3, output_tokens=4))
+
+
+@pytest.fixture(autouse=True)
+def _empty_prompt_cache():
+    LLMClient._prompt_cache.clear()
+    yield
+    LLMClient._prompt_cache.clear()
+
+
+class TestJsonObjectScanner:
+    """Test incremental top-level object detection over streamed chunks."""
+
+    def test_returns_end_offset_when_object_closes(self):
+        """Test that the offset is reported in the chunk that closes the object."""
+        scanner = _JsonObjectScanner()
+
+        assert scanner.feed('{"sufficient": false, ') is None
+        assert scanner.feed('"gap_queries": ["a"]') is None
+        end = scanner.feed('}\n\n')
+
+        assert json.loads(scanner.text[:end]) == {"sufficient": False, "gap_queries": ["a"]}
+
+    def test_braces_inside_strings_are_ignored(self):
+        """Test that braces and escaped quotes inside values do not close the object."""
+        scanner = _JsonObjectScanner()
+
+        assert scanner.feed('{"a": "x}{\\"') is None
+        end = scanner.feed('", "b": {"c": 2}} extra')
+
+        assert json.loads(scanner.text[:end]) == {"a": 'x}{"', "b": {"c": 2}}
+
+    def test_incomplete_object_returns_none(self):
+        """Test that an unterminated object never reports an end."""
+        scanner = _JsonObjectScanner()
+
+        assert scanner.feed('{"a": [1, 2') is None
+        assert scanner.text == '{"a": [1, 2'
+
+
+class TestChat:
+    """Test the sync chat entry points."""
+
+    def test_chat_and_chat_with_status_share_one_call_path(self):
+        """Test that both entry points send the same request and count usage once each."""
+        client = LLMClient(api_key="test")
+        client._client = Mock()
+        client._client.responses.create.return_value = _response("cut", status="incomplete")
+        messages = [{"role": "user", "content": "q"}]
+
+        assert client.chat(messages, json_mode=True) == "cut"
+        assert client.chat_with_status(messages, json_mode=True) == ("cut", True)
+
+        first, second = client._client.responses.create.call_args_list
+        assert first.kwargs == second.kwargs
+        assert client.get_usage_summary()["total_calls"] == 2
+
+    def test_request_kwargs_reuse_template_per_call_shape(self):
+        """Test that per-call fields stay separate while the fixed part is cached."""
+        client = LLMClient(api_key="test")
+        first, _ = client._responses_kwargs([{"role": "user", "content": "a"}], "m", None, 10, True, None)
+        second, _ = client._responses_kwargs([{"role": "user", "content": "b"}], "m", 0.7, 20, True, "low")
+
+        assert first["input"] != second["input"]
+        assert (first["max_output_tokens"], second["max_output_tokens"]) == (10, 20)
+        assert "temperature" not in first
+        assert first["text"] is second["text"]
+        assert first["reasoning"] == {"effort": "low"}
+
+    def test_temperature_sent_only_without_reasoning(self):
+        """Test that temperature falls back to the setting when effort is none."""
+        client = LLMClient(api_key="test")
+
+        kwargs, effort = client._responses_kwargs([], "m", None, 10, False, "none")
+
+        assert effort == "none"
+        assert kwargs["temperature"] == client._settings.llm.temperature
+        assert "text" not in kwargs
+
+
+class TestPromptCache:
+    """Test opt-in deduplication of identical prompts."""
+
+    @staticmethod
+    def _client(monkeypatch, size=8):
+        client = LLMClient(api_key="test")
+        client._client = Mock()
+        client._client.responses.create.return_value = _response("answer")
+        monkeypatch.setattr(client._settings.llm, "prompt_cache_size", size)
+        return client
+
+    def test_identical_prompt_skips_api_but_counts_usage(self, monkeypatch):
+        """Test that an opted-in repeat is served from cache and still tracked."""
+        client = self._client(monkeypatch)
+        messages = [{"role": "user", "content": "q"}]
+
+        assert client.chat(messages, cache=True) == "answer"
+        assert client.chat_with_status(messages, cache=True) == ("answer", False)
+
+        client._client.responses.create.assert_called_once()
+        summary = client.get_usage_summary()
+        assert summary["total_calls"] == 2
+        assert summary["total_input_tokens"] == 6
+
+    def test_calls_without_opt_in_always_reach_api(self, monkeypatch):
+        """Test that plain calls (health checks, benchmarks) are never cached."""
+        client = self._client(monkeypatch)
+        messages = [{"role": "user", "content": "Reply with exactly: OK"}]
+
+        client.chat(messages)
+        client.chat(messages)
+
+        assert client._client.responses.create.call_count == 2
+        assert len(LLMClient._prompt_cache) == 0
+
+    def test_temperature_bypasses_cache(self, monkeypatch):
+        """Test that sampled calls stay free to differ even with cache=True."""
+        client = self._client(monkeypatch)
+        messages = [{"role": "user", "content": "q"}]
+
+        client.chat(messages, temperature=0.7, reasoning_effort="none", cache=True)
+        client.chat(messages, temperature=0.7, reasoning_effort="none", cache=True)
+
+        assert client._client.responses.create.call_count == 2
+
+    def test_disabled_by_default(self):
+        """Test that the default size of 0 turns caching off."""
+        client = LLMClient(api_key="test")
+        client._client = Mock()
+        client._client.responses.create.return_value = _response("answer")
+
+        client.chat([{"role": "user", "content": "q"}], cache=True)
+        client.chat([{"role": "user", "content": "q"}], cache=True)
+
+        assert client._client.responses.create.call_count == 2
+
+    def test_different_request_shape_misses(self, monkeypatch):
+        """Test that json_mode and effort are part of the key."""
+        client = self._client(monkeypatch)
+        messages = [{"role": "user", "content": "q"}]
+
+        client.chat(messages, cache=True)
+        client.chat(messages, json_mode=True, cache=True)
+        client.chat(messages, reasoning_effort="high", cache=True)
+
+        assert client._client.responses.create.call_count == 3
+
+    def test_unparseable_json_is_not_served_again(self, monkeypatch):
+        """Test that chat_json retries reach the API after a bad answer."""
+        client = self._client(monkeypatch)
+        client._client.responses.create.side_effect = [
+            _response("not json at all"),
+            _response('{"ok": true}'),
+        ]
+
+        result = client.chat_json([{"role": "user", "content": "q"}], cache=True)
+
+        assert result == {"ok": True}
+        assert client._client.responses.create.call_count == 2
+
+    def test_cache_size_bound(self, monkeypatch):
+        """Test LRU eviction at the configured size."""
+        client = self._client(monkeypatch, size=2)
+
+        for text in ("a", "b", "c"):
+            client.chat([{"role": "user", "content": text}], cache=True)
+
+        assert len(LLMClient._prompt_cache) == 2
+
+
+class TestAsyncChat:
+    """Test the async client path."""
+
+    def test_achat_json_parses_and_tracks_usage(self):
+        """Test that achat_json goes through the async client and counts tokens."""
+        client = LLMClient(api_key="test")
+        client._async_client = Mock()
+        client._async_client.responses.create = AsyncMock(return_value=_response('{"a": 1}'))
+
+        result = asyncio.run(client.achat_json([{"role": "user", "content": "q"}]))
+
+        assert result == {"a": 1}
+        assert client.get_usage_summary()["total_calls"] == 1
+        kwargs = client._async_client.responses.create.call_args.kwargs
+        assert kwargs["text"] == {"format": {"type": "json_object"}}
+
+    def test_achat_with_status_reports_truncation(self):
+        """Test that an incomplete response is flagged as truncated."""
+        client = LLMClient(api_key="test")
+        client._async_client = Mock()
+        client._async_client.responses.create = AsyncMock(
+            return_value=_response("partial", status="incomplete")
+        )
+
+        content, truncated = asyncio.run(
+            client.achat_with_status([{"role": "user", "content": "q"}])
+        )
+
+        assert (content, truncated) == ("partial", True)
+
+    def test_chat_json_many_preserves_order_and_isolates_errors(self):
+        """Test that results follow input order and a bad prompt does not sink the batch."""
+        client = LLMClient(api_key="test")
+
+        async def fake_achat_json(messages, **kwargs):
+            text = messages[0]["content"]
+            if text == "bad":
+                raise ValueError("no json")
+            await asyncio.sleep(0.01 if text == "slow" else 0)
+            return {"echo": text, "model": kwargs.get("model")}
+
+        client.achat_json = fake_achat_json
+        prompts = [[{"role": "user", "content": c}] for c in ("slow", "bad", "fast")]
+
+        results = asyncio.run(client.chat_json_many(prompts, concurrency=2, model="m"))
+
+        assert results[0] == {"echo": "slow", "model": "m"}
+        assert isinstance(results[1], ValueError)
+        assert results[2] == {"echo": "fast", "model": "m"}
+
+
+class TestSharedClients:
+    """Test process-wide reuse of the underlying OpenAI client."""
+
+    def test_same_key_shares_client_not_usage(self):
+        """Test that instances share the HTTP client but keep their own counters."""
+        first = LLMClient(api_key="shared-key")
+        second = LLMClient(api_key="shared-key")
+        other = LLMClient(api_key="other-key")
+
+        first._track_usage(Mock(usage=Mock(input_tokens=5, output_tokens=1)))
+
+        assert first._client is second._client
+        assert first._client is not other._client
+        assert second.get_usage_summary()["total_calls"] == 0
+
+
+class TestBatch:
+    """Test Batch API submission and result collection."""
+
+    def test_submit_batch_writes_jsonl_requests(self):
+        """Test that each prompt becomes one /v1/responses line keyed by index."""
+        client = LLMClient(api_key="test")
+        client._client = Mock()
+        client._client.files.create.return_value = Mock(id="file-1")
+        client._client.batches.create.return_value = Mock(id="batch-1")
+
+        batch_id = client.submit_batch(
+            [[{"role": "user", "content": "a"}], [{"role": "user", "content": "b"}]]
+        )
+
+        assert batch_id == "batch-1"
+        _, payload = client._client.files.create.call_args.kwargs["file"]
+        lines = [json.loads(line) for line in payload.decode().splitlines()]
+        assert [line["custom_id"] for line in lines] == ["0", "1"]
+        assert lines[1]["body"]["input"] == [{"role": "user", "content": "b"}]
+        assert client._client.batches.create.call_args.kwargs["endpoint"] == "/v1/responses"
+
+    def test_fetch_batch_orders_results_by_custom_id(self):
+        """Test that output lines are parsed back into submission order."""
+        def line(custom_id, text):
+            return json.dumps({
+                "custom_id": custom_id,
+                "response": {"status_code": 200, "body": {
+                    "output": [{"type": "message", "content": [{"type": "output_text", "text": text}]}],
+                    "usage": {"input_tokens": 2, "output_tokens": 1},
+                }},
+            })
+
+        client = LLMClient(api_key="test")
+        client._client = Mock()
+        client._client.batches.retrieve.return_value = Mock(
+            status="completed", output_file_id="out-1", request_counts=Mock(total=3),
+        )
+        client._client.files.content.return_value = Mock(
+            text="\n".join([line("2", '{"n": 2}'), line("0", '{"n": 0}'), line("1", "not json")])
+        )
+
+        results = client.fetch_batch("batch-1")
+
+        assert results == [{"n": 0}, None, {"n": 2}]
+        assert client.get_usage_summary()["total_input_tokens"] == 6
+
+
+class TestRetryDelay:
+    """Test backoff delay selection for retryable API errors."""
+
+    def test_retry_after_ms_header_wins(self):
+        """Test that retry-after-ms is honoured (plus sub-second jitter)."""
+        error = Mock(response=Mock(headers={"retry-after-ms": "1500", "retry-after": "9"}))
+
+        assert 1.5 <= _retry_delay(error, attempt=0) < 2.5
+
+    def test_retry_after_seconds_header(self):
+        """Test that retry-after in seconds is used when no ms header is sent."""
+        error = Mock(response=Mock(headers={"retry-after": "4"}))
+
+        assert 4.0 <= _retry_delay(error, attempt=0) < 5.0
+
+    def test_exponential_backoff_without_headers(self):
+        """Test that missing or non-numeric headers fall back to jittered backoff."""
+        error = Mock(response=Mock(headers={"retry-after": "Wed, 21 Oct 2026 07:28:00 GMT"}))
+
+        assert 4.0 <= _retry_delay(error, attempt=2) < 5.0
+
+
+class TestChatJsonRetries:
+    """Test chat_json's retry count handling."""
+
+    def test_explicit_zero_retries_is_honoured(self):
+        """Test that retries=0 skips the json_mode attempts instead of using the default."""
+        client = LLMClient(api_key="test")
+        client._client = Mock()
+        client._client.responses.create.return_value = _response('{"ok": true}')
+
+        assert client.chat_json([{"role": "user", "content": "q"}], retries=0) == {"ok": True}
+
+        client._client.responses.create.assert_called_once()
+        assert "text" not in client._client.responses.create.call_args.kwargs
+
+
+class TestExtractJson:
+    """Test JSON extraction from free-form model output."""
+
+    def test_object_embedded_in_prose(self):
+        """Test that leading and trailing prose around an object is ignored."""
+        text = 'Here you go: {"a": "x}{", "b": [1, 2]} Hope that helps {.'
+
+        assert LLMClient._extract_json(text) == {"a": "x}{", "b": [1, 2]}
+
+    def test_trailing_comma_is_tolerated(self):
+        """Test that a trailing comma before a closing brace is cleaned up."""
+        assert LLMClient._extract_json('Result: {"a": [1, 2,], "b": 3,}') == {"a": [1, 2], "b": 3}
+
+    def test_skips_unparseable_opener(self):
+        """Test that a stray brace before the real object is skipped."""
+        assert LLMClient._extract_json('set {x} then {"ok": true}') == {"ok": True}
+
+    def test_array_when_no_object(self):
+        """Test that a bare array is extracted when there is no object."""
+        assert LLMClient._extract_json("ids: [1, 2, 3] done") == [1, 2, 3]
+
+    def test_no_json_raises(self):
+        """Test that text without JSON raises ValueError."""
+        with pytest.raises(ValueError):
+            LLMClient._extract_json("no json here")
+
+
+class TestRepairTruncatedJson:
+    """Test salvage of answers cut off by max_output_tokens."""
+
+    def test_closes_open_string_and_brackets(self):
+        """Test that a cut inside a nested string value is closed deterministically."""
+        text = '{"answer_text": "Banks must", "citations": [{"node_id": "n1", "excerpt": "The RE sha'
+
+        result = LLMClient._repair_truncated_json(text)
+
+        assert result["answer_text"] == "Banks must"
+        assert result["citations"] == [{"node_id": "n1", "excerpt": "The RE sha"}]
+
+    def test_drops_dangling_comma(self):
+        """Test that a trailing comma after the last complete value is removed."""
+        result = LLMClient._repair_truncated_json('{"answer_text": "done", "citations": [],')
+
+        assert result == {"answer_text": "done", "citations": []}
+
+    def test_falls_back_to_closers_when_cut_inside_key(self):
+        """Test that a cut mid-key is repaired by the closer search."""
+        result = LLMClient._repair_truncated_json('{"answer_text": "partial", "citat')
+
+        assert result == {"answer_text": "partial", "citat": []}
+
+    def test_cut_inside_key_keeps_complete_elements(self):
+        """Test that a cut inside a key keeps every complete element and pair before it."""
+        text = (
+            '{"answer_text": "x", "citations": [{"citation_id": "[1]", "node_id": "n1"}, '
+            '{"citation_id": "[2]", "node_'
+        )
+
+        result = LLMClient._repair_truncated_json(text)
+
+        assert result == {
+            "answer_text": "x",
+            "citations": [
+                {"citation_id": "[1]", "node_id": "n1"},
+                {"citation_id": "[2]"},
+            ],
+        }
+
+    def test_requires_answer_text(self):
+        """Test that objects without answer_text are not returned."""
+        assert LLMClient._repair_truncated_json('{"other": "x') is None
+
+
+class TestChatJsonStreaming:
+    """Test the streaming JSON-with-status path."""
+
+    @staticmethod
+    def _client_with_events(events):
+        client = LLMClient(api_key="test")
+        stream = Mock()
+        stream.__iter__ = Mock(return_value=iter(events))
+        client._client = Mock()
+        client._client.responses.create.return_value = stream
+        return client, stream
+
+    @staticmethod
+    def _delta(text):
+        return Mock(type="response.output_text.delta", delta=text)
+
+    @staticmethod
+    def _final(status="completed", out=5):
+        return Mock(
+            type=f"response.{status}",
+            response=Mock(status=status, usage=Mock(input_tokens=10, output_tokens=out)),
+        )
+
+    def test_cuts_at_closing_brace_and_records_usage(self):
+        """Test that text after the object is ignored and final usage is still tracked."""
+        client, stream = self._client_with_events([
+            self._delta('{"answer_text": "ok", '),
+            self._delta('"citations": []}'),
+            self._delta("trailing"),
+            self._final(out=7),
+        ])
+
+        result, truncated = client.chat_json_streaming([{"role": "user", "content": "q"}])
+
+        assert result == {"answer_text": "ok", "citations": []}
+        assert truncated is False
+        assert client.get_usage_summary()["total_output_tokens"] == 7
+        assert client._client.responses.create.call_args.kwargs["stream"] is True
+        stream.close.assert_called_once()
+
+    def test_missing_final_event_estimates_usage(self):
+        """Test that a stream without a final event is not counted as zero tokens."""
+        client, _ = self._client_with_events([self._delta('{"answer_text": "ok"}')])
+
+        client.chat_json_streaming([{"role": "user", "content": "some question text"}])
+
+        summary = client.get_usage_summary()
+        assert summary["total_input_tokens"] > 0
+        assert summary["total_output_tokens"] > 0
+
+    def test_incomplete_stream_is_salvaged(self):
+        """Test that a max-token cut is reported and repaired."""
+        client, _ = self._client_with_events([
+            self._delta('{"answer_text": "Banks must verify'),
+            self._final(status="incomplete"),
+        ])
+
+        result, truncated = client.chat_json_streaming([{"role": "user", "content": "q"}])
+
+        assert truncated is True
+        assert result["answer_text"] == "Banks must verify"
+        assert client.get_usage_summary()["total_output_tokens"] == 5
+
+    def test_api_error_falls_back_to_non_streaming(self):
+        """Test that a stream failure is retried through chat_json_with_status."""
+        client = LLMClient(api_key="test")
+        client._client = Mock()
+        client._client.responses.create.side_effect = [
+            APIConnectionError(request=Mock()),
+            _response('{"answer_text": "ok"}'),
+        ]
+
+        result, truncated = client.chat_json_streaming([{"role": "user", "content": "q"}])
+
+        assert (result, truncated) == ({"answer_text": "ok"}, False)
+        assert "stream" not in client._client.responses.create.call_args.kwargs
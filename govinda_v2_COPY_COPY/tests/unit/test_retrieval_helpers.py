@@ -0,0 +1,294 @@
+"""
+Unit tests for retrieval pipeline helpers (section bookkeeping, reflection summaries)
+"""
+
+import pytest
+from unittest.mock import Mock
+from models.query import RetrievedSection, SectionBag
+from retrieval.retrieval_reflector import RetrievalReflector
+
+
+def _section(node_id, tokens=100, text="Some regulatory text", source="direct"):
+    return RetrievedSection(
+        node_id=node_id,
+        title=f"Section {node_id}",
+        text=text,
+        page_range="p.1",
+        source=source,
+        token_count=tokens,
+    )
+
+
+class TestSectionBag:
+    """Test SectionBag functionality."""
+
+    def test_initialization_from_sections(self):
+        """Test that ids and token totals are seeded from the wrapped list."""
+        sections = [_section("a", 100), _section("b", 250)]
+        bag = SectionBag(sections)
+
+        assert bag.sections is sections
+        assert bag.ids == {"a", "b"}
+        assert bag.total_tokens == 350
+        assert len(bag) == 2
+        assert "a" in bag
+        assert "c" not in bag
+
+    def test_add_updates_bookkeeping(self):
+        """Test that add appends in place and keeps ids/tokens in sync."""
+        sections = [_section("a", 100)]
+        bag = SectionBag(sections)
+
+        assert bag.add(_section("b", 50)) is True
+
+        assert [s.node_id for s in sections] == ["a", "b"]
+        assert bag.ids == {"a", "b"}
+        assert bag.total_tokens == 150
+
+    def test_add_skips_duplicates(self):
+        """Test that a node_id already present is not added twice."""
+        bag = SectionBag([_section("a", 100)])
+
+        assert bag.add(_section("a", 999)) is False
+
+        assert len(bag) == 1
+        assert bag.total_tokens == 100
+
+    def test_extend_within_budget_takes_fitting_prefix(self):
+        """Test that sections are accepted in order until the budget is hit."""
+        bag = SectionBag([_section("a", 100)])
+        extra = [_section("b", 200), _section("c", 300), _section("d", 10)]
+
+        accepted = bag.extend_within_budget(extra, budget=600)
+
+        assert accepted == 2
+        assert [s.node_id for s in bag.sections] == ["a", "b", "c"]
+        assert bag.total_tokens == 600
+
+    def test_extend_within_budget_skips_oversized(self):
+        """Test that a section too large to fit is skipped, not a cutoff."""
+        bag = SectionBag([_section("a", 100)])
+        extra = [_section("b", 200), _section("c", 900), _section("d", 250)]
+
+        accepted = bag.extend_within_budget(extra, budget=600)
+
+        assert accepted == 2
+        assert [s.node_id for s in bag.sections] == ["a", "b", "d"]
+        assert bag.total_tokens == 550
+
+    def test_extend_within_budget_ignores_duplicates(self):
+        """Test that already-present sections do not consume budget."""
+        bag = SectionBag([_section("a", 100)])
+        extra = [_section("a", 400), _section("b", 400), _section("b", 400)]
+
+        assert bag.extend_within_budget(extra, budget=500) == 1
+        assert [s.node_id for s in bag.sections] == ["a", "b"]
+        assert bag.total_tokens == 500
+
+    def test_extend_within_budget_over_budget(self):
+        """Test that nothing is added when the bag is already at budget."""
+        bag = SectionBag([_section("a", 500)])
+
+        assert bag.extend_within_budget([_section("b", 1)], budget=400) == 0
+        assert len(bag) == 1
+
+    def test_empty_bag(self):
+        """Test default construction."""
+        bag = SectionBag()
+
+        assert bag.sections == []
+        assert bag.ids == set()
+        assert bag.total_tokens == 0
+
+
+class TestBuildSummaries:
+    """Test RetrievalReflector._build_summaries prompt bounding."""
+
+    def test_small_section_list_keeps_full_preview(self):
+        """Test that a few sections keep the standard 150-char preview."""
+        sections = [_section("a", text="x" * 300), _section("b", text="short")]
+
+        summaries = RetrievalReflector._build_summaries(sections)
+
+        assert "x" * 150 + "..." in summaries
+        assert "Preview: short" in summaries
+        assert "truncated" not in summaries
+
+    def test_large_section_list_is_bounded(self):
+        """Test that snippets shrink and the list is capped for many sections."""
+        sections = [_section(str(i), tokens=i, text="y" * 500) for i in range(50)]
+
+        summaries = RetrievalReflector._build_summaries(sections)
+
+        assert summaries.count("Preview:") == 30
+        assert "--- truncated: 20 more sections ---" in summaries
+        # 4000 // 50 = 80 chars per snippet
+        assert "y" * 80 + "..." in summaries
+        assert "y" * 81 not in summaries
+
+    def test_largest_sections_listed_first(self):
+        """Test that sections are ordered by token count descending."""
+        sections = [_section("small", tokens=10), _section("big", tokens=900)]
+
+        summaries = RetrievalReflector._build_summaries(sections)
+
+        assert summaries.index("Section big") < summaries.index("Section small")
+
+    def test_gap_fills_listed_after_direct_sections(self):
+        """Test that sections past initial_count follow direct ones, even if larger."""
+        sections = [_section("direct", tokens=10), _section("gap", tokens=900)]
+
+        summaries = RetrievalReflector._build_summaries(sections, initial_count=1)
+
+        assert summaries.index("Section direct") < summaries.index("Section gap")
+
+
+class TestReflectAndFill:
+    """Test RetrievalReflector.reflect_and_fill gap-fill bookkeeping."""
+
+    def test_gap_fill_appends_new_sections_only(self):
+        """Test that gap fills dedup against existing sections and are tagged."""
+        from models.query import Query, QueryType
+
+        reflector = RetrievalReflector(llm=Mock())
+        reflector._assess = Mock(side_effect=[
+            {"sufficient": False, "confidence": 0.3, "gap_queries": ["gap"]},
+            {"sufficient": True, "confidence": 0.9, "gap_queries": []},
+        ])
+        router = Mock()
+        router.retrieve_for_subquery.return_value = (
+            None,
+            [_section("a", 100), _section("c", 40)],
+            None,
+        )
+        sections = [_section("a", 100), _section("b", 100)]
+        query = Query(text="q", query_type=QueryType.MULTI_HOP)
+
+        result = reflector.reflect_and_fill(query, sections, Mock(), router)
+
+        assert result is sections
+        assert [s.node_id for s in result] == ["a", "b", "c"]
+        assert result[2].source == "reflection_gap_fill"
+        assert result[0].source == "direct"
+
+    def test_repeated_gap_queries_run_once(self):
+        """Test that a gap query re-asked in round 2 is not re-executed."""
+        from models.query import Query, QueryType
+
+        reflector = RetrievalReflector(llm=Mock())
+        reflector._assess = Mock(side_effect=[
+            {"sufficient": False, "confidence": 0.3, "gap_queries": ["V-CIP requirements"]},
+            {"sufficient": False, "confidence": 0.3, "gap_queries": [" v-cip requirements "]},
+        ])
+        router = Mock()
+        router.retrieve_for_subquery.return_value = (None, [_section("c", 40)], None)
+        query = Query(text="What are the KYC rules?", query_type=QueryType.MULTI_HOP)
+
+        tree = Mock()
+
+        reflector.reflect_and_fill(query, [_section("a", 100), _section("b", 100)], tree, router)
+
+        router.retrieve_for_subquery.assert_called_once_with("V-CIP requirements", tree)
+
+    def test_gap_query_restating_original_is_skipped(self):
+        """Test that a gap query near-identical to the user query is skipped."""
+        from models.query import Query, QueryType
+
+        reflector = RetrievalReflector(llm=Mock())
+        reflector._assess = Mock(return_value={
+            "sufficient": False, "confidence": 0.3,
+            "gap_queries": ["What are the KYC rules"],
+        })
+        router = Mock()
+        query = Query(text="What are the KYC rules?", query_type=QueryType.MULTI_HOP)
+
+        reflector.reflect_and_fill(query, [_section("a", 100), _section("b", 100)], Mock(), router)
+
+        router.retrieve_for_subquery.assert_not_called()
+
+
+class TestSubqueryCache:
+    """Test StructuralRouter sub-query cache keying and gating."""
+
+    @staticmethod
+    def _router():
+        from retrieval.router import StructuralRouter
+
+        return StructuralRouter(llm=Mock())
+
+    @staticmethod
+    def _tree(node_count=10):
+        return Mock(doc_id="doc", node_count=node_count, total_pages=5)
+
+    def test_key_tracks_memory_state(self):
+        """Test that a different memory/avoid/reliability state changes the key."""
+        router = self._router()
+        tree = self._tree()
+        base = router._subquery_cache_key("KYC rules", tree)
+
+        router.set_memory_candidates(["n1"])
+        with_memory = router._subquery_cache_key("KYC rules", tree)
+        router.set_avoid_nodes(["n2"])
+        with_avoid = router._subquery_cache_key("KYC rules", tree)
+        router.set_reliability_scores({"n1": 0.9})
+        with_scores = router._subquery_cache_key("KYC rules", tree)
+
+        assert len({base, with_memory, with_avoid, with_scores}) == 4
+        router.reset_memory_state()
+        assert router._subquery_cache_key(" kyc RULES ", tree) == base
+
+    def test_key_tracks_tree_version(self):
+        """Test that a re-ingested tree with the same doc_id misses."""
+        router = self._router()
+
+        assert router._subquery_cache_key("q", self._tree(10)) != router._subquery_cache_key(
+            "q", self._tree(11)
+        )
+
+    def test_disabled_outside_optimized_mode(self, monkeypatch):
+        """Test that legacy mode never uses the cache."""
+        router = self._router()
+        monkeypatch.setattr(router._settings.optimization, "retrieval_mode", "legacy")
+
+        assert router._is_subquery_cache_enabled() is False
+
+
+class TestLocateMany:
+    """Test StructuralRouter concurrent locate error handling."""
+
+    @staticmethod
+    def _router(locate):
+        from retrieval.router import StructuralRouter
+
+        router = StructuralRouter(llm=Mock())
+        router._locator = Mock(locate=Mock(side_effect=locate))
+        return router
+
+    def test_expansion_failure_is_skipped(self):
+        """Test that a failed expanded query is dropped and the rest merged."""
+        from models.query import Query
+
+        def locate(q, tree, **kwargs):
+            if q.text == "expanded":
+                raise RuntimeError("boom")
+            return []
+
+        router = self._router(locate)
+        queries = [Query(text="original"), Query(text="expanded")]
+
+        assert router._locate_many(queries, Mock()) == []
+
+    def test_original_failure_is_raised(self):
+        """Test that a failure on the original query reaches the caller."""
+        from models.query import Query
+
+        def locate(q, tree, **kwargs):
+            if q.text == "original":
+                raise RuntimeError("boom")
+            return []
+
+        router = self._router(locate)
+        queries = [Query(text="original"), Query(text="expanded")]
+
+        with pytest.raises(RuntimeError, match="boom"):
+            router._locate_many(queries, Mock())
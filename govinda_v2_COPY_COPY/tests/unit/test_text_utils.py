@@ -0,0 +1,163 @@
+"""
+Unit tests for text utilities
+"""
+
+import pytest
+from unittest.mock import Mock
+from utils import text_utils
+from utils.text_utils import (
+    clean_pdf_text,
+    clean_pdf_text_many,
+    estimate_tokens,
+    truncate_text,
+    truncate_text_into,
+)
+
+
+class TestCleanPdfText:
+    """Test PDF text clean-up."""
+
+    def test_joins_hyphenated_line_breaks(self):
+        """Test that a word split across lines with a hyphen is rejoined."""
+        assert clean_pdf_text("regu-\n  lation applies") == "regulation applies"
+
+    def test_keeps_hyphen_not_at_line_break(self):
+        """Test that ordinary hyphens are untouched."""
+        assert clean_pdf_text("non-banking entity") == "non-banking entity"
+
+    def test_collapses_whitespace_and_blank_lines(self):
+        """Test that space runs and 3+ newlines are collapsed."""
+        text = "Para\tone   here\n\n\n\nPara two\xa0 end"
+
+        assert clean_pdf_text(text) == "Para one here\n\nPara two end"
+
+    def test_removes_isolated_page_numbers(self):
+        """Test that a page number on its own line is dropped."""
+        assert clean_pdf_text("end of page\n  17  \nnext page") == "end of page\nnext page"
+
+    def test_strips_lines(self):
+        """Test that each line and the whole text are trimmed."""
+        assert clean_pdf_text("  first  \n   second   ") == "first\nsecond"
+
+    def test_empty(self):
+        """Test that empty input returns an empty string."""
+        assert clean_pdf_text("") == ""
+
+
+class TestCleanPdfTextMany:
+    """Test batched page cleaning."""
+
+    def test_matches_per_page_cleaning(self):
+        """Test that batching gives the same result as cleaning each page."""
+        pages = [
+            "Header text  \n\n\n\nbody regu-\n",
+            "lation continues\n 12 \n",
+            "",
+            "\t last page -\n  ",
+        ]
+
+        assert clean_pdf_text_many(pages) == [clean_pdf_text(p) for p in pages]
+
+    def test_no_cross_page_hyphen_join(self):
+        """Test that a hyphen at the end of one page does not join the next."""
+        assert clean_pdf_text_many(["end of regu-\n", "lation"]) == ["end of regu-", "lation"]
+
+    def test_nul_in_page_falls_back(self):
+        """Test that pages containing the separator are still split correctly."""
+        assert clean_pdf_text_many(["a\x00b  c", "d"]) == ["a\x00b c", "d"]
+
+    def test_empty_list(self):
+        """Test that no pages gives no output."""
+        assert clean_pdf_text_many([]) == []
+
+
+class TestEstimateTokens:
+    """Test token estimation."""
+
+    def test_uses_encoder_when_available(self, monkeypatch):
+        """Test that the tokenizer count is used when tiktoken is present."""
+        enc = Mock()
+        enc.encode_ordinary.return_value = [1, 2, 3]
+        monkeypatch.setattr(text_utils, "_encoder", lambda: enc)
+
+        assert estimate_tokens("some text") == 3
+        enc.encode_ordinary.assert_called_once_with("some text")
+
+    def test_heuristic_fallback(self, monkeypatch):
+        """Test the 4-chars-per-token fallback without tiktoken."""
+        monkeypatch.setattr(text_utils, "_encoder", lambda: None)
+
+        assert estimate_tokens("x" * 40) == 10
+        assert estimate_tokens("ab") == 1
+
+    def test_empty(self):
+        """Test that empty text is zero tokens."""
+        assert estimate_tokens("") == 0
+
+
+class TestTruncateText:
+    """Test that truncation counts in the same units as estimate_tokens."""
+
+    @staticmethod
+    def _byte_encoder():
+        # One token per UTF-8 byte, so multi-byte chars span several tokens
+        enc = Mock()
+        enc.encode_ordinary.side_effect = lambda t: list(t.encode("utf-8"))
+        enc.decode_bytes.side_effect = bytes
+        return enc
+
+    def test_cuts_by_tokenizer_when_loaded(self, monkeypatch):
+        """Test that the kept prefix plus suffix fits the token budget."""
+        monkeypatch.setattr(text_utils, "_encoder", self._byte_encoder)
+
+        result = truncate_text("abcdefghij" * 10, 8)
+
+        assert result == "abcde..."
+        assert estimate_tokens(result) == 8
+
+    def test_split_multibyte_char_is_dropped(self, monkeypatch):
+        """Test that a cut inside a multi-byte char does not leave a broken char."""
+        monkeypatch.setattr(text_utils, "_encoder", self._byte_encoder)
+
+        assert truncate_text("aéééééé", 6) == "aé..."
+
+    def test_fitting_text_unchanged(self, monkeypatch):
+        """Test that text within budget is returned as is."""
+        monkeypatch.setattr(text_utils, "_encoder", self._byte_encoder)
+
+        assert truncate_text("short", 5) == "short"
+
+    def test_encodes_bounded_prefix(self, monkeypatch):
+        """Test that a long text is cut without encoding all of it."""
+        enc = self._byte_encoder()
+        monkeypatch.setattr(text_utils, "_encoder", lambda: enc)
+
+        assert truncate_text("abcdefghij" * 1000, 8) == "abcde..."
+        assert max(len(c.args[0]) for c in enc.encode_ordinary.call_args_list) == 64
+
+    def test_heuristic_without_tokenizer(self, monkeypatch):
+        """Test the 4-chars-per-token cut when no tokenizer is loaded."""
+        monkeypatch.setattr(text_utils, "_encoder", lambda: None)
+
+        assert truncate_text("x" * 50, 10) == "x" * 37 + "..."
+
+
+class TestTruncateTextInto:
+    """Test buffer-appending truncation."""
+
+    @pytest.mark.parametrize("text", ["short", "x" * 40, "y" * 41, "z" * 1000])
+    def test_matches_truncate_text(self, text):
+        """Test that the joined segments equal truncate_text output."""
+        buf = ["head:"]
+
+        truncate_text_into(buf, text, 10)
+
+        assert "".join(buf) == "head:" + truncate_text(text, 10)
+
+    def test_suffix_appended_as_own_segment(self):
+        """Test that a cut appends the prefix and suffix separately."""
+        buf = []
+
+        truncate_text_into(buf, "a" * 50, 10, suffix="[...]")
+
+        assert buf == ["a" * 35, "[...]"]
@@ -0,0 +1,71 @@
+"""
+Unit tests for stage timing helpers
+"""
+
+import pytest
+from datetime import datetime, timedelta, timezone
+from utils.timing import Timer, now_iso
+
+
+class TestTimer:
+    """Test Timer functionality."""
+
+    def test_stages_populate_shared_dict(self):
+        """Test that stage durations are written into the dict passed in."""
+        timings = {}
+        timer = Timer(timings)
+
+        with timer("classify"):
+            pass
+        with timer("locate") as stage:
+            pass
+
+        assert list(timings) == ["classify", "locate"]
+        assert timings["locate"] == stage.seconds
+        assert all(v >= 0.0 for v in timings.values())
+
+    def test_repeated_stage_accumulates(self):
+        """Test that re-entering a stage adds to its total."""
+        timer = Timer()
+
+        with timer("fill") as first:
+            pass
+        with timer("fill") as second:
+            pass
+
+        assert timer.timings["fill"] == pytest.approx(first.seconds + second.seconds)
+
+    def test_stage_recorded_on_exception(self):
+        """Test that a failing stage is still timed and the error propagates."""
+        timer = Timer()
+
+        with pytest.raises(ValueError):
+            with timer("read"):
+                raise ValueError("boom")
+
+        assert "read" in timer.timings
+
+    def test_elapsed_is_monotonic(self):
+        """Test that elapsed grows from timer creation."""
+        timer = Timer()
+        first = timer.elapsed
+
+        assert timer.elapsed >= first >= 0.0
+
+
+class TestNowIso:
+    """Test now_iso timestamp formatting."""
+
+    def test_matches_datetime_isoformat(self):
+        """Test that the string parses as an aware UTC datetime close to now."""
+        parsed = datetime.fromisoformat(now_iso())
+
+        assert parsed.tzinfo == timezone.utc
+        assert abs(datetime.now(timezone.utc) - parsed) < timedelta(seconds=5)
+
+    def test_always_has_microseconds(self):
+        """Test the fixed-width shape so string sorts stay chronological."""
+        value = now_iso()
+
+        assert len(value) == len("2024-01-01T00:00:00.000000+00:00")
+        assert value.endswith("+00:00")
@@ -10,7 +10,7 @@ import logging
 from typing import Optional
 
 from models.actionable import ActionablesResult
-from utils.mongo import get_db
+from utils.mongo import get_collection
 
 logger = logging.getLogger(__name__)
 
@@ -21,7 +21,7 @@ class ActionableStore:
     """MongoDB CRUD for actionable extraction results."""
 
     def __init__(self) -> None:
-        self._collection = get_db()[COLLECTION]
+        self._collection = get_collection(COLLECTION)
 
     def save(self, result: ActionablesResult) -> None:
         """Save or update actionables for a document (upsert by doc_id)."""
@@ -39,15 +39,14 @@ class ActionableStore:
 
     def load(self, doc_id: str) -> Optional[ActionablesResult]:
         """Load actionables for a document."""
-        doc = self._collection.find_one({"_id": doc_id})
+        doc = self._collection.find_one({"_id": doc_id}, {"_id": 0})
         if not doc:
             return None
-        doc.pop("_id", None)
         return ActionablesResult.from_dict(doc)
 
     def exists(self, doc_id: str) -> bool:
         """Check if actionables have been extracted for a document."""
-        return self._collection.count_documents({"_id": doc_id}) > 0
+        return self._collection.find_one({"_id": doc_id}, {"_id": 1}) is not None
 
     def delete(self, doc_id: str) -> None:
         """Delete actionables for a document."""
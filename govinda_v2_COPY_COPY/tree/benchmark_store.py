@@ -10,7 +10,7 @@ import logging
 import uuid
 from typing import Optional
 
-from utils.mongo import get_db
+from utils.mongo import get_collection
 from utils.benchmark import PipelineBenchmark
 
 logger = logging.getLogger(__name__)
@@ -22,7 +22,7 @@ class BenchmarkStore:
     """Store and query pipeline benchmarks in MongoDB."""
 
     def __init__(self) -> None:
-        self._collection = get_db()[COLLECTION_NAME]
+        self._collection = get_collection(COLLECTION_NAME)
 
     def save(self, benchmark: PipelineBenchmark) -> str:
         """Save a benchmark record. Returns the record ID."""
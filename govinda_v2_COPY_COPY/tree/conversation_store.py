@@ -7,6 +7,13 @@ Document schema: see models/conversation.py
 Each conversation has a unique conv_id (_id = conv_id, a UUID).
 Multiple conversations can exist per document (keyed by doc_id).
 "research" is the special doc_id for cross-document chat.
+
+Collection: `conversation_messages`
+Messages are stored outside the conversation document in buckets of
+~_BUCKET_SIZE: {conv_id, bucket_idx, count, msgs: [...]}. Appends touch only
+the newest bucket, so their cost no longer grows with conversation length.
+Conversations written before bucketing keep their embedded `messages`
+array; load() returns those first, followed by any bucketed messages.
 """
 
 from __future__ import annotations
@@ -16,19 +23,139 @@ import uuid
 from datetime import datetime, timezone
 from typing import Optional
 
+from pymongo import DeleteMany, ReplaceOne
+from pymongo.errors import DuplicateKeyError
+
 from models.conversation import Conversation, ConversationMessage
-from utils.mongo import get_db
+from utils.mongo import get_collection
 
 logger = logging.getLogger(__name__)
 
+# Max messages per conversation_messages bucket before a new one is started
+_BUCKET_SIZE = 100
+
+# Attempts at pushing onto a bucket when concurrent appends race to open one
+_BUCKET_PUSH_RETRIES = 3
+
+# Serves per-document listings and deletes
+_DOC_INDEX = [("doc_id", 1), ("updated_at", -1)]
+
+# Listing preview length (chars of the last message's content)
+_PREVIEW_CHARS = 120
+
+# Server-side reshape for listings: emits the final listing dict directly
+# (defaults included) and never reads message bodies
+_LIST_PROJECT_STAGE = {
+    "$project": {
+        "_id": 0,
+        "conv_id": "$_id",
+        "doc_id": {"$ifNull": ["$doc_id", ""]},
+        "doc_name": {"$ifNull": ["$doc_name", ""]},
+        "type": {"$ifNull": ["$type", "document"]},
+        "title": {"$ifNull": ["$title", ""]},
+        "created_at": {"$ifNull": ["$created_at", ""]},
+        # Stored as a BSON Date; listings keep returning the ISO string
+        "updated_at": {
+            "$cond": [
+                {"$eq": [{"$type": "$updated_at"}, "date"]},
+                {"$dateToString": {
+                    "date": "$updated_at",
+                    "format": "%Y-%m-%dT%H:%M:%S.%L000+00:00",
+                }},
+                {"$ifNull": ["$updated_at", ""]},
+            ]
+        },
+        "message_count": {"$ifNull": ["$message_count", 0]},
+        "last_message_preview": {"$ifNull": ["$last_message_preview", ""]},
+    }
+}
+
 
 class ConversationStore:
     """CRUD operations for conversations in MongoDB."""
 
     def __init__(self) -> None:
-        self._collection = get_db()["conversations"]
-        # Ensure index on doc_id for efficient listing per document
-        self._collection.create_index("doc_id")
+        self._collection = get_collection("conversations")
+        self._messages = get_collection("conversation_messages")
+        self._indexes_ready = False
+        self._ensure_indexes()
+
+    def _ensure_indexes(self) -> None:
+        # Compound (doc_id, updated_at) serves list_by_doc's filter and sort
+        # from the index; updated_at alone serves list_all's sort.
+        try:
+            self._collection.create_index(_DOC_INDEX)
+            self._collection.create_index([("updated_at", -1)])
+            # Small partial index for the cross-document ("research") listing
+            self._collection.create_index(
+                [("type", 1), ("updated_at", -1)],
+                partialFilterExpression={"type": "research"},
+                name="research_updated",
+            )
+            self._messages.create_index([("conv_id", 1), ("bucket_idx", 1)], unique=True)
+            self._indexes_ready = True
+        except Exception as e:  # non-fatal
+            logger.warning("conversations index init failed: %s", e)
+
+    def backfill_previews(self) -> int:
+        """
+        Set last_message_preview on conversations saved before it existed.
+
+        One-off migration (scripts/migrate_conversations.py): the filter is
+        unindexed, so this is a collection scan. Listings already default a
+        missing preview to "". Returns the number of conversations updated.
+        """
+        try:
+            result = self._collection.update_many(
+                {"last_message_preview": {"$exists": False}},
+                [{
+                    "$set": {
+                        "last_message_preview": {
+                            "$substrCP": [
+                                {"$ifNull": [{"$arrayElemAt": ["$messages.content", -1]}, ""]},
+                                0,
+                                _PREVIEW_CHARS,
+                            ]
+                        }
+                    }
+                }],
+            )
+            if result.modified_count:
+                logger.info("Backfilled previews for %d conversations", result.modified_count)
+            return result.modified_count
+        except Exception as e:  # non-fatal
+            logger.warning("conversation preview backfill failed: %s", e)
+            return 0
+
+    def migrate_updated_at(self) -> int:
+        """
+        Convert ISO-string updated_at values to BSON Dates (8-byte index keys).
+
+        One-off migration (scripts/migrate_conversations.py); reads handle
+        both types. Returns the number of conversations converted.
+        """
+        try:
+            result = self._collection.update_many(
+                {"updated_at": {"$type": "string"}},
+                [{
+                    "$set": {
+                        "updated_at": {
+                            "$convert": {
+                                "input": "$updated_at",
+                                "to": "date",
+                                "onError": "$updated_at",
+                                "onNull": "$updated_at",
+                            }
+                        }
+                    }
+                }],
+            )
+            if result.modified_count:
+                logger.info("Converted updated_at to Date on %d conversations", result.modified_count)
+            return result.modified_count
+        except Exception as e:  # non-fatal
+            logger.warning("conversation updated_at migration failed: %s", e)
+            return 0
 
     # ------------------------------------------------------------------
     # Core CRUD
@@ -40,14 +167,45 @@ class ConversationStore:
         if not data:
             return None
         data["conv_id"] = data.pop("_id", conv_id)
+        data["updated_at"] = _iso(data.get("updated_at"))
+        buckets = self._messages.find(
+            {"conv_id": conv_id}, {"_id": 0, "msgs": 1}
+        ).sort("bucket_idx", 1)
+        data["messages"] = data.get("messages", []) + [
+            m for bucket in buckets for m in bucket.get("msgs", [])
+        ]
         return Conversation.from_dict(data)
 
     def save(self, conversation: Conversation) -> None:
-        """Full save/replace of a conversation."""
+        """Full save/replace of a conversation (metadata and message buckets)."""
+        conv_id = conversation.conv_id
         data = conversation.to_dict()
-        data["_id"] = conversation.conv_id
+        msg_dicts = data.pop("messages")
+        data["_id"] = conv_id
         data.pop("conv_id", None)
-        self._collection.replace_one({"_id": conversation.conv_id}, data, upsert=True)
+        data["updated_at"] = _as_date(conversation.updated_at)
+        data["last_message_preview"] = (
+            conversation.messages[-1].content[:_PREVIEW_CHARS]
+            if conversation.messages
+            else ""
+        )
+        chunks = [
+            msg_dicts[i : i + _BUCKET_SIZE]
+            for i in range(0, len(msg_dicts), _BUCKET_SIZE)
+        ]
+        # Replace each bucket in place, then drop any past the new end, so
+        # there is no window in which the conversation has no stored messages
+        ops = [
+            ReplaceOne(
+                {"conv_id": conv_id, "bucket_idx": idx},
+                {"conv_id": conv_id, "bucket_idx": idx, "count": len(chunk), "msgs": chunk},
+                upsert=True,
+            )
+            for idx, chunk in enumerate(chunks)
+        ]
+        ops.append(DeleteMany({"conv_id": conv_id, "bucket_idx": {"$gte": len(chunks)}}))
+        self._messages.bulk_write(ops, ordered=True)
+        self._collection.replace_one({"_id": conv_id}, data, upsert=True)
 
     def create(
         self,
@@ -57,7 +215,8 @@ class ConversationStore:
         title: str = "",
     ) -> Conversation:
         """Create a new empty conversation and persist it. Returns the new Conversation."""
-        now = datetime.now(timezone.utc).isoformat()
+        now = datetime.now(timezone.utc)
+        now_str = now.isoformat()
         conv = Conversation(
             conv_id=str(uuid.uuid4()),
             doc_id=doc_id,
@@ -65,11 +224,18 @@ class ConversationStore:
             conv_type=conv_type,
             title=title,
             messages=[],
-            created_at=now,
-            updated_at=now,
+            created_at=now_str,
+            updated_at=now_str,
             message_count=0,
         )
-        self.save(conv)
+        # New conversation: no buckets to rewrite, so write the metadata only
+        data = conv.to_dict()
+        data.pop("messages")
+        data.pop("conv_id", None)
+        data["_id"] = conv.conv_id
+        data["updated_at"] = now
+        data["last_message_preview"] = ""
+        self._collection.replace_one({"_id": conv.conv_id}, data, upsert=True)
         logger.info("Created conversation %s for doc %s", conv.conv_id, doc_id)
         return conv
 
@@ -78,24 +244,81 @@ class ConversationStore:
         conv_id: str,
         messages: list[ConversationMessage],
     ) -> None:
-        """Append multiple messages to an existing conversation."""
-        now = datetime.now(timezone.utc).isoformat()
+        """
+        Append multiple messages to an existing conversation.
+
+        Messages are pushed onto the newest bucket first; the conversation's
+        message_count and preview are only updated once that push succeeds,
+        so they never run ahead of the stored messages.
+        """
+        if not self._collection.find_one({"_id": conv_id}, {"_id": 1}):
+            logger.warning("append_messages: conversation %s not found", conv_id)
+            return
+        if not messages:
+            return
+        now = datetime.now(timezone.utc)
+        msg_dicts = self._message_dicts(messages, now)
+        self._push_to_bucket(conv_id, msg_dicts)
+        self._collection.update_one(
+            {"_id": conv_id}, self._meta_update(msg_dicts, now)
+        )
+
+    def _push_to_bucket(self, conv_id: str, msg_dicts: list[dict]) -> None:
+        """
+        Push messages onto the conversation's open bucket (count < _BUCKET_SIZE),
+        starting a new bucket when every existing one is full.
+
+        Only the newest bucket is ever below _BUCKET_SIZE, so the filter is
+        unambiguous. Two concurrent appends that both start a new bucket
+        collide on the unique (conv_id, bucket_idx) index; the loser retries
+        and lands in the bucket the winner created.
+        """
+        for attempt in range(_BUCKET_PUSH_RETRIES):
+            last = self._messages.find_one(
+                {"conv_id": conv_id},
+                {"bucket_idx": 1},
+                sort=[("bucket_idx", -1)],
+            )
+            next_idx = last["bucket_idx"] + 1 if last else 0
+            try:
+                self._messages.update_one(
+                    {"conv_id": conv_id, "count": {"$lt": _BUCKET_SIZE}},
+                    {
+                        "$push": {"msgs": {"$each": msg_dicts}},
+                        "$inc": {"count": len(msg_dicts)},
+                        "$setOnInsert": {"bucket_idx": next_idx},
+                    },
+                    upsert=True,
+                )
+                return
+            except DuplicateKeyError:
+                if attempt == _BUCKET_PUSH_RETRIES - 1:
+                    raise
+
+    @staticmethod
+    def _message_dicts(messages: list[ConversationMessage], now: datetime) -> list[dict]:
+        """Serialize messages, stamping any without a timestamp."""
         msg_dicts = []
+        stamp = None
         for m in messages:
             if not m.timestamp:
-                m.timestamp = now
+                stamp = stamp or now.isoformat()
+                m.timestamp = stamp
             msg_dicts.append(m.to_dict())
+        return msg_dicts
 
-        result = self._collection.update_one(
-            {"_id": conv_id},
-            {
-                "$push": {"messages": {"$each": msg_dicts}},
-                "$set": {"updated_at": now},
-                "$inc": {"message_count": len(messages)},
+    @staticmethod
+    def _meta_update(msg_dicts: list[dict], now: datetime) -> dict:
+        """Build the conversation metadata update for an append."""
+        return {
+            "$set": {
+                "updated_at": now,
+                "last_message_preview": msg_dicts[-1].get("content", "")[:_PREVIEW_CHARS]
+                if msg_dicts
+                else "",
             },
-        )
-        if result.matched_count == 0:
-            logger.warning("append_messages: conversation %s not found", conv_id)
+            "$inc": {"message_count": len(msg_dicts)},
+        }
 
     def set_title(self, conv_id: str, title: str) -> None:
         """Update the title of a conversation."""
@@ -107,16 +330,30 @@ class ConversationStore:
     def delete(self, conv_id: str) -> bool:
         """Delete a conversation. Returns True if something was deleted."""
         result = self._collection.delete_one({"_id": conv_id})
+        self._messages.delete_many({"conv_id": conv_id})
         return result.deleted_count > 0
 
     def delete_all(self) -> int:
-        """Delete all conversations. Returns count deleted."""
-        result = self._collection.delete_many({})
-        return result.deleted_count
+        """
+        Delete all conversations. Returns count deleted.
+
+        Drops both collections (constant time, unlike delete_many({}) which
+        removes documents one by one) and recreates the indexes.
+        """
+        count = self._collection.estimated_document_count()
+        self._collection.drop()
+        self._messages.drop()
+        self._ensure_indexes()
+        return count
 
     def delete_by_doc(self, doc_id: str) -> int:
         """Delete all conversations for a document. Returns count deleted."""
-        result = self._collection.delete_many({"doc_id": doc_id})
+        conv_ids = self._collection.distinct("_id", {"doc_id": doc_id})
+        # Pin the (doc_id, updated_at) index rather than re-planning each call
+        hint = _DOC_INDEX if self._indexes_ready else None
+        result = self._collection.delete_many({"doc_id": doc_id}, hint=hint)
+        if conv_ids:
+            self._messages.delete_many({"conv_id": {"$in": conv_ids}})
         return result.deleted_count
 
     # ------------------------------------------------------------------
@@ -128,84 +365,53 @@ class ConversationStore:
         Return metadata for all conversations (no message bodies).
         Sorted by updated_at descending (most recent first).
         """
-        cursor = self._collection.find(
-            {},
-            {
-                "messages": {"$slice": -1},  # Only last message for preview
-                "doc_id": 1,
-                "doc_name": 1,
-                "type": 1,
-                "title": 1,
-                "created_at": 1,
-                "updated_at": 1,
-                "message_count": 1,
-            },
-        ).sort("updated_at", -1)
-
-        results = []
-        for doc in cursor:
-            last_msgs = doc.get("messages", [])
-            preview = ""
-            if last_msgs:
-                preview = last_msgs[-1].get("content", "")[:120]
-
-            results.append(
-                {
-                    "conv_id": doc["_id"],
-                    "doc_id": doc.get("doc_id", ""),
-                    "doc_name": doc.get("doc_name", ""),
-                    "type": doc.get("type", "document"),
-                    "title": doc.get("title", ""),
-                    "created_at": doc.get("created_at", ""),
-                    "updated_at": doc.get("updated_at", ""),
-                    "message_count": doc.get("message_count", 0),
-                    "last_message_preview": preview,
-                }
-            )
-
-        return results
+        return self._list({})
 
     def list_by_doc(self, doc_id: str) -> list[dict]:
         """
         Return metadata for all conversations belonging to a document.
         Sorted by updated_at descending.
         """
-        cursor = self._collection.find(
-            {"doc_id": doc_id},
-            {
-                "messages": {"$slice": -1},
-                "doc_id": 1,
-                "doc_name": 1,
-                "type": 1,
-                "title": 1,
-                "created_at": 1,
-                "updated_at": 1,
-                "message_count": 1,
-            },
-        ).sort("updated_at", -1)
-
-        results = []
-        for doc in cursor:
-            last_msgs = doc.get("messages", [])
-            preview = ""
-            if last_msgs:
-                preview = last_msgs[-1].get("content", "")[:120]
-
-            results.append(
-                {
-                    "conv_id": doc["_id"],
-                    "doc_id": doc.get("doc_id", ""),
-                    "doc_name": doc.get("doc_name", ""),
-                    "type": doc.get("type", "document"),
-                    "title": doc.get("title", ""),
-                    "created_at": doc.get("created_at", ""),
-                    "updated_at": doc.get("updated_at", ""),
-                    "message_count": doc.get("message_count", 0),
-                    "last_message_preview": preview,
-                }
-            )
+        return self._list({"doc_id": doc_id})
+
+    def list_research(self) -> list[dict]:
+        """
+        Return metadata for all cross-document research conversations.
+        Sorted by updated_at descending; served by the research_updated index.
+        """
+        return self._list({"type": "research"})
+
+    def _list(self, match: dict) -> list[dict]:
+        """Run a listing aggregation; MongoDB emits the final listing shape."""
+        pipeline = [
+            {"$match": match},
+            {"$sort": {"updated_at": -1}},
+            _LIST_PROJECT_STAGE,
+        ]
+        # Bounded batches cap memory per round trip for large listings
+        return list(
+            self._collection.aggregate(pipeline, allowDiskUse=False, batchSize=200)
+        )
+
+    def export_all(self) -> list[dict]:
+        """
+        Return every conversation with its full message list, most recently
+        updated first. Buckets are read in one pass rather than per conversation.
+        """
+        messages_by_conv: dict[str, list[dict]] = {}
+        for bucket in self._messages.find({}, {"_id": 0, "conv_id": 1, "msgs": 1}).sort(
+            [("conv_id", 1), ("bucket_idx", 1)]
+        ):
+            messages_by_conv.setdefault(bucket["conv_id"], []).extend(bucket.get("msgs", []))
 
-        return results
+        conversations = []
+        for raw in self._collection.find().sort("updated_at", -1):
+            conv_id = raw.pop("_id", "")
+            raw["conv_id"] = conv_id
+            raw["updated_at"] = _iso(raw.get("updated_at"))
+            raw["messages"] = raw.get("messages", []) + messages_by_conv.get(conv_id, [])
+            conversations.append(raw)
+        return conversations
 
     # ------------------------------------------------------------------
     # Storage stats
@@ -214,7 +420,27 @@ class ConversationStore:
     def get_collection_size_bytes(self) -> int:
         """Return the total storage size of the conversations collection."""
         try:
-            stats = self._collection.database.command("collStats", "conversations")
-            return stats.get("storageSize", 0)
+            db = self._collection.database
+            return sum(
+                db.command("collStats", name).get("storageSize", 0)
+                for name in ("conversations", "conversation_messages")
+            )
         except Exception:
             return 0
+
+
+def _as_date(value):
+    """ISO string -> aware datetime (stored as BSON Date); other values pass through."""
+    if isinstance(value, str) and value:
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return value
+    return value
+
+
+def _iso(value) -> str:
+    """BSON Date (read back as a naive UTC datetime) -> ISO string."""
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=timezone.utc).isoformat(timespec="microseconds")
+    return value or ""
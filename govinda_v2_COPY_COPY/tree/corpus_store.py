@@ -8,10 +8,12 @@ in a 'corpus' MongoDB collection.
 from __future__ import annotations
 
 import logging
+import threading
 from typing import Optional
 
 from models.corpus import Corpus, CorpusDocument, DocumentRelationship
-from utils.mongo import get_db
+from utils.mongo import get_collection
+from utils.timing import now_iso
 
 logger = logging.getLogger(__name__)
 
@@ -21,8 +23,15 @@ COLLECTION = "corpus"
 class CorpusStore:
     """MongoDB CRUD for the corpus graph."""
 
+    # Process-wide cache of loaded corpora, kept in sync by every write path.
+    # Class-level because ingestion, corpus QA and the API each hold their
+    # own CorpusStore instance. Entries are never mutated in place: writes
+    # swap in an updated copy, so a reader's corpus is a consistent snapshot.
+    _cache: dict[str, Corpus] = {}
+    _cache_lock = threading.Lock()
+
     def __init__(self) -> None:
-        self._collection = get_db()[COLLECTION]
+        self._collection = get_collection(COLLECTION)
 
     def save(self, corpus: Corpus) -> None:
         """Save or update the corpus (upsert by corpus_id)."""
@@ -32,6 +41,8 @@ class CorpusStore:
             {**data, "_id": corpus.corpus_id},
             upsert=True,
         )
+        with self._cache_lock:
+            self._cache[corpus.corpus_id] = _snapshot(corpus)
         logger.info(
             "Saved corpus: %d documents, %d relationships",
             len(corpus.documents),
@@ -40,11 +51,9 @@ class CorpusStore:
 
     def load(self, corpus_id: str = "default") -> Optional[Corpus]:
         """Load the corpus from MongoDB."""
-        doc = self._collection.find_one({"_id": corpus_id})
+        doc = self._collection.find_one({"_id": corpus_id}, {"_id": 0})
         if not doc:
             return None
-        # Remove Mongo's _id before deserialization
-        doc.pop("_id", None)
         corpus = Corpus.from_dict(doc)
         logger.info(
             "Loaded corpus: %d documents, %d relationships",
@@ -54,34 +63,146 @@ class CorpusStore:
         return corpus
 
     def load_or_create(self, corpus_id: str = "default") -> Corpus:
-        """Load the corpus, or create a new empty one if it doesn't exist."""
+        """
+        Return the cached corpus, loading it (or creating a new empty one if
+        it doesn't exist) when it is not cached or is stale.
+
+        The stored last_updated stamp is checked on every call (a one-field
+        read by _id), so writes from other processes — scripts, other
+        workers — are picked up. Treat the returned corpus as read-only.
+        """
+        with self._cache_lock:
+            cached = self._cache.get(corpus_id)
+        if cached is not None:
+            stamp = self._collection.find_one({"_id": corpus_id}, {"_id": 0, "last_updated": 1})
+            if (stamp or {}).get("last_updated", "") == cached.last_updated:
+                return cached
+
         corpus = self.load(corpus_id)
         if corpus is None:
             corpus = Corpus(corpus_id=corpus_id)
             corpus.build_index()
             logger.info("Created new empty corpus: %s", corpus_id)
+        with self._cache_lock:
+            self._cache[corpus_id] = corpus
         return corpus
 
-    def add_document(self, doc: CorpusDocument, corpus_id: str = "default") -> Corpus:
-        """Add a document to the corpus (loads, updates, saves)."""
-        corpus = self.load_or_create(corpus_id)
-        corpus.add_document(doc)
-        self.save(corpus)
-        return corpus
+    def invalidate(self, corpus_id: Optional[str] = None) -> None:
+        """Drop a cached corpus (or all of them) so the next access reloads."""
+        with self._cache_lock:
+            if corpus_id is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(corpus_id, None)
+
+    def _update_cached(self, corpus_id: str, mutate, last_updated: str) -> None:
+        """
+        Apply an already-persisted mutation to the cached corpus, if loaded.
+
+        The mutation runs on a copy that then replaces the cache entry, and
+        the copy takes the stored last_updated so the next staleness check
+        matches.
+        """
+        with self._cache_lock:
+            cached = self._cache.get(corpus_id)
+            if cached is not None:
+                updated = _snapshot(cached)
+                mutate(updated)
+                updated.last_updated = last_updated
+                self._cache[corpus_id] = updated
+
+    # ------------------------------------------------------------------
+    # Targeted updates — write only the changed element, never the whole corpus
+    # ------------------------------------------------------------------
+
+    def add_document(self, doc: CorpusDocument, corpus_id: str = "default") -> None:
+        """Add or replace a single document entry in the corpus."""
+        now = now_iso()
+        entry = doc.to_dict()
+        result = self._collection.update_one(
+            {"_id": corpus_id, "documents.doc_id": doc.doc_id},
+            {"$set": {"documents.$": entry, "last_updated": now}},
+        )
+        if result.matched_count == 0:
+            self._collection.update_one(
+                {"_id": corpus_id},
+                {
+                    "$push": {"documents": entry},
+                    "$set": {"last_updated": now},
+                    "$setOnInsert": {"corpus_id": corpus_id, "relationships": []},
+                },
+                upsert=True,
+            )
+        self._update_cached(corpus_id, lambda c: c.add_document(doc), now)
 
-    def remove_document(self, doc_id: str, corpus_id: str = "default") -> Corpus:
+    def remove_document(self, doc_id: str, corpus_id: str = "default") -> None:
         """Remove a document and its relationships from the corpus."""
-        corpus = self.load_or_create(corpus_id)
-        corpus.remove_document(doc_id)
-        self.save(corpus)
+        now = now_iso()
+        self._collection.update_one(
+            {"_id": corpus_id},
+            {
+                "$pull": {
+                    "documents": {"doc_id": doc_id},
+                    "relationships": {
+                        "$or": [{"source_doc_id": doc_id}, {"target_doc_id": doc_id}]
+                    },
+                },
+                "$set": {"last_updated": now},
+            },
+        )
+        self._update_cached(corpus_id, lambda c: c.remove_document(doc_id), now)
         logger.info("Removed document %s from corpus", doc_id)
-        return corpus
 
     def add_relationships(
         self, rels: list[DocumentRelationship], corpus_id: str = "default"
-    ) -> Corpus:
-        """Add relationships to the corpus."""
-        corpus = self.load_or_create(corpus_id)
-        corpus.add_relationships(rels)
-        self.save(corpus)
-        return corpus
+    ) -> int:
+        """
+        Append relationships, deduplicating by (source, target, type) against
+        those already stored. Returns the number added.
+        """
+        if not rels:
+            return 0
+        stored = self._collection.find_one(
+            {"_id": corpus_id},
+            {
+                "relationships.source_doc_id": 1,
+                "relationships.target_doc_id": 1,
+                "relationships.relation_type": 1,
+            },
+        ) or {}
+        existing_keys = {
+            (r["source_doc_id"], r["target_doc_id"], r["relation_type"])
+            for r in stored.get("relationships", [])
+        }
+        new_rels = []
+        for rel in rels:
+            key = (rel.source_doc_id, rel.target_doc_id, rel.relation_type.value)
+            if key not in existing_keys:
+                new_rels.append(rel.to_dict())
+                existing_keys.add(key)
+        if not new_rels:
+            return 0
+        now = now_iso()
+        self._collection.update_one(
+            {"_id": corpus_id},
+            {
+                "$push": {"relationships": {"$each": new_rels}},
+                "$set": {"last_updated": now},
+                "$setOnInsert": {"corpus_id": corpus_id, "documents": []},
+            },
+            upsert=True,
+        )
+        self._update_cached(corpus_id, lambda c: c.add_relationships(rels), now)
+        return len(new_rels)
+
+
+def _snapshot(corpus: Corpus) -> Corpus:
+    """Copy a corpus's lists and index so the copy can change independently."""
+    copy = Corpus(
+        corpus_id=corpus.corpus_id,
+        documents=list(corpus.documents),
+        relationships=list(corpus.relationships),
+        last_updated=corpus.last_updated,
+    )
+    copy.build_index()
+    return copy
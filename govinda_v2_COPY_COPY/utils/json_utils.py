@@ -0,0 +1,46 @@
+"""
+JSON serialization helpers for GOVINDA V2.
+
+Uses orjson when it is installed (several times faster than the stdlib
+encoder and decoder, with fewer intermediate allocations) and falls back
+to `json` otherwise, or for payloads orjson rejects (e.g. non-string dict
+keys).
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    """Serialize obj to UTF-8 JSON bytes (for HTTP bodies)."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:  # orjson.JSONEncodeError subclasses TypeError
+            pass
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+def dumps(obj: Any) -> str:
+    """Serialize obj to a JSON string (for SSE payloads, logs, etc.)."""
+    return dumps_bytes(obj).decode("utf-8")
+
+
+def loads(data: str | bytes) -> Any:
+    """
+    Parse JSON text or bytes.
+
+    Raises json.JSONDecodeError on bad input (orjson's error subclasses it).
+    Unlike the stdlib, orjson rejects NaN/Infinity and integers wider than
+    64 bits.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
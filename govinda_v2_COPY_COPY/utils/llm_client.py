@@ -1,686 +1,1383 @@
-"""
-LLM Client for GOVINDA V2 — Multi-provider (OpenAI Responses + DeepInfra Chat Completions).
-
-Simplified client focused on:
-- Text generation with reasoning effort control
-- JSON mode with robust extraction
-- Token usage tracking
-- Provider-aware routing: OpenAI models use Responses API,
-  DeepInfra models use Chat Completions API.
-
-No tool/function calling needed — retrieval is LLM-as-reasoner over trees,
-not agent-with-tools.
-"""
-
-from __future__ import annotations
-
-import json
-import logging
-import re
-import threading
-import time
-from typing import Any, Optional
-
-from openai import APITimeoutError, OpenAI, RateLimitError
-
-from config.settings import get_settings
-
-logger = logging.getLogger(__name__)
-
-
-# ─── Provider Registry ────────────────────────────────────────────────────────
-# Models whose IDs contain a slash (e.g. "zai-org/GLM-5") or match known
-# DeepInfra prefixes are routed to the DeepInfra Chat Completions API.
-# Everything else goes to the native OpenAI Responses API.
-
-DEEPINFRA_MODEL_PREFIXES = (
-    "zai-org/",
-    "deepseek-ai/",
-    "Qwen/",
-)
-
-# Per the DeepInfra docs, reasoning_effort is "for reasoning models" only.
-# Non-reasoning models (GLM-5, GLM-4.7-Flash, DeepSeek-V3) produce gibberish
-# or empty content when reasoning_effort is sent to them.
-DEEPINFRA_REASONING_MODELS = {
-    "deepseek-ai/DeepSeek-R1",
-    "Qwen/QwQ-32B",
-    "Qwen/Qwen3-235B-A22B",
-}
-
-
-def is_deepinfra_model(model_id: str) -> bool:
-    """Return True if *model_id* should be routed to DeepInfra."""
-    if any(model_id.startswith(p) for p in DEEPINFRA_MODEL_PREFIXES):
-        return True
-    # Generic heuristic: org/model format → DeepInfra
-    if "/" in model_id and not model_id.startswith("gpt-"):
-        return True
-    return False
-
-
-class LLMClient:
-    """
-    Multi-provider LLM client for GOVINDA V2.
-
-    - OpenAI models (gpt-5.5 and variants):
-      Use the native OpenAI Responses API.
-    - DeepInfra models (GLM-5, DeepSeek-V3, Qwen, etc.):
-      Use the OpenAI-compatible Chat Completions API via DeepInfra.
-
-    All LLM calls in GOVINDA V2 go through this client for
-    centralized token tracking.
-    """
-
-    def __init__(self, api_key: Optional[str] = None) -> None:
-        settings = get_settings()
-        self._api_key = api_key or settings.llm.openai_api_key
-        self._client = OpenAI(api_key=self._api_key, timeout=600.0)
-        self._model = settings.llm.model
-        self._model_pro = settings.llm.model_pro
-
-        # DeepInfra client (lazy — only created when needed)
-        self._deepinfra_client: Optional[OpenAI] = None
-        self._deepinfra_api_key = settings.llm.deepinfra_api_key
-        self._deepinfra_base_url = settings.llm.deepinfra_base_url
-
-        # Thread-safe usage tracking
-        self._usage_lock = threading.Lock()
-        self.total_input_tokens: int = 0
-        self.total_output_tokens: int = 0
-        self.total_calls: int = 0
-
-    # ------------------------------------------------------------------
-    # Usage tracking
-    # ------------------------------------------------------------------
-
-    def _get_deepinfra_client(self) -> OpenAI:
-        """Lazy-init and return the DeepInfra OpenAI-compatible client."""
-        if self._deepinfra_client is None:
-            if not self._deepinfra_api_key:
-                raise ValueError(
-                    "DEEPINFRA_API_KEY is not set. Add it to your .env file."
-                )
-            self._deepinfra_client = OpenAI(
-                api_key=self._deepinfra_api_key,
-                base_url=self._deepinfra_base_url,
-                timeout=600.0,
-            )
-        return self._deepinfra_client
-
-    def _track_usage(self, response: Any, *, chat_completions: bool = False) -> tuple[int, int]:
-        """Extract and accumulate token counts. Returns (input, output)."""
-        usage = getattr(response, "usage", None)
-        if chat_completions:
-            # Chat Completions API uses prompt_tokens / completion_tokens
-            inp = getattr(usage, "prompt_tokens", 0) if usage else 0
-            out = getattr(usage, "completion_tokens", 0) if usage else 0
-        else:
-            # Responses API uses input_tokens / output_tokens
-            inp = getattr(usage, "input_tokens", 0) if usage else 0
-            out = getattr(usage, "output_tokens", 0) if usage else 0
-        with self._usage_lock:
-            self.total_input_tokens += inp
-            self.total_output_tokens += out
-            self.total_calls += 1
-        return inp, out
-
-    @property
-    def total_tokens(self) -> int:
-        return self.total_input_tokens + self.total_output_tokens
-
-    def reset_usage(self) -> None:
-        with self._usage_lock:
-            self.total_input_tokens = 0
-            self.total_output_tokens = 0
-            self.total_calls = 0
-
-    def get_usage_summary(self) -> dict[str, int]:
-        with self._usage_lock:
-            return {
-                "total_calls": self.total_calls,
-                "total_input_tokens": self.total_input_tokens,
-                "total_output_tokens": self.total_output_tokens,
-                "total_tokens": self.total_tokens,
-            }
-
-    # ------------------------------------------------------------------
-    # DeepInfra Chat Completions path
-    # ------------------------------------------------------------------
-
-    def _chat_deepinfra(
-        self,
-        messages: list[dict[str, str]],
-        model: str,
-        temperature: Optional[float],
-        max_tokens: int,
-        json_mode: bool,
-        reasoning_effort: Optional[str],
-    ) -> tuple[str, int, int, float, str, bool]:
-        """
-        Call DeepInfra via the OpenAI Chat Completions API.
-
-        Params sent per the DeepInfra API schema:
-          - model, messages, max_tokens          (required/basic)
-          - temperature                          (default 1, all models)
-          - reasoning_effort                     (reasoning models only, per docs)
-          - response_format                      (json_object, json_schema, text, regex)
-
-        Returns:
-            (content, input_tokens, output_tokens, elapsed, effort, was_truncated)
-        """
-        client = self._get_deepinfra_client()
-        settings = get_settings()
-
-        # Clamp reasoning_effort to DeepInfra's accepted values: none/low/medium/high
-        effort = reasoning_effort or "none"
-        if effort == "xhigh":
-            effort = "high"
-        if effort == "minimal":
-            effort = "low"
-
-        kwargs: dict[str, Any] = {
-            "model": model,
-            "messages": messages,
-            "max_tokens": max_tokens,
-        }
-
-        # reasoning_effort — per docs, only "for reasoning models".
-        # Non-reasoning models produce gibberish/empty when this is sent.
-        if effort and effort != "none" and model in DEEPINFRA_REASONING_MODELS:
-            kwargs["reasoning_effort"] = effort
-
-        # temperature — all DeepInfra models accept this (default: 1)
-        if temperature is not None:
-            kwargs["temperature"] = temperature
-
-        # response_format — all DeepInfra models accept json_object
-        if json_mode:
-            kwargs["response_format"] = {"type": "json_object"}
-
-        logger.debug(
-            "DeepInfra request: model=%s effort=%s temp=%s json=%s max_tokens=%d",
-            model, effort, temperature, json_mode, max_tokens,
-        )
-
-        start = time.time()
-        response = client.chat.completions.create(**kwargs)
-        elapsed = time.time() - start
-
-        inp, out = self._track_usage(response, chat_completions=True)
-
-        # Extract content — order matters:
-        #   1. Get raw content + reasoning_content
-        #   2. Strip <think> tags from content (DeepSeek-R1 puts CoT there)
-        #   3. If content empty after stripping, fall back to reasoning_content
-        content = ""
-        if response.choices:
-            msg = response.choices[0].message
-            raw_content = msg.content or ""
-            raw_reasoning = getattr(msg, "reasoning_content", None) or ""
-
-            logger.debug(
-                "DeepInfra %s: raw content=%d chars, raw reasoning_content=%d chars",
-                model, len(raw_content), len(raw_reasoning),
-            )
-
-            content = raw_content
-
-            # Step 1: Strip <think>...</think> chain-of-thought from content
-            if "<think>" in content:
-                content = re.sub(r"<think>.*?</think>", "", content, flags=re.DOTALL).strip()
-                if content.startswith("<think>"):
-                    content = re.sub(r"^<think>.*", "", content, flags=re.DOTALL).strip()
-
-            # Step 2: If content is empty after stripping, try reasoning_content
-            if not content.strip() and raw_reasoning.strip():
-                logger.info(
-                    "DeepInfra %s: content empty (raw=%d chars), using reasoning_content (%d chars)",
-                    model, len(raw_content), len(raw_reasoning),
-                )
-                content = raw_reasoning
-                # Strip <think> from reasoning_content too
-                if "<think>" in content:
-                    content = re.sub(r"<think>.*?</think>", "", content, flags=re.DOTALL).strip()
-                    if content.startswith("<think>"):
-                        content = re.sub(r"^<think>.*", "", content, flags=re.DOTALL).strip()
-
-            if not content.strip():
-                logger.warning(
-                    "DeepInfra %s: EMPTY response after all extraction. "
-                    "raw_content=%d, raw_reasoning=%d, finish_reason=%s, tokens=%d/%d",
-                    model, len(raw_content), len(raw_reasoning),
-                    response.choices[0].finish_reason, inp, out,
-                )
-
-        # Detect truncation via finish_reason
-        was_truncated = (
-            response.choices[0].finish_reason == "length"
-            if response.choices
-            else False
-        )
-
-        return content, inp, out, elapsed, effort, was_truncated
-
-    # ------------------------------------------------------------------
-    # Core text generation
-    # ------------------------------------------------------------------
-
-    def chat(
-        self,
-        messages: list[dict[str, str]],
-        model: Optional[str] = None,
-        temperature: Optional[float] = None,
-        max_tokens: Optional[int] = None,
-        json_mode: bool = False,
-        reasoning_effort: Optional[str] = None,
-    ) -> str:
-        """
-        Send an LLM request and return the response text.
-
-        Automatically routes to the correct provider:
-        - OpenAI models → Responses API
-        - DeepInfra models → Chat Completions API
-
-        Args:
-            messages: List of {"role": ..., "content": ...} dicts.
-            model: Override model (defaults to gpt-5.5).
-            temperature: Override temperature. Only effective when
-                         reasoning_effort is "none".
-            max_tokens: Override max_output_tokens.
-            json_mode: If True, request JSON response format.
-            reasoning_effort: "none" | "low" | "medium" | "high" | "xhigh".
-                              Defaults to "low" when not specified.
-
-        Returns:
-            The assistant's response text.
-        """
-        settings = get_settings()
-        model = model or self._model
-        max_tokens = max_tokens or settings.llm.max_tokens_default
-
-        # ── DeepInfra path ────────────────────────────────────────────
-        if is_deepinfra_model(model):
-            content, inp, out, elapsed, effort, _ = self._chat_deepinfra(
-                messages, model, temperature, max_tokens, json_mode, reasoning_effort,
-            )
-            logger.debug(
-                "LLM call [deepinfra]: model=%s tokens=%d/%d latency=%.2fs effort=%s",
-                model, inp, out, elapsed, effort,
-            )
-            return content
-
-        # ── OpenAI Responses API path ─────────────────────────────────
-        kwargs: dict[str, Any] = {
-            "model": model,
-            "input": messages,
-            "max_output_tokens": max_tokens,
-            "store": False,
-        }
-
-        # Reasoning effort defaults.
-        # All callers in the intelligence pipeline pass explicit reasoning_effort,
-        # so this fallback only applies to generic chat() calls. Default "low"
-        # keeps reasoning active without heavy cost.
-        effort = reasoning_effort if reasoning_effort else "low"
-
-        kwargs["reasoning"] = {"effort": effort}
-
-        # Temperature only works with reasoning_effort="none"
-        if effort == "none":
-            temp = temperature if temperature is not None else settings.llm.temperature
-            kwargs["temperature"] = temp
-
-        # JSON mode
-        if json_mode:
-            kwargs["text"] = {"format": {"type": "json_object"}}
-
-        start = time.time()
-        response = self._client.responses.create(**kwargs)
-        elapsed = time.time() - start
-
-        inp, out = self._track_usage(response)
-        content = response.output_text or ""
-
-        logger.debug(
-            "LLM call [openai]: model=%s tokens=%d/%d latency=%.2fs effort=%s",
-            model,
-            inp,
-            out,
-            elapsed,
-            effort,
-        )
-
-        return content
-
-    def chat_with_status(
-        self,
-        messages: list[dict[str, str]],
-        model: Optional[str] = None,
-        temperature: Optional[float] = None,
-        max_tokens: Optional[int] = None,
-        json_mode: bool = False,
-        reasoning_effort: Optional[str] = None,
-    ) -> tuple[str, bool]:
-        """
-        Same as chat() but also returns whether the response was truncated.
-
-        Returns:
-            Tuple of (response_text, was_truncated).
-            was_truncated is True when the API stopped due to max_output_tokens.
-        """
-        settings = get_settings()
-        model = model or self._model
-        max_tokens = max_tokens or settings.llm.max_tokens_default
-
-        # ── DeepInfra path ────────────────────────────────────────────
-        if is_deepinfra_model(model):
-            content, inp, out, elapsed, effort, was_truncated = self._chat_deepinfra(
-                messages, model, temperature, max_tokens, json_mode, reasoning_effort,
-            )
-            logger.debug(
-                "LLM call [deepinfra]: model=%s tokens=%d/%d latency=%.2fs effort=%s truncated=%s",
-                model, inp, out, elapsed, effort, was_truncated,
-            )
-            return content, was_truncated
-
-        # ── OpenAI Responses API path ─────────────────────────────────
-        kwargs: dict[str, Any] = {
-            "model": model,
-            "input": messages,
-            "max_output_tokens": max_tokens,
-            "store": False,
-        }
-
-        effort = reasoning_effort if reasoning_effort else "low"
-
-        kwargs["reasoning"] = {"effort": effort}
-
-        # Temperature only works with reasoning_effort="none"
-        if effort == "none":
-            temp = temperature if temperature is not None else settings.llm.temperature
-            kwargs["temperature"] = temp
-
-        # JSON mode
-        if json_mode:
-            kwargs["text"] = {"format": {"type": "json_object"}}
-
-        start = time.time()
-        response = self._client.responses.create(**kwargs)
-        elapsed = time.time() - start
-
-        inp, out = self._track_usage(response)
-        content = response.output_text or ""
-
-        # Detect truncation via API status
-        was_truncated = getattr(response, "status", "") == "incomplete"
-
-        logger.debug(
-            "LLM call [openai]: model=%s tokens=%d/%d latency=%.2fs effort=%s truncated=%s",
-            model,
-            inp,
-            out,
-            elapsed,
-            effort,
-            was_truncated,
-        )
-
-        return content, was_truncated
-
-    def chat_pro(
-        self,
-        messages: list[dict[str, str]],
-        max_tokens: Optional[int] = None,
-        json_mode: bool = False,
-        reasoning_effort: str = "medium",
-    ) -> str:
-        """Chat with medium reasoning effort (deep synthesis calls)."""
-        return self.chat(
-            messages=messages,
-            model=self._model_pro,
-            max_tokens=max_tokens,
-            json_mode=json_mode,
-            reasoning_effort=reasoning_effort,
-        )
-
-    # ------------------------------------------------------------------
-    # JSON extraction with multi-fallback
-    # ------------------------------------------------------------------
-
-    def chat_json(
-        self,
-        messages: list[dict[str, str]],
-        model: Optional[str] = None,
-        temperature: Optional[float] = None,
-        max_tokens: Optional[int] = None,
-        retries: int = 3,
-        reasoning_effort: Optional[str] = None,
-    ) -> dict | list:
-        """
-        Chat and extract JSON from the response with multi-fallback.
-
-        Strategies:
-        1. Direct json.loads on json_mode response
-        2. Code block extraction (```json ... ```)
-        3. Balanced brace/bracket extraction
-        4. Retry without json_mode as final fallback
-        """
-        last_error: Exception | None = None
-        content = ""
-
-        for attempt in range(retries):
-            try:
-                content = self.chat(
-                    messages=messages,
-                    model=model,
-                    temperature=temperature,
-                    max_tokens=max_tokens,
-                    json_mode=True,
-                    reasoning_effort=reasoning_effort,
-                )
-                if len(content.strip()) < 3:
-                    raise ValueError(
-                        f"LLM returned empty/trivial response (len={len(content.strip())})"
-                    )
-                return self._ensure_dict_or_list(self._extract_json(content))
-            except (json.JSONDecodeError, ValueError) as e:
-                last_error = e
-                logger.warning(
-                    "JSON parse attempt %d/%d failed: %s",
-                    attempt + 1,
-                    retries,
-                    str(e)[:120],
-                )
-            except (APITimeoutError, RateLimitError) as e:
-                last_error = e
-                logger.warning(
-                    "API error on attempt %d/%d: %s",
-                    attempt + 1,
-                    retries,
-                    str(e)[:120],
-                )
-                if isinstance(e, RateLimitError):
-                    time.sleep(2**attempt)
-
-        # Final fallback: try without json_mode
-        try:
-            content = self.chat(
-                messages=messages,
-                model=model,
-                temperature=temperature,
-                max_tokens=max_tokens,
-                json_mode=False,
-                reasoning_effort=reasoning_effort,
-            )
-            if len(content.strip()) >= 3:
-                return self._ensure_dict_or_list(self._extract_json(content))
-        except (json.JSONDecodeError, ValueError, APITimeoutError, RateLimitError):
-            pass
-
-        logger.error("All JSON parse attempts failed")
-        raise last_error or ValueError("Failed to extract JSON after all retries")
-
-    def chat_json_with_status(
-        self,
-        messages: list[dict[str, str]],
-        model: Optional[str] = None,
-        temperature: Optional[float] = None,
-        max_tokens: Optional[int] = None,
-        reasoning_effort: Optional[str] = None,
-    ) -> tuple[dict | list, bool]:
-        """
-        Chat and extract JSON, also returning truncation status.
-
-        Unlike chat_json(), this does NOT retry on truncation — it returns
-        whatever JSON it can salvage plus a was_truncated flag so the caller
-        can decide how to continue.
-
-        Returns:
-            Tuple of (parsed_json, was_truncated).
-        """
-        content, was_truncated = self.chat_with_status(
-            messages=messages,
-            model=model,
-            temperature=temperature,
-            max_tokens=max_tokens,
-            json_mode=True,
-            reasoning_effort=reasoning_effort,
-        )
-
-        if len(content.strip()) < 3:
-            raise ValueError(
-                f"LLM returned empty/trivial response (len={len(content.strip())})"
-            )
-
-        # If truncated, the JSON is likely incomplete. Try to salvage what we can.
-        if was_truncated:
-            logger.warning(
-                "Response was truncated (max_output_tokens). Attempting JSON salvage..."
-            )
-            try:
-                result = self._extract_json(content)
-                return self._ensure_dict_or_list(result), True
-            except (json.JSONDecodeError, ValueError):
-                # JSON is broken due to truncation. Try to repair by closing
-                # the answer_text field and the outer object.
-                repaired = self._repair_truncated_json(content)
-                if repaired is not None:
-                    return self._ensure_dict_or_list(repaired), True
-                # Last resort: wrap raw text
-                logger.warning("Could not salvage truncated JSON, wrapping raw text")
-                return {
-                    "answer_text": content,
-                    "citations": [],
-                    "inferred_points": [],
-                }, True
-
-        # Normal (non-truncated) path
-        return self._ensure_dict_or_list(self._extract_json(content)), False
-
-    @staticmethod
-    def _repair_truncated_json(text: str) -> dict | None:
-        """
-        Attempt to repair a JSON object that was truncated mid-stream.
-
-        Strategy: find the answer_text value and close the JSON minimally.
-        """
-        text = text.strip()
-
-        # Find the start of the JSON object
-        obj_start = text.find("{")
-        if obj_start == -1:
-            return None
-
-        # Try progressively aggressive truncation points
-        # 1) Find the last complete key-value pair boundary
-        # Look for the last complete string value ending with ","
-        for try_end in range(len(text) - 1, obj_start, -1):
-            candidate = text[obj_start : try_end + 1]
-            # Try closing with }}
-            for closer in ["}", '"}', '"]}', '""]}', '": []}']:
-                attempt = candidate + closer
-                # Clean up trailing commas
-                attempt = re.sub(r",\s*([}\]])", r"\1", attempt)
-                try:
-                    result = json.loads(attempt)
-                    if isinstance(result, dict) and "answer_text" in result:
-                        return result
-                except json.JSONDecodeError:
-                    continue
-
-            # Don't search too far back — limit to last 200 chars
-            if len(text) - try_end > 200:
-                break
-
-        return None
-
-    @staticmethod
-    def _extract_json(text: str) -> dict | list:
-        """Extract JSON from LLM response text with multiple fallbacks."""
-        text = text.strip()
-
-        # Strip <think>...</think> blocks that some reasoning models prepend
-        if "<think>" in text:
-            text = re.sub(r"<think>.*?</think>", "", text, flags=re.DOTALL).strip()
-            # Handle unclosed <think> (truncated response)
-            if text.startswith("<think>"):
-                text = re.sub(r"^<think>.*", "", text, flags=re.DOTALL).strip()
-
-        # Strategy 1: Direct parse
-        try:
-            return json.loads(text)
-        except json.JSONDecodeError:
-            pass
-
-        # Strategy 2: Code block extraction
-        code_block = re.search(r"```(?:json)?\s*\n?(.*?)\n?\s*```", text, re.DOTALL)
-        if code_block:
-            try:
-                return json.loads(code_block.group(1).strip())
-            except json.JSONDecodeError:
-                pass
-
-        # Strategy 3: Balanced brace/bracket extraction
-        for open_c, close_c in [("{", "}"), ("[", "]")]:
-            start = text.find(open_c)
-            if start == -1:
-                continue
-
-            depth = 0
-            in_string = False
-            escape = False
-
-            for i in range(start, len(text)):
-                c = text[i]
-                if escape:
-                    escape = False
-                    continue
-                if c == "\\":
-                    escape = True
-                    continue
-                if c == '"' and not escape:
-                    in_string = not in_string
-                    continue
-                if in_string:
-                    continue
-                if c == open_c:
-                    depth += 1
-                elif c == close_c:
-                    depth -= 1
-                    if depth == 0:
-                        candidate = text[start : i + 1]
-                        candidate = re.sub(r",\s*([}\]])", r"\1", candidate)
-                        candidate = re.sub(r"//.*?\n", "\n", candidate)
-                        try:
-                            return json.loads(candidate)
-                        except json.JSONDecodeError:
-                            break
-
-        raise ValueError(f"Could not extract JSON from: {text[:200]}...")
-
-    @staticmethod
-    def _ensure_dict_or_list(result: Any) -> dict | list:
-        """Guarantee return type is dict or list."""
-        if isinstance(result, (dict, list)):
-            return result
-        return {"value": result}
+"""
+LLM Client for GOVINDA V2 — Multi-provider (OpenAI Responses + DeepInfra Chat Completions).
+
+Simplified client focused on:
+- Text generation with reasoning effort control
+- JSON mode with robust extraction
+- Token usage tracking
+- Provider-aware routing: OpenAI models use Responses API,
+  DeepInfra models use Chat Completions API.
+
+No tool/function calling needed — retrieval is LLM-as-reasoner over trees,
+not agent-with-tools.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import io
+import json
+import logging
+import random
+import re
+import ssl
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Optional
+
+from openai import (
+    APIError,
+    APITimeoutError,
+    AsyncOpenAI,
+    DefaultHttpxClient,
+    InternalServerError,
+    OpenAI,
+    RateLimitError,
+)
+
+try:
+    import httpx
+except ImportError:  # ships with openai; guard for non-standard installs
+    httpx = None
+
+try:
+    # aiohttp transport (openai[aiohttp]) scales better than httpx's
+    # default async transport under many concurrent requests
+    from openai import DefaultAioHttpClient
+except ImportError:  # older openai releases
+    DefaultAioHttpClient = None
+
+from config.settings import get_settings
+from utils.json_utils import dumps_bytes, loads as _loads
+from utils.text_utils import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Precompiled patterns
+_THINK_BLOCK_RE = re.compile(r"<think>.*?</think>", re.DOTALL)
+_THINK_UNCLOSED_RE = re.compile(r"^<think>.*", re.DOTALL)
+_CODE_BLOCK_RE = re.compile(r"```(?:json)?\s*\n?(.*?)\n?\s*```", re.DOTALL)
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+_LINE_COMMENT_RE = re.compile(r"//.*?\n")
+
+# Shared decoder for raw_decode (extracts a JSON value embedded in prose)
+_JSON_DECODER = json.JSONDecoder()
+
+# Opening-brace positions _extract_json tries before giving up
+_MAX_JSON_STARTS = 16
+
+# Transient API failures chat_json retries; InternalServerError covers 5xx
+_RETRYABLE_ERRORS = (APITimeoutError, RateLimitError, InternalServerError)
+
+
+def _create_ssl_context() -> ssl.SSLContext:
+    """Default TLS context over the certifi bundle (what httpx verifies against)."""
+    try:
+        import certifi
+        return ssl.create_default_context(cafile=certifi.where())
+    except ImportError:
+        return ssl.create_default_context()
+
+
+# Built once per process: loading the CA bundle costs ~10 ms per client.
+# CA bundle changes therefore need a process restart to take effect.
+_SHARED_SSL_CTX = _create_ssl_context()
+
+
+# ─── Provider Registry ────────────────────────────────────────────────────────
+# Models whose IDs contain a slash (e.g. "zai-org/GLM-5") or match known
+# DeepInfra prefixes are routed to the DeepInfra Chat Completions API.
+# Everything else goes to the native OpenAI Responses API.
+
+DEEPINFRA_MODEL_PREFIXES = (
+    "zai-org/",
+    "deepseek-ai/",
+    "Qwen/",
+)
+
+# Per the DeepInfra docs, reasoning_effort is "for reasoning models" only.
+# Non-reasoning models (GLM-5, GLM-4.7-Flash, DeepSeek-V3) produce gibberish
+# or empty content when reasoning_effort is sent to them.
+DEEPINFRA_REASONING_MODELS = {
+    "deepseek-ai/DeepSeek-R1",
+    "Qwen/QwQ-32B",
+    "Qwen/Qwen3-235B-A22B",
+}
+
+
+def is_deepinfra_model(model_id: str) -> bool:
+    """Return True if *model_id* should be routed to DeepInfra."""
+    if any(model_id.startswith(p) for p in DEEPINFRA_MODEL_PREFIXES):
+        return True
+    # Generic heuristic: org/model format → DeepInfra
+    if "/" in model_id and not model_id.startswith("gpt-"):
+        return True
+    return False
+
+
+class LLMClient:
+    """
+    Multi-provider LLM client for GOVINDA V2.
+
+    - OpenAI models (gpt-5.5 and variants):
+      Use the native OpenAI Responses API.
+    - DeepInfra models (GLM-5, DeepSeek-V3, Qwen, etc.):
+      Use the OpenAI-compatible Chat Completions API via DeepInfra.
+
+    All LLM calls in GOVINDA V2 go through this client for
+    centralized token tracking.
+
+    Sync OpenAI clients (and their connection pools) are shared across
+    instances with the same credentials, so constructing an LLMClient is
+    cheap; usage counters remain per instance.
+    """
+
+    _shared_clients: dict[tuple[str, str], OpenAI] = {}
+    _shared_clients_lock = threading.Lock()
+
+    # Prompt hash -> (content, input_tokens, output_tokens), most recent last
+    _prompt_cache: OrderedDict[str, tuple[str, int, int]] = OrderedDict()
+    _prompt_cache_lock = threading.Lock()
+
+    def __init__(self, api_key: Optional[str] = None) -> None:
+        settings = self._settings = get_settings()
+        self._api_key = api_key or settings.llm.openai_api_key
+        self._client = self._shared_client(
+            ("openai", self._api_key),
+            lambda: OpenAI(
+                api_key=self._api_key, timeout=600.0, http_client=self._build_http_client(),
+            ),
+        )
+        self._model = settings.llm.model
+        self._model_pro = settings.llm.model_pro
+
+        # Async OpenAI client (lazy — created on first achat* call)
+        self._async_client: Optional[AsyncOpenAI] = None
+
+        # DeepInfra client (lazy — only created when needed)
+        self._deepinfra_client: Optional[OpenAI] = None
+        self._deepinfra_api_key = settings.llm.deepinfra_api_key
+        self._deepinfra_base_url = settings.llm.deepinfra_base_url
+
+        # Thread-safe usage tracking
+        self._usage_lock = threading.Lock()
+        self.total_input_tokens: int = 0
+        self.total_output_tokens: int = 0
+        self.total_calls: int = 0
+
+    def refresh_settings(self) -> None:
+        """Re-read settings (after get_settings.cache_clear(), e.g. in tests)."""
+        self._settings = get_settings()
+
+    # ------------------------------------------------------------------
+    # Usage tracking
+    # ------------------------------------------------------------------
+
+    def _get_deepinfra_client(self) -> OpenAI:
+        """Lazy-init and return the DeepInfra OpenAI-compatible client."""
+        if self._deepinfra_client is None:
+            if not self._deepinfra_api_key:
+                raise ValueError(
+                    "DEEPINFRA_API_KEY is not set. Add it to your .env file."
+                )
+            self._deepinfra_client = self._shared_client(
+                (self._deepinfra_base_url, self._deepinfra_api_key),
+                lambda: OpenAI(
+                    api_key=self._deepinfra_api_key,
+                    base_url=self._deepinfra_base_url,
+                    timeout=600.0,
+                    http_client=self._build_http_client(),
+                ),
+            )
+        return self._deepinfra_client
+
+    @classmethod
+    def _shared_client(cls, key: tuple[str, str], factory) -> OpenAI:
+        """Return the process-wide client for key, creating it on first use."""
+        client = cls._shared_clients.get(key)
+        if client is None:
+            with cls._shared_clients_lock:
+                client = cls._shared_clients.get(key)
+                if client is None:
+                    client = cls._shared_clients[key] = factory()
+        return client
+
+    @staticmethod
+    def _build_http_client() -> Optional[DefaultHttpxClient]:
+        """
+        Sync HTTP client with pool limits from settings.
+
+        httpx defaults (100 connections, 20 keep-alive) make concurrent
+        threads queue on the pool and re-handshake TLS. Returns None (use
+        the openai default) if httpx is unavailable.
+        """
+        if httpx is None:
+            return None
+        cfg = get_settings().llm
+        return DefaultHttpxClient(
+            limits=httpx.Limits(
+                max_connections=cfg.http_max_connections,
+                max_keepalive_connections=cfg.http_max_keepalive,
+                keepalive_expiry=cfg.http_keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(600.0, connect=cfg.http_connect_timeout),
+            verify=_SHARED_SSL_CTX,
+        )
+
+    def _get_async_client(self) -> AsyncOpenAI:
+        """
+        Lazy-init and return the async OpenAI client (aiohttp transport if available).
+
+        Kept per instance: async connections belong to the event loop that
+        opened them, so a process-wide client would break across loops.
+        """
+        if self._async_client is None:
+            http_client = None
+            if DefaultAioHttpClient is not None:
+                try:
+                    http_client = DefaultAioHttpClient(timeout=600.0)
+                except RuntimeError:  # httpx-aiohttp not installed
+                    http_client = None
+            self._async_client = AsyncOpenAI(
+                api_key=self._api_key, timeout=600.0, http_client=http_client,
+            )
+        return self._async_client
+
+    def _track_usage(self, response: Any, *, chat_completions: bool = False) -> tuple[int, int]:
+        """Extract and accumulate token counts. Returns (input, output)."""
+        usage = getattr(response, "usage", None)
+        if chat_completions:
+            # Chat Completions API uses prompt_tokens / completion_tokens
+            inp = getattr(usage, "prompt_tokens", 0) if usage else 0
+            out = getattr(usage, "completion_tokens", 0) if usage else 0
+        else:
+            # Responses API uses input_tokens / output_tokens
+            inp = getattr(usage, "input_tokens", 0) if usage else 0
+            out = getattr(usage, "output_tokens", 0) if usage else 0
+        return self._add_usage(inp, out)
+
+    def _add_usage(self, inp: int, out: int) -> tuple[int, int]:
+        with self._usage_lock:
+            self.total_input_tokens += inp
+            self.total_output_tokens += out
+            self.total_calls += 1
+        return inp, out
+
+    @property
+    def total_tokens(self) -> int:
+        return self.total_input_tokens + self.total_output_tokens
+
+    def reset_usage(self) -> None:
+        with self._usage_lock:
+            self.total_input_tokens = 0
+            self.total_output_tokens = 0
+            self.total_calls = 0
+
+    def get_usage_summary(self) -> dict[str, int]:
+        with self._usage_lock:
+            return {
+                "total_calls": self.total_calls,
+                "total_input_tokens": self.total_input_tokens,
+                "total_output_tokens": self.total_output_tokens,
+                "total_tokens": self.total_tokens,
+            }
+
+    # ------------------------------------------------------------------
+    # DeepInfra Chat Completions path
+    # ------------------------------------------------------------------
+
+    def _chat_deepinfra(
+        self,
+        messages: list[dict[str, str]],
+        model: str,
+        temperature: Optional[float],
+        max_tokens: int,
+        json_mode: bool,
+        reasoning_effort: Optional[str],
+    ) -> tuple[str, int, int, float, str, bool]:
+        """
+        Call DeepInfra via the OpenAI Chat Completions API.
+
+        Params sent per the DeepInfra API schema:
+          - model, messages, max_tokens          (required/basic)
+          - temperature                          (default 1, all models)
+          - reasoning_effort                     (reasoning models only, per docs)
+          - response_format                      (json_object, json_schema, text, regex)
+
+        Returns:
+            (content, input_tokens, output_tokens, elapsed, effort, was_truncated)
+        """
+        client = self._get_deepinfra_client()
+
+        # Clamp reasoning_effort to DeepInfra's accepted values: none/low/medium/high
+        effort = reasoning_effort or "none"
+        if effort == "xhigh":
+            effort = "high"
+        if effort == "minimal":
+            effort = "low"
+
+        kwargs: dict[str, Any] = {
+            "model": model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+        }
+
+        # reasoning_effort — per docs, only "for reasoning models".
+        # Non-reasoning models produce gibberish/empty when this is sent.
+        if effort and effort != "none" and model in DEEPINFRA_REASONING_MODELS:
+            kwargs["reasoning_effort"] = effort
+
+        # temperature — all DeepInfra models accept this (default: 1)
+        if temperature is not None:
+            kwargs["temperature"] = temperature
+
+        # response_format — all DeepInfra models accept json_object
+        if json_mode:
+            kwargs["response_format"] = {"type": "json_object"}
+
+        logger.debug(
+            "DeepInfra request: model=%s effort=%s temp=%s json=%s max_tokens=%d",
+            model, effort, temperature, json_mode, max_tokens,
+        )
+
+        start = time.time()
+        response = client.chat.completions.create(**kwargs)
+        elapsed = time.time() - start
+
+        inp, out = self._track_usage(response, chat_completions=True)
+
+        # Extract content — order matters:
+        #   1. Get raw content + reasoning_content
+        #   2. Strip <think> tags from content (DeepSeek-R1 puts CoT there)
+        #   3. If content empty after stripping, fall back to reasoning_content
+        content = ""
+        if response.choices:
+            msg = response.choices[0].message
+            raw_content = msg.content or ""
+            raw_reasoning = getattr(msg, "reasoning_content", None) or ""
+
+            logger.debug(
+                "DeepInfra %s: raw content=%d chars, raw reasoning_content=%d chars",
+                model, len(raw_content), len(raw_reasoning),
+            )
+
+            content = raw_content
+
+            # Step 1: Strip <think>...</think> chain-of-thought from content
+            if "<think>" in content:
+                content = _THINK_BLOCK_RE.sub("", content).strip()
+                if content.startswith("<think>"):
+                    content = _THINK_UNCLOSED_RE.sub("", content).strip()
+
+            # Step 2: If content is empty after stripping, try reasoning_content
+            if not content.strip() and raw_reasoning.strip():
+                logger.info(
+                    "DeepInfra %s: content empty (raw=%d chars), using reasoning_content (%d chars)",
+                    model, len(raw_content), len(raw_reasoning),
+                )
+                content = raw_reasoning
+                # Strip <think> from reasoning_content too
+                if "<think>" in content:
+                    content = _THINK_BLOCK_RE.sub("", content).strip()
+                    if content.startswith("<think>"):
+                        content = _THINK_UNCLOSED_RE.sub("", content).strip()
+
+            if not content.strip():
+                logger.warning(
+                    "DeepInfra %s: EMPTY response after all extraction. "
+                    "raw_content=%d, raw_reasoning=%d, finish_reason=%s, tokens=%d/%d",
+                    model, len(raw_content), len(raw_reasoning),
+                    response.choices[0].finish_reason, inp, out,
+                )
+
+        # Detect truncation via finish_reason
+        was_truncated = (
+            response.choices[0].finish_reason == "length"
+            if response.choices
+            else False
+        )
+
+        return content, inp, out, elapsed, effort, was_truncated
+
+    # ------------------------------------------------------------------
+    # Prompt dedup cache
+    # ------------------------------------------------------------------
+
+    def _prompt_key(
+        self,
+        messages: list[dict[str, str]],
+        model: Optional[str],
+        temperature: Optional[float],
+        max_tokens: Optional[int],
+        json_mode: bool,
+        reasoning_effort: Optional[str],
+        cache: bool,
+    ) -> Optional[str]:
+        """SHA-256 of the request, or None when it must not be cached."""
+        # Sampled (temperature) calls must stay free to differ
+        if not cache or temperature is not None or self._settings.llm.prompt_cache_size <= 0:
+            return None
+        payload = [
+            model or self._model,
+            reasoning_effort or "low",
+            json_mode,
+            temperature,
+            max_tokens or self._settings.llm.max_tokens_default,
+            messages,
+        ]
+        return hashlib.sha256(dumps_bytes(payload)).hexdigest()
+
+    def _cache_get(self, key: str) -> Optional[tuple[str, int, int]]:
+        with self._prompt_cache_lock:
+            hit = self._prompt_cache.get(key)
+            if hit is not None:
+                self._prompt_cache.move_to_end(key)
+            return hit
+
+    def _cache_put(self, key: str, content: str, inp: int, out: int) -> None:
+        with self._prompt_cache_lock:
+            self._prompt_cache[key] = (content, inp, out)
+            self._prompt_cache.move_to_end(key)
+            while len(self._prompt_cache) > self._settings.llm.prompt_cache_size:
+                self._prompt_cache.popitem(last=False)
+
+    def _forget_prompt(self, *request: Any) -> None:
+        """Drop a cached response the caller could not use, so a retry hits the API."""
+        key = self._prompt_key(*request)
+        if key is not None:
+            with self._prompt_cache_lock:
+                self._prompt_cache.pop(key, None)
+
+    # ------------------------------------------------------------------
+    # Core text generation
+    # ------------------------------------------------------------------
+
+    def _responses_kwargs(
+        self,
+        messages: list[dict[str, str]],
+        model: str,
+        temperature: Optional[float],
+        max_tokens: int,
+        json_mode: bool,
+        reasoning_effort: Optional[str],
+    ) -> tuple[dict[str, Any], str]:
+        """Build Responses API kwargs. Returns (kwargs, effective_effort)."""
+        # Reasoning effort defaults.
+        # All callers in the intelligence pipeline pass explicit reasoning_effort,
+        # so this fallback only applies to generic chat() calls. Default "low"
+        # keeps reasoning active without heavy cost.
+        effort = reasoning_effort if reasoning_effort else "low"
+
+        # Temperature only works with reasoning_effort="none"
+        if effort == "none":
+            temperature = temperature if temperature is not None else self._settings.llm.temperature
+        else:
+            temperature = None
+
+        kwargs = {
+            **_kwargs_template(model, effort, json_mode, temperature),
+            "input": messages,
+            "max_output_tokens": max_tokens,
+        }
+        return kwargs, effort
+
+    def chat(
+        self,
+        messages: list[dict[str, str]],
+        model: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        json_mode: bool = False,
+        reasoning_effort: Optional[str] = None,
+        cache: bool = False,
+    ) -> str:
+        """
+        Send an LLM request and return the response text.
+
+        Automatically routes to the correct provider:
+        - OpenAI models → Responses API
+        - DeepInfra models → Chat Completions API
+
+        Args:
+            messages: List of {"role": ..., "content": ...} dicts.
+            model: Override model (defaults to gpt-5.5).
+            temperature: Override temperature. Only effective when
+                         reasoning_effort is "none".
+            max_tokens: Override max_output_tokens.
+            json_mode: If True, request JSON response format.
+            reasoning_effort: "none" | "low" | "medium" | "high" | "xhigh".
+                              Defaults to "low" when not specified.
+            cache: Allow serving an identical earlier request from the
+                   prompt cache (LLM_PROMPT_CACHE_SIZE > 0). Only for
+                   idempotent callers such as ingestion; never used when
+                   temperature is set.
+
+        Returns:
+            The assistant's response text.
+        """
+        return self._do_chat(
+            messages, model, temperature, max_tokens, json_mode, reasoning_effort, cache,
+        )[0]
+
+    def chat_with_status(
+        self,
+        messages: list[dict[str, str]],
+        model: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        json_mode: bool = False,
+        reasoning_effort: Optional[str] = None,
+        cache: bool = False,
+    ) -> tuple[str, bool]:
+        """
+        Same as chat() but also returns whether the response was truncated.
+
+        Returns:
+            Tuple of (response_text, was_truncated).
+            was_truncated is True when the API stopped due to max_output_tokens.
+        """
+        return self._do_chat(
+            messages, model, temperature, max_tokens, json_mode, reasoning_effort, cache,
+        )
+
+    def _do_chat(
+        self,
+        messages: list[dict[str, str]],
+        model: Optional[str],
+        temperature: Optional[float],
+        max_tokens: Optional[int],
+        json_mode: bool,
+        reasoning_effort: Optional[str],
+        cache: bool = False,
+    ) -> tuple[str, bool]:
+        """
+        Shared body of chat() and chat_with_status(): one provider call.
+
+        With cache=True, complete (non-truncated, non-empty) responses are
+        cached by request hash; a hit counts the original tokens but makes
+        no API call.
+        """
+        key = self._prompt_key(
+            messages, model, temperature, max_tokens, json_mode, reasoning_effort, cache,
+        )
+        if key is not None:
+            hit = self._cache_get(key)
+            if hit is not None:
+                content, inp, out = hit
+                self._add_usage(inp, out)
+                logger.debug("LLM call [cache]: model=%s tokens=%d/%d", model or self._model, inp, out)
+                return content, False
+
+        content, was_truncated, inp, out = self._call_provider(
+            messages, model, temperature, max_tokens, json_mode, reasoning_effort,
+        )
+        if key is not None and not was_truncated and content.strip():
+            self._cache_put(key, content, inp, out)
+        return content, was_truncated
+
+    def _call_provider(
+        self,
+        messages: list[dict[str, str]],
+        model: Optional[str],
+        temperature: Optional[float],
+        max_tokens: Optional[int],
+        json_mode: bool,
+        reasoning_effort: Optional[str],
+    ) -> tuple[str, bool, int, int]:
+        """Route one request to its provider. Returns (content, was_truncated, input, output)."""
+        settings = self._settings
+        model = model or self._model
+        max_tokens = max_tokens or settings.llm.max_tokens_default
+
+        # ── DeepInfra path ────────────────────────────────────────────
+        if is_deepinfra_model(model):
+            content, inp, out, elapsed, effort, was_truncated = self._chat_deepinfra(
+                messages, model, temperature, max_tokens, json_mode, reasoning_effort,
+            )
+            logger.debug(
+                "LLM call [deepinfra]: model=%s tokens=%d/%d latency=%.2fs effort=%s truncated=%s",
+                model, inp, out, elapsed, effort, was_truncated,
+            )
+            return content, was_truncated, inp, out
+
+        # ── OpenAI Responses API path ─────────────────────────────────
+        kwargs, effort = self._responses_kwargs(
+            messages, model, temperature, max_tokens, json_mode, reasoning_effort,
+        )
+
+        start = time.time()
+        response = self._client.responses.create(**kwargs)
+        elapsed = time.time() - start
+
+        inp, out = self._track_usage(response)
+        content = response.output_text or ""
+
+        # Detect truncation via API status
+        was_truncated = getattr(response, "status", "") == "incomplete"
+
+        logger.debug(
+            "LLM call [openai]: model=%s tokens=%d/%d latency=%.2fs effort=%s truncated=%s",
+            model,
+            inp,
+            out,
+            elapsed,
+            effort,
+            was_truncated,
+        )
+
+        return content, was_truncated, inp, out
+
+    def chat_pro(
+        self,
+        messages: list[dict[str, str]],
+        max_tokens: Optional[int] = None,
+        json_mode: bool = False,
+        reasoning_effort: str = "medium",
+    ) -> str:
+        """Chat with medium reasoning effort (deep synthesis calls)."""
+        return self.chat(
+            messages=messages,
+            model=self._model_pro,
+            max_tokens=max_tokens,
+            json_mode=json_mode,
+            reasoning_effort=reasoning_effort,
+        )
+
+    # ------------------------------------------------------------------
+    # JSON extraction with multi-fallback
+    # ------------------------------------------------------------------
+
+    def chat_json(
+        self,
+        messages: list[dict[str, str]],
+        model: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        retries: Optional[int] = None,
+        reasoning_effort: Optional[str] = None,
+        cache: bool = False,
+    ) -> dict | list:
+        """
+        Chat and extract JSON from the response with multi-fallback.
+
+        Strategies:
+        1. Direct json.loads on json_mode response
+        2. Code block extraction (```json ... ```)
+        3. Balanced brace/bracket extraction
+        4. Retry without json_mode as final fallback
+
+        cache is passed to chat() for the json_mode attempts; an answer that
+        fails to parse is evicted so the retry reaches the model.
+        """
+        last_error: Exception | None = None
+        content = ""
+
+        if retries is None:
+            retries = self._settings.llm.json_max_retries
+        for attempt in range(retries):
+            try:
+                content = self.chat(
+                    messages=messages,
+                    model=model,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    json_mode=True,
+                    reasoning_effort=reasoning_effort,
+                    cache=cache,
+                )
+                if len(content.strip()) < 3:
+                    raise ValueError(
+                        f"LLM returned empty/trivial response (len={len(content.strip())})"
+                    )
+                return self._ensure_dict_or_list(self._extract_json(content))
+            except (json.JSONDecodeError, ValueError) as e:
+                last_error = e
+                self._forget_prompt(
+                    messages, model, temperature, max_tokens, True, reasoning_effort, cache,
+                )
+                logger.warning(
+                    "JSON parse attempt %d/%d failed: %s",
+                    attempt + 1,
+                    retries,
+                    str(e)[:120],
+                )
+            except _RETRYABLE_ERRORS as e:
+                last_error = e
+                logger.warning(
+                    "API error on attempt %d/%d: %s",
+                    attempt + 1,
+                    retries,
+                    str(e)[:120],
+                )
+                if not isinstance(e, APITimeoutError) and attempt + 1 < retries:
+                    time.sleep(_retry_delay(e, attempt))
+
+        # Final fallback: try without json_mode
+        try:
+            content = self.chat(
+                messages=messages,
+                model=model,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                json_mode=False,
+                reasoning_effort=reasoning_effort,
+            )
+            if len(content.strip()) >= 3:
+                return self._ensure_dict_or_list(self._extract_json(content))
+        except (json.JSONDecodeError, ValueError) + _RETRYABLE_ERRORS:
+            pass
+
+        logger.error("All JSON parse attempts failed")
+        raise last_error or ValueError("Failed to extract JSON after all retries")
+
+    def chat_json_with_status(
+        self,
+        messages: list[dict[str, str]],
+        model: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        reasoning_effort: Optional[str] = None,
+    ) -> tuple[dict | list, bool]:
+        """
+        Chat and extract JSON, also returning truncation status.
+
+        Unlike chat_json(), this does NOT retry on truncation — it returns
+        whatever JSON it can salvage plus a was_truncated flag so the caller
+        can decide how to continue.
+
+        Returns:
+            Tuple of (parsed_json, was_truncated).
+        """
+        content, was_truncated = self.chat_with_status(
+            messages=messages,
+            model=model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            json_mode=True,
+            reasoning_effort=reasoning_effort,
+        )
+
+        return self._parse_with_salvage(content, was_truncated)
+
+    def _parse_with_salvage(self, content: str, was_truncated: bool) -> tuple[dict | list, bool]:
+        """Parse a JSON response, salvaging what it can when it was truncated."""
+        if len(content.strip()) < 3:
+            raise ValueError(
+                f"LLM returned empty/trivial response (len={len(content.strip())})"
+            )
+
+        # If truncated, the JSON is likely incomplete. Try to salvage what we can.
+        if was_truncated:
+            logger.warning(
+                "Response was truncated (max_output_tokens). Attempting JSON salvage..."
+            )
+            try:
+                result = self._extract_json(content)
+                return self._ensure_dict_or_list(result), True
+            except (json.JSONDecodeError, ValueError):
+                # JSON is broken due to truncation. Try to repair by closing
+                # the answer_text field and the outer object.
+                repaired = self._repair_truncated_json(content)
+                if repaired is not None:
+                    return self._ensure_dict_or_list(repaired), True
+                # Last resort: wrap raw text
+                logger.warning("Could not salvage truncated JSON, wrapping raw text")
+                return {
+                    "answer_text": content,
+                    "citations": [],
+                    "inferred_points": [],
+                }, True
+
+        # Normal (non-truncated) path
+        return self._ensure_dict_or_list(self._extract_json(content)), False
+
+    def chat_json_streaming(
+        self,
+        messages: list[dict[str, str]],
+        model: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        reasoning_effort: Optional[str] = None,
+    ) -> tuple[dict | list, bool]:
+        """
+        Streaming chat_json_with_status().
+
+        Deltas are fed to an incremental brace scanner, so the object is cut
+        at its closing brace even if the model keeps writing; the stream is
+        still drained to the final event so token usage is recorded. A
+        truncated stream goes through the same salvage path as
+        chat_json_with_status(). DeepInfra models, and any API or stream
+        error, fall back to chat_json_with_status().
+
+        Returns:
+            Tuple of (parsed_json, was_truncated).
+        """
+        model = model or self._model
+        max_tokens = max_tokens or self._settings.llm.max_tokens_default
+        if not is_deepinfra_model(model):
+            try:
+                content, was_truncated = self._stream_json_text(
+                    messages, model, temperature, max_tokens, reasoning_effort,
+                )
+                return self._parse_with_salvage(content, was_truncated)
+            except APIError as e:
+                logger.warning("Streaming JSON call failed, falling back: %s", str(e)[:120])
+
+        return self.chat_json_with_status(
+            messages, model=model, temperature=temperature,
+            max_tokens=max_tokens, reasoning_effort=reasoning_effort,
+        )
+
+    def _stream_json_text(
+        self,
+        messages: list[dict[str, str]],
+        model: str,
+        temperature: Optional[float],
+        max_tokens: int,
+        reasoning_effort: Optional[str],
+    ) -> tuple[str, bool]:
+        """Stream one JSON-mode Responses call. Returns (object_text, was_truncated)."""
+        kwargs, effort = self._responses_kwargs(
+            messages, model, temperature, max_tokens, True, reasoning_effort,
+        )
+        kwargs["stream"] = True
+
+        scanner = _JsonObjectScanner()
+        end: Optional[int] = None
+        final_response: Any = None
+        start = time.time()
+        stream = self._client.responses.create(**kwargs)
+        try:
+            for event in stream:
+                event_type = getattr(event, "type", "")
+                if event_type == "response.output_text.delta":
+                    if end is None:
+                        end = scanner.feed(event.delta)
+                elif event_type in ("response.completed", "response.incomplete"):
+                    final_response = event.response
+        finally:
+            stream.close()
+        elapsed = time.time() - start
+
+        if final_response is not None:
+            inp, out = self._track_usage(final_response)
+        else:
+            # Stream ended without a final event: estimate rather than count 0
+            inp, out = self._add_usage(
+                sum(estimate_tokens(str(m.get("content", ""))) for m in messages),
+                estimate_tokens(scanner.text),
+            )
+        was_truncated = end is None and getattr(final_response, "status", "") == "incomplete"
+        logger.debug(
+            "LLM stream [openai]: model=%s tokens=%d/%d latency=%.2fs effort=%s truncated=%s",
+            model, inp, out, elapsed, effort, was_truncated,
+        )
+
+        content = scanner.text[:end] if end is not None else scanner.text
+        return content, was_truncated
+
+    # ------------------------------------------------------------------
+    # Async variants
+    # ------------------------------------------------------------------
+
+    async def achat(
+        self,
+        messages: list[dict[str, str]],
+        model: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        json_mode: bool = False,
+        reasoning_effort: Optional[str] = None,
+    ) -> str:
+        """Async chat(). Lets callers fan out independent calls with asyncio.gather."""
+        content, _ = await self.achat_with_status(
+            messages, model, temperature, max_tokens, json_mode, reasoning_effort,
+        )
+        return content
+
+    async def achat_with_status(
+        self,
+        messages: list[dict[str, str]],
+        model: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        json_mode: bool = False,
+        reasoning_effort: Optional[str] = None,
+    ) -> tuple[str, bool]:
+        """
+        Async chat_with_status().
+
+        DeepInfra models run the sync path in a worker thread; OpenAI models
+        use the async client.
+        """
+        settings = self._settings
+        model = model or self._model
+        max_tokens = max_tokens or settings.llm.max_tokens_default
+
+        if is_deepinfra_model(model):
+            content, inp, out, elapsed, effort, was_truncated = await asyncio.to_thread(
+                self._chat_deepinfra,
+                messages, model, temperature, max_tokens, json_mode, reasoning_effort,
+            )
+            logger.debug(
+                "LLM call [deepinfra async]: model=%s tokens=%d/%d latency=%.2fs effort=%s truncated=%s",
+                model, inp, out, elapsed, effort, was_truncated,
+            )
+            return content, was_truncated
+
+        kwargs, effort = self._responses_kwargs(
+            messages, model, temperature, max_tokens, json_mode, reasoning_effort,
+        )
+
+        start = time.time()
+        response = await self._get_async_client().responses.create(**kwargs)
+        elapsed = time.time() - start
+
+        inp, out = self._track_usage(response)
+        content = response.output_text or ""
+        was_truncated = getattr(response, "status", "") == "incomplete"
+
+        logger.debug(
+            "LLM call [openai async]: model=%s tokens=%d/%d latency=%.2fs effort=%s truncated=%s",
+            model, inp, out, elapsed, effort, was_truncated,
+        )
+        return content, was_truncated
+
+    async def achat_json(
+        self,
+        messages: list[dict[str, str]],
+        model: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        retries: Optional[int] = None,
+        reasoning_effort: Optional[str] = None,
+    ) -> dict | list:
+        """Async chat_json(), with the same retry and extraction fallbacks."""
+        last_error: Exception | None = None
+
+        if retries is None:
+            retries = self._settings.llm.json_max_retries
+        for attempt in range(retries):
+            try:
+                content = await self.achat(
+                    messages=messages,
+                    model=model,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    json_mode=True,
+                    reasoning_effort=reasoning_effort,
+                )
+                if len(content.strip()) < 3:
+                    raise ValueError(
+                        f"LLM returned empty/trivial response (len={len(content.strip())})"
+                    )
+                return self._ensure_dict_or_list(self._extract_json(content))
+            except (json.JSONDecodeError, ValueError) as e:
+                last_error = e
+                logger.warning(
+                    "JSON parse attempt %d/%d failed: %s",
+                    attempt + 1,
+                    retries,
+                    str(e)[:120],
+                )
+            except _RETRYABLE_ERRORS as e:
+                last_error = e
+                logger.warning(
+                    "API error on attempt %d/%d: %s",
+                    attempt + 1,
+                    retries,
+                    str(e)[:120],
+                )
+                if not isinstance(e, APITimeoutError) and attempt + 1 < retries:
+                    await asyncio.sleep(_retry_delay(e, attempt))
+
+        # Final fallback: try without json_mode
+        try:
+            content = await self.achat(
+                messages=messages,
+                model=model,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                json_mode=False,
+                reasoning_effort=reasoning_effort,
+            )
+            if len(content.strip()) >= 3:
+                return self._ensure_dict_or_list(self._extract_json(content))
+        except (json.JSONDecodeError, ValueError) + _RETRYABLE_ERRORS:
+            pass
+
+        logger.error("All JSON parse attempts failed")
+        raise last_error or ValueError("Failed to extract JSON after all retries")
+
+    async def chat_json_many(
+        self,
+        messages_list: list[list[dict[str, str]]],
+        concurrency: int = 32,
+        **kwargs: Any,
+    ) -> list[dict | list | BaseException]:
+        """
+        Run achat_json over many prompts concurrently, at most `concurrency`
+        in flight at once.
+
+        Results are in input order. A failed prompt yields its exception
+        in place of a result instead of failing the whole batch. Extra
+        kwargs (model, max_tokens, reasoning_effort, ...) apply to every call.
+        """
+        sem = asyncio.Semaphore(concurrency)
+
+        async def one(messages: list[dict[str, str]]) -> dict | list:
+            async with sem:
+                return await self.achat_json(messages, **kwargs)
+
+        return await asyncio.gather(
+            *(one(m) for m in messages_list), return_exceptions=True
+        )
+
+    # ------------------------------------------------------------------
+    # Batch API (offline workloads)
+    # ------------------------------------------------------------------
+
+    def submit_batch(
+        self,
+        messages_list: list[list[dict[str, str]]],
+        model: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+        reasoning_effort: Optional[str] = None,
+        json_mode: bool = True,
+    ) -> str:
+        """
+        Submit prompts as one OpenAI Batch API job and return the batch id.
+
+        Batches complete asynchronously (24h window) at reduced cost with a
+        separate rate-limit pool; use for bulk offline extraction, not for
+        interactive requests. Collect results with fetch_batch().
+        """
+        model = model or self._model
+        if is_deepinfra_model(model):
+            raise ValueError(f"Batch API is not available for DeepInfra model {model}")
+        max_tokens = max_tokens or self._settings.llm.max_tokens_default
+
+        buf = io.BytesIO()
+        for i, messages in enumerate(messages_list):
+            body, _ = self._responses_kwargs(
+                messages, model, None, max_tokens, json_mode, reasoning_effort,
+            )
+            line = {"custom_id": str(i), "method": "POST", "url": "/v1/responses", "body": body}
+            buf.write(json.dumps(line, ensure_ascii=False).encode("utf-8"))
+            buf.write(b"\n")
+
+        batch_file = self._client.files.create(
+            file=("batch.jsonl", buf.getvalue()), purpose="batch",
+        )
+        batch = self._client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/responses",
+            completion_window="24h",
+        )
+        logger.info("Submitted LLM batch %s (%d requests)", batch.id, len(messages_list))
+        return batch.id
+
+    def fetch_batch(
+        self,
+        batch_id: str,
+        poll_interval: float = 5.0,
+        max_poll_interval: float = 60.0,
+        timeout: Optional[float] = None,
+    ) -> list[Optional[dict | list]]:
+        """
+        Wait for a batch to finish and return parsed JSON results in
+        submission order.
+
+        Polls with exponential backoff. Entries whose request failed or
+        whose output could not be parsed are None. Raises RuntimeError if
+        the batch ends in any state other than completed, or TimeoutError
+        after `timeout` seconds.
+        """
+        deadline = time.time() + timeout if timeout is not None else None
+        delay = poll_interval
+        while True:
+            batch = self._client.batches.retrieve(batch_id)
+            if batch.status in ("completed", "failed", "expired", "cancelled"):
+                break
+            if deadline is not None and time.time() + delay > deadline:
+                raise TimeoutError(f"Batch {batch_id} still {batch.status}")
+            time.sleep(delay)
+            delay = min(delay * 2, max_poll_interval)
+
+        if batch.status != "completed":
+            raise RuntimeError(f"Batch {batch_id} ended with status {batch.status}")
+
+        total = getattr(getattr(batch, "request_counts", None), "total", 0) or 0
+        results: list[Optional[dict | list]] = [None] * total
+        if not batch.output_file_id:
+            return results
+
+        content = self._client.files.content(batch.output_file_id).text
+        for line in content.splitlines():
+            if not line.strip():
+                continue
+            row = _loads(line)
+            idx = int(row["custom_id"])
+            if idx >= len(results):
+                results.extend([None] * (idx + 1 - len(results)))
+            body = (row.get("response") or {}).get("body") or {}
+            usage = body.get("usage") or {}
+            self._add_usage(usage.get("input_tokens", 0), usage.get("output_tokens", 0))
+            text = "".join(
+                part.get("text", "")
+                for item in body.get("output", [])
+                if item.get("type") == "message"
+                for part in item.get("content", [])
+                if part.get("type") == "output_text"
+            )
+            try:
+                results[idx] = self._ensure_dict_or_list(self._extract_json(text))
+            except (json.JSONDecodeError, ValueError) as e:
+                logger.warning("Batch %s item %d unparseable: %s", batch_id, idx, str(e)[:120])
+        return results
+
+    @staticmethod
+    def _repair_truncated_json(text: str) -> dict | None:
+        """
+        Attempt to repair a JSON object that was truncated mid-stream.
+
+        Strategy: close exactly the strings/brackets left open (found in
+        one forward scan); if that does not parse (e.g. cut inside a key),
+        back off up to 200 chars, closing at the last complete value before
+        a comma or trying common closers.
+        """
+        text = text.strip()
+
+        # Find the start of the JSON object
+        obj_start = text.find("{")
+        if obj_start == -1:
+            return None
+        # Trailing-comma clean-up is idempotent, so do it once up front
+        body = _TRAILING_COMMA_RE.sub(r"\1", text[obj_start:])
+
+        def parse(attempt: str) -> dict | None:
+            try:
+                result = _loads(attempt)
+            except json.JSONDecodeError:
+                return None
+            return result if isinstance(result, dict) and "answer_text" in result else None
+
+        closed = _close_open_json(body)
+        if closed is not None:
+            result = parse(closed)
+            if result is not None:
+                return result
+
+        # Back off to earlier cut points; don't search more than 200 chars
+        for try_end in range(len(body) - 1, max(0, len(body) - 202), -1):
+            candidate = body[: try_end + 1].rstrip()
+            if candidate.endswith(","):
+                candidate = candidate[:-1]
+                # A comma follows a complete value: drop the partial element
+                # after it and close everything still open around it
+                closed = _close_open_json(candidate)
+                if closed is not None:
+                    result = parse(closed)
+                    if result is not None:
+                        return result
+            for closer in ("}", '"}', '"]}', '""]}', '": []}'):
+                result = parse(candidate + closer)
+                if result is not None:
+                    return result
+
+        return None
+
+    @staticmethod
+    def _extract_json(text: str) -> dict | list:
+        """Extract JSON from LLM response text with multiple fallbacks."""
+        text = text.strip()
+
+        # Strip <think>...</think> blocks that some reasoning models prepend
+        if "<think>" in text:
+            text = _THINK_BLOCK_RE.sub("", text).strip()
+            # Handle unclosed <think> (truncated response)
+            if text.startswith("<think>"):
+                text = _THINK_UNCLOSED_RE.sub("", text).strip()
+
+        # Strategy 1: Direct parse
+        try:
+            return _loads(text)
+        except json.JSONDecodeError:
+            pass
+
+        # Strategy 2: Code block extraction
+        code_block = _CODE_BLOCK_RE.search(text)
+        if code_block:
+            try:
+                return _loads(code_block.group(1).strip())
+            except json.JSONDecodeError:
+                pass
+
+        # Strategy 3: Decode from the first opening brace/bracket. raw_decode
+        # (C scanner) stops at the end of the value and ignores trailing text;
+        # on failure, advance to the next opener.
+        for open_c in ("{", "["):
+            start = text.find(open_c)
+            for _ in range(_MAX_JSON_STARTS):
+                if start == -1:
+                    break
+                try:
+                    return _JSON_DECODER.raw_decode(text, start)[0]
+                except json.JSONDecodeError:
+                    pass
+                # Tolerate trailing commas and // comments from sloppy output
+                cleaned = _TRAILING_COMMA_RE.sub(r"\1", text[start:])
+                cleaned = _LINE_COMMENT_RE.sub("\n", cleaned)
+                try:
+                    return _JSON_DECODER.raw_decode(cleaned)[0]
+                except json.JSONDecodeError:
+                    start = text.find(open_c, start + 1)
+
+        raise ValueError(f"Could not extract JSON from: {text[:200]}...")
+
+    @staticmethod
+    def _ensure_dict_or_list(result: Any) -> dict | list:
+        """Guarantee return type is dict or list."""
+        if isinstance(result, (dict, list)):
+            return result
+        return {"value": result}
+
+
+def _close_open_json(text: str) -> Optional[str]:
+    """
+    Close a truncated JSON document: terminate an open string, drop a
+    dangling comma, and append the closers for every open bracket.
+
+    Returns None if nothing is open (or brackets are unbalanced).
+    """
+    stack: list[str] = []
+    in_string = False
+    escape = False
+    for c in text:
+        if escape:
+            escape = False
+        elif in_string:
+            if c == "\\":
+                escape = True
+            elif c == '"':
+                in_string = False
+        elif c == '"':
+            in_string = True
+        elif c == "{":
+            stack.append("}")
+        elif c == "[":
+            stack.append("]")
+        elif c in "}]":
+            if not stack:
+                return None
+            stack.pop()
+
+    if not stack:
+        return None
+    if escape:
+        text = text[:-1]
+    if in_string:
+        text += '"'
+    else:
+        text = text.rstrip()
+        if text.endswith(","):
+            text = text[:-1]
+    return text + "".join(reversed(stack))
+
+
+@lru_cache(maxsize=64)
+def _kwargs_template(
+    model: str, effort: str, json_mode: bool, temperature: Optional[float],
+) -> MappingProxyType:
+    """
+    Fixed part of a Responses API request for one call shape.
+
+    Read-only so a cached template cannot be altered by a caller; the nested
+    reasoning/text dicts are shared between requests, which is safe because
+    the SDK only reads them.
+    """
+    kwargs: dict[str, Any] = {
+        "model": model,
+        "store": False,
+        "reasoning": {"effort": effort},
+    }
+    if temperature is not None:
+        kwargs["temperature"] = temperature
+    if json_mode:
+        kwargs["text"] = {"format": {"type": "json_object"}}
+    return MappingProxyType(kwargs)
+
+
+def _retry_delay(error: Exception, attempt: int) -> float:
+    """
+    Seconds to wait before retrying after a rate-limit or server error.
+
+    Honours the server's retry-after-ms / retry-after headers when present;
+    otherwise exponential backoff with jitter so concurrent callers don't
+    retry in lockstep.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    for header, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(header)
+        if value:
+            try:
+                return float(value) * scale + random.random()
+            except ValueError:  # HTTP-date form; fall through to backoff
+                pass
+    return get_settings().llm.retry_base_delay * 2**attempt + random.random()
+
+
+class _JsonObjectScanner:
+    """
+    Incremental brace scanner over streamed text.
+
+    feed() appends a chunk and returns the end offset (exclusive) of the
+    first complete top-level JSON object, or None if it is still open.
+    String literals and escapes are tracked so braces inside values are
+    ignored.
+    """
+
+    __slots__ = ("_parts", "_length", "_depth", "_in_string", "_escape", "_started")
+
+    def __init__(self) -> None:
+        self._parts: list[str] = []
+        self._length = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._started = False
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
+    def feed(self, chunk: str) -> Optional[int]:
+        offset = self._length
+        self._parts.append(chunk)
+        self._length += len(chunk)
+
+        for i, c in enumerate(chunk):
+            if self._escape:
+                self._escape = False
+                continue
+            if self._in_string:
+                if c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                continue
+            if c == '"':
+                self._in_string = self._started
+            elif c == "{":
+                self._depth += 1
+                self._started = True
+            elif c == "}" and self._started:
+                self._depth -= 1
+                if self._depth == 0:
+                    return offset + i + 1
+        return None
@@ -1,70 +1,95 @@
-import logging
-import os
-from typing import Optional
-from pymongo import MongoClient
-import gridfs
-from config.settings import get_settings
-
-logger = logging.getLogger(__name__)
-
-class MongoManager:
-    _instance = None
-    _client: Optional[MongoClient] = None
-    _db = None
-    _fs = None
-
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(MongoManager, cls).__new__(cls)
-            cls._instance._initialize()
-        return cls._instance
-
-    def _initialize(self):
-        settings = get_settings()
-        mongo_uri = os.getenv("MONGO_URI", "mongodb://localhost:27017")
-        db_name = os.getenv("MONGO_DB_NAME", "govinda_v2")
-
-        try:
-            # Atlas (mongodb+srv) requires server_api for stable API
-            if mongo_uri.startswith("mongodb+srv"):
-                from pymongo.server_api import ServerApi
-                self._client = MongoClient(
-                    mongo_uri,
-                    server_api=ServerApi("1"),
-                    tls=True,
-                    tlsAllowInvalidCertificates=False,
-                )
-            else:
-                # Configure connection pool size for better concurrency (FIX #6)
-                pool_opts = {
-                    "maxPoolSize": int(os.getenv("MONGO_MAX_POOL", "50")),
-                    "minPoolSize": int(os.getenv("MONGO_MIN_POOL", "5")),
-                    "connectTimeoutMS": int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "10000")),
-                }
-                self._client = MongoClient(mongo_uri, **pool_opts)
-
-            self._db = self._client[db_name]
-            self._fs = gridfs.GridFS(self._db)
-            self._client.admin.command("ping")
-            logger.info(f"Connected to MongoDB: {db_name}")
-        except Exception as e:
-            logger.error(f"Failed to connect to MongoDB: {e}")
-            raise e
-
-    @property
-    def db(self):
-        return self._db
-
-    @property
-    def fs(self):
-        return self._fs
-
-    def get_collection(self, name: str):
-        return self._db[name]
-
-# Global helper to access db
-def get_db():
-    return MongoManager().db
-
-def get_fs():
-    return MongoManager().fs
+import logging
+import os
+from typing import Optional
+from pymongo import MongoClient
+import gridfs
+from config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+class MongoManager:
+    _instance = None
+    _client: Optional[MongoClient] = None
+    _db = None
+    _fs = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(MongoManager, cls).__new__(cls)
+            cls._instance._initialize()
+        return cls._instance
+
+    def _initialize(self):
+        settings = get_settings()
+        mongo_uri = os.getenv("MONGO_URI", "mongodb://localhost:27017")
+        db_name = os.getenv("MONGO_DB_NAME", "govinda_v2")
+
+        # Pool sized for concurrent retrieval fan-out (FIX #6). Compressors
+        # are negotiated with the server in order. The default lists only
+        # those requirements.txt installs (zstd via pymongo[zstd]; zlib is
+        # built in); pymongo warns about any whose library is missing.
+        client_opts = {
+            "maxPoolSize": int(os.getenv("MONGO_MAX_POOL", "100")),
+            "minPoolSize": int(os.getenv("MONGO_MIN_POOL", "5")),
+            "maxIdleTimeMS": int(os.getenv("MONGO_MAX_IDLE_MS", "30000")),
+            "connectTimeoutMS": int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "10000")),
+            "compressors": os.getenv("MONGO_COMPRESSORS", "zstd,zlib"),
+            "retryWrites": True,
+        }
+
+        try:
+            # Atlas (mongodb+srv) requires server_api for stable API
+            if mongo_uri.startswith("mongodb+srv"):
+                from pymongo.server_api import ServerApi
+                self._client = MongoClient(
+                    mongo_uri,
+                    server_api=ServerApi("1"),
+                    tls=True,
+                    tlsAllowInvalidCertificates=False,
+                    **client_opts,
+                )
+            else:
+                self._client = MongoClient(mongo_uri, **client_opts)
+
+            self._db = self._client[db_name]
+            self._fs = gridfs.GridFS(self._db)
+            self._client.admin.command("ping")
+            logger.info(f"Connected to MongoDB: {db_name}")
+        except Exception as e:
+            logger.error(f"Failed to connect to MongoDB: {e}")
+            raise e
+
+    @property
+    def db(self):
+        return self._db
+
+    @property
+    def fs(self):
+        return self._fs
+
+    def get_collection(self, name: str):
+        return self._db[name]
+
+# Module-level handles, filled on first use so hot paths (store
+# constructors, per-request helpers) skip the MongoManager lookup.
+_db = None
+_fs = None
+
+
+# Global helper to access db
+def get_db():
+    global _db
+    if _db is None:
+        _db = MongoManager().db
+    return _db
+
+def get_fs():
+    global _fs
+    if _fs is None:
+        _fs = MongoManager().fs
+    return _fs
+
+def get_collection(name: str):
+    """Return a collection handle from the cached database."""
+    return (_db if _db is not None else get_db())[name]
+
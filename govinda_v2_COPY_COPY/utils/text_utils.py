@@ -1,69 +1,182 @@
-"""
-Text utilities for GOVINDA V2.
-
-Token counting, text cleaning, and formatting helpers.
-"""
-
-from __future__ import annotations
-
-import re
-from typing import Optional
-
-
-def estimate_tokens(text: str) -> int:
-    """
-    Fast token count estimation.
-
-    Uses the ~4 chars per token heuristic for English text.
-    Accurate enough for budget tracking without needing tiktoken.
-    """
-    if not text:
-        return 0
-    return max(1, len(text) // 4)
-
-
-def clean_pdf_text(text: str) -> str:
-    """
-    Clean text extracted from PDF.
-
-    Handles common PDF extraction artifacts:
-    - Excessive whitespace
-    - Hyphenated line breaks
-    - Header/footer repetitions
-    - Page number artifacts
-    """
-    if not text:
-        return ""
-
-    # Fix hyphenated line breaks (word-\nbreak -> wordbreak)
-    text = re.sub(r"(\w)-\s*\n\s*(\w)", r"\1\2", text)
-
-    # Collapse multiple newlines to max 2
-    text = re.sub(r"\n{3,}", "\n\n", text)
-
-    # Collapse multiple spaces to single (but preserve newlines)
-    text = re.sub(r"[^\S\n]+", " ", text)
-
-    # Remove isolated page numbers on their own line
-    text = re.sub(r"\n\s*\d{1,3}\s*\n", "\n", text)
-
-    # Strip leading/trailing whitespace per line
-    lines = [line.strip() for line in text.split("\n")]
-    text = "\n".join(lines)
-
-    return text.strip()
-
-
-def truncate_text(text: str, max_tokens: int, suffix: str = "...") -> str:
-    """Truncate text to approximately max_tokens."""
-    max_chars = max_tokens * 4
-    if len(text) <= max_chars:
-        return text
-    return text[: max_chars - len(suffix)] + suffix
-
-
-def format_page_range(start: int, end: int) -> str:
-    """Format a page range for display."""
-    if start == end:
-        return f"p.{start}"
-    return f"pp.{start}-{end}"
+"""
+Text utilities for GOVINDA V2.
+
+Token counting, text cleaning, and formatting helpers.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Optional
+
+# Precompiled patterns (clean_pdf_text runs once per page).
+# Each pattern starts on a literal or only matches text it will change, so
+# the regex engine skips ahead instead of attempting a match at every char.
+_HYPHEN_BREAK_RE = re.compile(r"-(?<=\w-)\s*\n\s*(?=\w)")
+_MULTI_NL_RE = re.compile(r"\n\n\n+")
+# Horizontal whitespace runs other than a lone " " (which is already clean)
+_HSPACE_RE = re.compile(r" [^\S\n]+|[^\S\n ][^\S\n]*")
+_PAGENUM_RE = re.compile(r"\n\s*\d{1,3}\s*\n")
+
+# Page separator for clean_pdf_text_many
+_PAGE_SEP = "\x00"
+
+
+# Set by load_tokenizer(); None means the 4-chars-per-token heuristic
+_ENCODER = None
+
+# Chars encoded to find a truncation cut, per token of budget. Tokens
+# average ~4 chars, so the cut almost always falls inside this prefix.
+_TRUNCATE_WINDOW_CHARS_PER_TOKEN = 8
+
+
+def load_tokenizer() -> bool:
+    """
+    Load the o200k_base tokenizer (the GPT-4o/5 family encoding).
+
+    tiktoken may download the BPE file on first use, so call this once at
+    startup, never from a request path. Every entry point that counts or
+    truncates (the API, IngestionPipeline, scripts) calls it, so stored
+    token counts do not depend on which one produced them. Until it
+    succeeds, counting and truncation both use the heuristic, so they
+    always agree on units. Returns True if the tokenizer is loaded.
+    """
+    global _ENCODER
+    if _ENCODER is None:
+        try:
+            import tiktoken
+            _ENCODER = tiktoken.get_encoding("o200k_base")
+        except Exception:  # not installed, or BPE file not downloadable offline
+            return False
+    return True
+
+
+def _encoder():
+    """The loaded tokenizer, or None."""
+    return _ENCODER
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Token count for budget tracking.
+
+    Uses the o200k_base tokenizer once load_tokenizer() has run. Otherwise
+    falls back to the ~4 chars per token heuristic for English text, which
+    can be off by 20-40%.
+    """
+    if not text:
+        return 0
+    enc = _encoder()
+    if enc is not None:
+        return max(1, len(enc.encode_ordinary(text)))
+    return max(1, len(text) // 4)
+
+
+def clean_pdf_text(text: str) -> str:
+    """
+    Clean text extracted from PDF.
+
+    Handles common PDF extraction artifacts:
+    - Excessive whitespace
+    - Hyphenated line breaks
+    - Header/footer repetitions
+    - Page number artifacts
+    """
+    if not text:
+        return ""
+    return _clean_passes(text).strip()
+
+
+def clean_pdf_text_many(texts: list[str]) -> list[str]:
+    """
+    clean_pdf_text over many pages, running each regex pass once over
+    the joined pages instead of once per page.
+
+    Pages are joined on NUL, which is neither whitespace, a word
+    character nor a digit, so no pattern can match across a page
+    boundary. Falls back to per-page cleaning if any page contains NUL.
+    """
+    if not texts:
+        return []
+    if any(_PAGE_SEP in t for t in texts):
+        return [clean_pdf_text(t) for t in texts]
+    joined = _clean_passes(_PAGE_SEP.join(texts))
+    return [t.strip() for t in joined.split(_PAGE_SEP)]
+
+
+def _clean_passes(text: str) -> str:
+    """The clean_pdf_text substitutions, without the final strip."""
+    # Fix hyphenated line breaks (word-\nbreak -> wordbreak)
+    text = _HYPHEN_BREAK_RE.sub("", text)
+
+    # Collapse multiple newlines to max 2
+    text = _MULTI_NL_RE.sub("\n\n", text)
+
+    # Collapse multiple spaces to single (but preserve newlines)
+    text = _HSPACE_RE.sub(" ", text)
+
+    # Remove isolated page numbers on their own line
+    text = _PAGENUM_RE.sub("\n", text)
+
+    # Strip leading/trailing whitespace per line (the text's own ends are
+    # stripped by the caller). split/strip/join measured faster than a
+    # single regex or str.replace pass over the text, so keep it.
+    lines = [line.strip() for line in text.split("\n")]
+    return "\n".join(lines)
+
+
+def truncate_text(text: str, max_tokens: int, suffix: str = "...") -> str:
+    """Truncate text to max_tokens (same units as estimate_tokens)."""
+    cut = _truncation_cut(text, max_tokens, suffix)
+    if cut is None:
+        return text
+    return text[:cut] + suffix
+
+
+def truncate_text_into(buf: list[str], text: str, max_tokens: int, suffix: str = "...") -> None:
+    """
+    Append truncate_text(text, max_tokens, suffix) to buf as segments.
+
+    For prompt builders that "".join a list of parts: the kept prefix and
+    the suffix go in separately, so the truncated string is never built
+    and copied again by the final join.
+    """
+    cut = _truncation_cut(text, max_tokens, suffix)
+    if cut is None:
+        buf.append(text)
+        return
+    buf.append(text[:cut])
+    buf.append(suffix)
+
+
+def _truncation_cut(text: str, max_tokens: int, suffix: str) -> Optional[int]:
+    """Char offset to cut text at so text[:cut] + suffix fits max_tokens, or None if it fits."""
+    enc = _encoder()
+    if enc is None:
+        max_chars = max_tokens * 4
+        if len(text) <= max_chars:
+            return None
+        return max_chars - len(suffix)
+
+    # A token covers at least one UTF-8 byte (at most 4 per char), so
+    # short text cannot exceed the budget
+    if len(text) * 4 <= max_tokens:
+        return None
+    # Encode only a bounded prefix to find the cut; fall back to the whole
+    # text when the prefix turns out to fit (e.g. long whitespace runs)
+    window = max_tokens * _TRUNCATE_WINDOW_CHARS_PER_TOKEN
+    tokens = enc.encode_ordinary(text[:window])
+    if len(tokens) <= max_tokens and len(text) > window:
+        tokens = enc.encode_ordinary(text)
+    if len(tokens) <= max_tokens:
+        return None
+    keep = max(0, max_tokens - len(enc.encode_ordinary(suffix)))
+    # Decode bytes so a multi-byte char split by the cut is dropped, not mangled
+    return len(enc.decode_bytes(tokens[:keep]).decode("utf-8", errors="ignore"))
+
+
+def format_page_range(start: int, end: int) -> str:
+    """Format a page range for display."""
+    if start == end:
+        return f"p.{start}"
+    return f"pp.{start}-{end}"
@@ -0,0 +1,72 @@
+"""
+Stage timing helpers for GOVINDA V2.
+
+A Timer accumulates per-stage durations (in seconds) into a dict, so
+pipeline code can write ``with timer("locate"): ...`` instead of pairing
+``time.time()`` calls by hand. Uses the monotonic perf_counter clock.
+
+now_iso() is a cheap wall-clock UTC timestamp for persisted records.
+"""
+
+from __future__ import annotations
+
+import time
+from time import perf_counter
+from typing import Optional
+
+
+class Timer:
+    """
+    Accumulates named stage durations into a shared dict.
+
+    Usage:
+        timer = Timer(routing_log.stage_timings)
+        with timer("classify"):
+            query = classifier.classify(text)
+        timer.elapsed  # seconds since the timer was created
+    """
+
+    __slots__ = ("timings", "_start")
+
+    def __init__(self, timings: Optional[dict[str, float]] = None) -> None:
+        self.timings: dict[str, float] = timings if timings is not None else {}
+        self._start = perf_counter()
+
+    def __call__(self, stage: str) -> "_Stage":
+        return _Stage(self.timings, stage)
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since this timer was created."""
+        return perf_counter() - self._start
+
+
+def now_iso() -> str:
+    """
+    Current UTC time as an ISO-8601 string with microseconds.
+
+    Same shape as ``datetime.now(timezone.utc).isoformat()`` (except that
+    microseconds are always present) without building a datetime.
+    """
+    secs, nanos = divmod(time.time_ns(), 1_000_000_000)
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(secs)) + f".{nanos // 1000:06d}+00:00"
+
+
+class _Stage:
+    """Context manager for a single timed stage. Repeated stages accumulate."""
+
+    __slots__ = ("_timings", "_stage", "_t0", "seconds")
+
+    def __init__(self, timings: dict[str, float], stage: str) -> None:
+        self._timings = timings
+        self._stage = stage
+        self._t0 = 0.0
+        self.seconds = 0.0
+
+    def __enter__(self) -> "_Stage":
+        self._t0 = perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.seconds = perf_counter() - self._t0
+        self._timings[self._stage] = self._timings.get(self._stage, 0.0) + self.seconds